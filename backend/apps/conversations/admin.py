@@ -3,7 +3,24 @@ Conversation admin.
 """
 
 from django.contrib import admin
-from .models import ConversationSession
+from .models import ConversationSession, SessionTiming
+
+TIMING_FIELDS = [
+    'transport', 'llm_mode', 'total_ms', 'stt_ms', 'stt_max_ms', 'stt_requests',
+    'chunk_count', 'stt_chunks', 'llm_ms', 'tts_ms', 'db_ms', 'bytes_in', 'bytes_out',
+    'stt_model', 'llm_model', 'tts_model', 'recorded_at',
+]
+
+
+class SessionTimingInline(admin.StackedInline):
+    model = SessionTiming
+    fields = TIMING_FIELDS
+    readonly_fields = TIMING_FIELDS
+    can_delete = False
+    extra = 0
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(ConversationSession)
@@ -12,6 +29,7 @@ class ConversationSessionAdmin(admin.ModelAdmin):
     list_filter = ['started_at', 'emotion']
     search_fields = ['patient__email', 'patient__name']
     readonly_fields = ['id', 'created_at', 'updated_at', 'duration']
+    inlines = [SessionTimingInline]
     fieldsets = (
         ('基本情報', {
             'fields': ('patient', 'started_at', 'ended_at')
@@ -27,3 +45,34 @@ class ConversationSessionAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(SessionTiming)
+class SessionTimingAdmin(admin.ModelAdmin):
+    list_display = [
+        'session', 'recorded_at', 'transport', 'llm_mode', 'total_ms', 'stt_ms',
+        'stt_max_ms', 'llm_ms', 'tts_ms', 'db_ms', 'chunk_count', 'bytes_in', 'bytes_out'
+    ]
+    list_filter = ['transport', 'llm_mode', 'llm_model', 'recorded_at']
+    list_select_related = ['session']
+    search_fields = ['session__patient__name', 'session__patient__email']
+    date_hierarchy = 'recorded_at'
+    ordering = ['-total_ms']
+    readonly_fields = ['session'] + TIMING_FIELDS
+    fieldsets = (
+        ('セッション', {
+            'fields': ('session', 'transport', 'llm_mode', 'recorded_at')
+        }),
+        ('処理時間（ms）', {
+            'fields': ('total_ms', 'stt_ms', 'stt_max_ms', 'llm_ms', 'tts_ms', 'db_ms')
+        }),
+        ('入出力', {
+            'fields': ('stt_requests', 'chunk_count', 'stt_chunks', 'bytes_in', 'bytes_out')
+        }),
+        ('モデル', {
+            'fields': ('stt_model', 'llm_model', 'tts_model')
+        }),
+    )
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,132 @@
+"""
+Adaptive coalescing of small audio chunks before STT.
+
+Clients that upload very short chunks would otherwise pay one full STT round
+trip per chunk. ``ChunkCoalescer`` buffers consecutive chunks of a session and
+hands them to STT as one request once the buffer reaches ``max_bytes``, the
+oldest buffered chunk is ``max_delay`` seconds old, or no chunk arrived for
+``idle`` seconds. Chunks are joined byte-wise, so this suits clients whose
+chunks are consecutive pieces of one stream, not independent files.
+
+Raw PCM is headerless and any run of chunks is valid on its own. WebM from
+MediaRecorder only carries its EBML header (and track info) in the first
+timeslice, so a batch that starts later would not decode. The coalescer keeps
+that header, up to the first Cluster, and prepends it to every batch that
+does not start with one; decoders then resync on the next Cluster.
+"""
+
+import asyncio
+import time
+from apps.core.metrics import registry
+
+EBML_MAGIC = b'\x1a\x45\xdf\xa3'
+CLUSTER_ID = b'\x1f\x43\xb6\x75'
+
+coalesce_chunks = registry.counter(
+    'conversation_coalesce_chunks_total',
+    'Audio chunks received by the coalescing buffer'
+)
+coalesce_requests = registry.counter(
+    'conversation_coalesce_requests_total',
+    'STT requests dispatched by the coalescing buffer, by flush reason'
+)
+coalesce_wait_seconds = registry.counter(
+    'conversation_coalesce_wait_seconds_total',
+    'Total time chunks spent buffered before dispatch'
+)
+
+
+def container_header(audio_bytes):
+    """WebM/Matroskaのチャンクから最初のCluster手前までのヘッダを取り出す
+
+    Returns:
+        bytes | None: ヘッダ（EBMLヘッダで始まらないチャンクはNone）
+    """
+    if not audio_bytes.startswith(EBML_MAGIC):
+        return None
+    end = audio_bytes.find(CLUSTER_ID)
+    return audio_bytes if end < 0 else audio_bytes[:end]
+
+
+class ChunkCoalescer:
+    """1セッション分のチャンク結合バッファ
+
+    Args:
+        dispatch: ``dispatch(seqs, audio_bytes)`` 結合したチャンクのSTTを開始する関数
+        max_bytes: この大きさに達したら即座に送出
+        max_delay: 最初のチャンクからこの秒数で送出
+        idle: 最後のチャンクからこの秒数で送出
+    """
+
+    def __init__(self, dispatch, max_bytes=32 * 1024, max_delay=1.0, idle=0.3):
+        self.dispatch = dispatch
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.idle = idle
+        self._seqs = []
+        self._parts = []
+        self._arrivals = []
+        self._size = 0
+        self._timer = None
+        # Container header of the current stream, prepended to later batches
+        self.header = None
+
+    @property
+    def pending(self):
+        """バッファ中のチャンク数"""
+        return len(self._seqs)
+
+    def add(self, seq, audio_bytes):
+        """チャンクを追加（条件を満たせば送出）"""
+        coalesce_chunks.inc()
+        if self._seqs and seq != self._seqs[-1] + 1:
+            # Only consecutive chunks can be joined into one stream
+            self.flush('gap')
+
+        header = container_header(audio_bytes)
+        if header is not None:
+            # A new recording started; later batches need this stream's header
+            self.header = header
+
+        now = time.monotonic()
+        self._seqs.append(seq)
+        self._parts.append(audio_bytes)
+        self._arrivals.append(now)
+        self._size += len(audio_bytes)
+
+        if self._size >= self.max_bytes:
+            self.flush('size')
+            return
+
+        if self._timer is not None:
+            self._timer.cancel()
+        deadline = self._arrivals[0] + self.max_delay
+        delay = min(self.idle, max(0.0, deadline - now))
+        reason = 'idle' if delay == self.idle else 'delay'
+        self._timer = asyncio.get_running_loop().call_later(delay, self.flush, reason)
+
+    def flush(self, reason='flush'):
+        """バッファ中のチャンクを1リクエストとして送出"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._seqs:
+            return
+
+        seqs, parts, arrivals = self._seqs, self._parts, self._arrivals
+        self._seqs, self._parts, self._arrivals, self._size = [], [], [], 0
+
+        now = time.monotonic()
+        coalesce_requests.inc(reason=reason)
+        coalesce_wait_seconds.inc(sum(now - t for t in arrivals))
+        audio_bytes = b''.join(parts)
+        if self.header is not None and not audio_bytes.startswith(EBML_MAGIC):
+            audio_bytes = self.header + audio_bytes
+        self.dispatch(seqs, audio_bytes)
+
+    def cancel(self):
+        """タイマーを止めてバッファを破棄"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._seqs, self._parts, self._arrivals, self._size = [], [], [], 0
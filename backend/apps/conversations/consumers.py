@@ -2,16 +2,68 @@
 WebSocket consumer for real-time conversation handling.
 """
 
+import asyncio
 import json
 import base64
+import logging
+import time
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
-from asgiref.sync import sync_to_async
-from django.core.cache import cache
+from django.conf import settings
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .events import (
+    DASHBOARD_ALL_GROUP,
+    apublish_session_ended,
+    patient_group,
+    session_group,
+)
+from .executors import offload, database_offload
+from .instrumentation import (
+    STAGE_CACHE,
+    STAGE_DB,
+    STAGE_DECODE,
+    STAGE_EMOTION,
+    STAGE_LLM,
+    STAGE_SEND,
+    STAGE_STT,
+    STAGE_TTS,
+    TRANSPORT_WEBSOCKET,
+    StageTimer,
+)
+from .services.llm_service import ERROR_RESPONSE
+from .memory import MemoryAccount, decode_audio_field, rejected_payloads
 from .models import ConversationSession
-from .services import DeepgramService, LLMService
-from apps.emotions.models import Emotion
+from .protocol import (
+    FRAME_AUDIO_CHUNK,
+    FRAME_STREAM_AUDIO,
+    FRAME_TTS_AUDIO,
+    FrameError,
+    count_frames,
+    decode_frame,
+    encode_frame,
+    iter_audio_frames,
+)
+from .services import (
+    DeepgramService,
+    DeepgramStreamingSession,
+    LLMService,
+    StreamingUnavailable,
+)
+from .coalescing import ChunkCoalescer
+from .reassembly import ChunkReassembler
+from .speculation import SpeculativeAnalyzer
+from .streaming import SentenceSplitter
+from .timing import SessionProfile
+from .transcripts import get_transcript_store, join_chunks
+from apps.core.logs import bind_log_context
+from apps.core.profiling import start_connection_profile
+from apps.emotions.registry import get_registry, loaded_registry
+from apps.patients.models import Patient
+
+logger = logging.getLogger(__name__)
+# Per-chunk events, sampled (LOG_CHUNK_SAMPLE_RATE)
+chunk_logger = logging.getLogger('apps.conversations.chunks')
 
 
 class ConversationConsumer(AsyncWebsocketConsumer):
@@ -19,20 +71,63 @@ class ConversationConsumer(AsyncWebsocketConsumer):
 
     async def connect(self):
         """Handle WebSocket connection"""
-        print("WebSocket connection attempt")
+        # On-demand sampling profile of this connection (signed X-Profile header or ?profile=)
+        self.profiler = start_connection_profile(self.scope, type(self).__name__)
+        # Services share process-wide client pools, so one instance per connection is enough
+        self.deepgram_service = DeepgramService()
+        self.llm_service = LLMService()
+        # Send TTS audio as binary frames instead of base64 (negotiated per connection)
+        self.binary_audio = False
+        # Session started (or first referenced) on this connection; validated in memory
+        self.session = None
+        # Channel group of self.session, for events sent from views and Celery tasks
+        self.session_group = None
+        # Omit accumulated_text from transcript events (negotiated per connection)
+        self.delta_transcripts = False
+        # Active streaming STT session: (session_id, DeepgramStreamingSession)
+        self.stt_stream = None
+        # Background analysis of the transcript so far (opt-in per session)
+        self.speculator = None
+        # Concurrent chunk transcription state and timing profile (reset per session)
+        self.coalescer = None
+        self.profile = None
+        self.reset_chunk_state(None)
+        # Payload size limit and per-message-type memory accounting
+        self.memory = MemoryAccount()
+        self.current_message = None
         await self.accept()
-        print("WebSocket connection accepted")
-        await self.send(text_data=json.dumps({
+        bind_log_context(connection=self.channel_name)
+        logger.info('WebSocket connection accepted')
+        message = {
             'type': 'connection_established',
             'message': 'WebSocket接続が確立されました'
-        }))
-        print("Connection message sent")
+        }
+        if self.profiler is not None:
+            message['profile_id'] = self.profiler.id
+        await self.send(text_data=json.dumps(message))
 
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
-        pass
+        logger.info('WebSocket disconnected', extra={
+            'close_code': close_code,
+            'messages': self.memory.summary(),
+            'peak_traced_bytes': self.memory.peak,
+        })
+        await self.join_session_group(None)
+        if self.coalescer is not None:
+            self.coalescer.cancel()
+        for task in list(self.stt_tasks):
+            task.cancel()
+        if self.speculator is not None:
+            self.speculator.cancel()
+        if self.stt_stream is not None:
+            _, stream = self.stt_stream
+            self.stt_stream = None
+            await stream.close()
+        if self.profiler is not None:
+            self.profiler.stop()
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """
         Handle incoming WebSocket messages
 
@@ -40,10 +135,36 @@ class ConversationConsumer(AsyncWebsocketConsumer):
         - start_session: セッション開始
         - process_audio: 音声データ処理（STT）
         - end_session: セッション終了（LLM + TTS）
+        - get_transcript: 累積テキストの再取得
+        - start_stream / stream_audio / stop_stream: ストリーミングSTT
+
+        Binary frames (see protocol.py) carry raw audio chunks.
         """
+        binary = bytes_data is not None
+        size = len(bytes_data) if binary else len(text_data)
+        # Checked on the frame length, before anything is parsed or decoded
+        limit = self.memory.frame_limit(binary)
+        if size > limit:
+            rejected_payloads.inc(transport=TRANSPORT_WEBSOCKET)
+            logger.warning('Message too large', extra={'bytes': size, 'limit': limit})
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': f'Message too large ({size} bytes, max {limit})'
+            }))
+            return
+
+        self.current_message = self.memory.begin('binary_audio' if binary else None, size)
+        if binary:
+            try:
+                await self.handle_binary_frame(bytes_data)
+            finally:
+                self.current_message.finish()
+            return
+
         try:
             data = json.loads(text_data)
             message_type = data.get('type')
+            self.current_message.mark(message_type)
 
             if message_type == 'start_session':
                 await self.handle_start_session(data)
@@ -51,6 +172,14 @@ class ConversationConsumer(AsyncWebsocketConsumer):
                 await self.handle_process_audio(data)
             elif message_type == 'end_session':
                 await self.handle_end_session(data)
+            elif message_type == 'get_transcript':
+                await self.handle_get_transcript(data)
+            elif message_type == 'start_stream':
+                await self.handle_start_stream(data)
+            elif message_type == 'stream_audio':
+                await self.handle_stream_audio(data)
+            elif message_type == 'stop_stream':
+                await self.handle_stop_stream(data)
             else:
                 await self.send(text_data=json.dumps({
                     'type': 'error',
@@ -58,10 +187,14 @@ class ConversationConsumer(AsyncWebsocketConsumer):
                 }))
 
         except Exception as e:
+            # Details stay in the log; exception text is not sent to the client
+            logger.exception('Error processing message')
             await self.send(text_data=json.dumps({
                 'type': 'error',
-                'message': f'Error processing message: {str(e)}'
+                'message': 'Error processing message'
             }))
+        finally:
+            self.current_message.finish()
 
     async def handle_start_session(self, data):
         """Handle session start"""
@@ -74,35 +207,181 @@ class ConversationConsumer(AsyncWebsocketConsumer):
             }))
             return
 
+        if data.get('binary_audio'):
+            self.binary_audio = True
+        if data.get('delta'):
+            self.delta_transcripts = True
+
+        if data.get('speculative', getattr(settings, 'CONVERSATION_SPECULATIVE_ANALYSIS', False)):
+            if self.speculator is not None:
+                self.speculator.cancel()
+            self.speculator = SpeculativeAnalyzer(
+                self.analyze_conversation,
+                debounce=getattr(settings, 'CONVERSATION_SPECULATIVE_DEBOUNCE', 1.5)
+            )
+
         # Create session in database
         session = await self.create_session(patient_id)
+        self.session = session
+        bind_log_context(session_id=str(session.id), patient_id=str(session.patient_id))
+        logger.info('Session started')
+        self.reset_chunk_state(session.id)
+        await self.join_session_group(session.id)
 
-        # Initialize Redis cache
-        cache_key = f"session:{session.id}:text"
-        await self.cache_set(cache_key, "", timeout=3600)
+        # Initialize transcript store
+        await self.transcript_start(session.id)
 
         await self.send(text_data=json.dumps({
             'type': 'session_started',
             'session_id': str(session.id),
             'patient_id': str(session.patient.id),
             'started_at': session.started_at.isoformat(),
-            'status': 'active'
+            'status': 'active',
+            'binary_audio': self.binary_audio,
+            'delta': self.delta_transcripts
         }))
 
     async def handle_process_audio(self, data):
         """Handle audio processing (STT)"""
         session_id = data.get('session_id')
-        audio_data_base64 = data.get('audio_data')
 
-        if not session_id or not audio_data_base64:
+        if not session_id or not data.get('audio_data'):
             await self.send(text_data=json.dumps({
                 'type': 'error',
                 'message': 'session_id and audio_data are required'
             }))
             return
 
+        seq = data.get('seq')
+        if seq is not None:
+            if isinstance(seq, str) and seq.isdecimal():
+                seq = int(seq)
+            if not isinstance(seq, int) or isinstance(seq, bool) or seq < 0:
+                await self.send(text_data=json.dumps({
+                    'type': 'error',
+                    'message': 'Invalid seq'
+                }))
+                return
+
+        # Only the decoded bytes stay alive while STT is awaited
+        try:
+            with StageTimer(STAGE_DECODE, TRANSPORT_WEBSOCKET):
+                audio_bytes = decode_audio_field(data, self.current_message)
+        except ValueError:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Invalid audio payload'
+            }))
+            return
+
+        await self.process_audio_bytes(session_id, audio_bytes, seq=seq)
+
+    async def handle_binary_frame(self, bytes_data):
+        """Handle binary audio frame (raw bytes, no base64)"""
+        try:
+            frame = decode_frame(bytes_data)
+            self.current_message.mark()
+        except FrameError as e:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': f'Invalid binary frame: {str(e)}'
+            }))
+            return
+
+        if frame.frame_type not in (FRAME_AUDIO_CHUNK, FRAME_STREAM_AUDIO):
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': f'Unknown frame type: {frame.frame_type}'
+            }))
+            return
+
+        if not frame.payload:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'audio payload is empty'
+            }))
+            return
+
+        # A client that uploads binary frames also receives binary TTS audio
+        self.binary_audio = True
+
+        try:
+            if frame.frame_type == FRAME_STREAM_AUDIO:
+                await self.forward_stream_audio(frame.session_id, frame.payload)
+            else:
+                await self.process_audio_bytes(frame.session_id, frame.payload, seq=frame.seq)
+        except Exception:
+            logger.exception('Error processing binary frame')
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Error processing message'
+            }))
+
+    def reset_chunk_state(self, session_id, next_seq=0):
+        """Reset per-session chunk sequencing, concurrency limit, coalescing, reassembly and timing"""
+        # Chunks still buffered for the previous session go out with its own reassembler
+        if self.coalescer is not None:
+            self.coalescer.flush()
+        self.next_seq = next_seq
+        self.stt_tasks = set()
+        self.max_inflight_stt = getattr(settings, 'CONVERSATION_MAX_INFLIGHT_STT', 3)
+        self.stt_semaphore = asyncio.Semaphore(self.max_inflight_stt)
+        self.reassembler = ChunkReassembler(
+            lambda message: self.send_transcript_update(session_id, message),
+            next_seq
+        )
+        self.profile = SessionProfile(TRANSPORT_WEBSOCKET) if session_id is not None else None
+        coalesce = getattr(settings, 'CONVERSATION_COALESCE', {})
+        if session_id is not None and coalesce.get('ENABLED', False):
+            reassembler, profile = self.reassembler, self.profile
+            self.coalescer = ChunkCoalescer(
+                lambda seqs, audio_bytes: self.dispatch_chunks(session_id, seqs, audio_bytes, reassembler, profile),
+                max_bytes=coalesce.get('MAX_BYTES', 32 * 1024),
+                max_delay=coalesce.get('MAX_DELAY', 1.0),
+                idle=coalesce.get('IDLE', 0.3)
+            )
+        else:
+            self.coalescer = None
+
+    def check_seq(self, seq):
+        """Return an error message if a client sequence number cannot be accepted
+
+        Frames of one connection arrive in order, so a number below next_seq is
+        a duplicate or a replay; numbers skipped ahead are bounded by
+        CONVERSATION_SEQ_WINDOW.
+        """
+        if seq < self.next_seq:
+            return f'seq {seq} already received (expected {self.next_seq} or later)'
+        window = getattr(settings, 'CONVERSATION_SEQ_WINDOW', 64)
+        if seq >= self.next_seq + window:
+            return f'seq {seq} is outside the window ({self.next_seq} to {self.next_seq + window - 1})'
+        return None
+
+    def allocate_seq(self, seq=None):
+        """Use the client's sequence number or assign the next one"""
+        if seq is None:
+            seq = self.next_seq
+        self.next_seq = max(self.next_seq, seq + 1)
+        return seq
+
+    async def drain_chunks(self):
+        """Wait for in-flight transcriptions and emit everything still buffered"""
+        if self.coalescer is not None:
+            self.coalescer.flush('end')
+        if self.stt_tasks:
+            await asyncio.gather(*list(self.stt_tasks), return_exceptions=True)
+        await self.reassembler.flush()
+
+    async def process_audio_bytes(self, session_id, audio_bytes, seq=None):
+        """Dispatch STT for one audio chunk without waiting for the result
+
+        Chunks of a session are transcribed concurrently (bounded by
+        CONVERSATION_MAX_INFLIGHT_STT; further chunks wait here, which stops
+        this connection's receive loop) and their audio_processed events are
+        emitted in sequence order.
+        """
         # Verify session exists
-        session = await self.get_session(session_id)
+        session = await self.resolve_session(session_id)
         if not session:
             await self.send(text_data=json.dumps({
                 'type': 'error',
@@ -117,31 +396,242 @@ class ConversationConsumer(AsyncWebsocketConsumer):
             }))
             return
 
-        # Decode audio
-        if audio_data_base64.startswith('data:audio'):
-            audio_data_base64 = audio_data_base64.split(',', 1)[1]
+        # Backpressure: stop reading further messages from this client while the
+        # session already has the maximum number of chunk transcriptions running
+        await self.wait_for_stt_slot()
+
+        if seq is not None:
+            error = self.check_seq(seq)
+            if error:
+                await self.send(text_data=json.dumps({
+                    'type': 'error',
+                    'message': error,
+                    'seq': seq
+                }))
+                return
 
-        audio_bytes = base64.b64decode(audio_data_base64)
+        first_free = self.next_seq
+        seq = self.allocate_seq(seq)
+        # Numbers the client skipped cannot arrive later on this connection;
+        # release them so the reassembler does not hold later results
+        for skipped in range(first_free, seq):
+            await self.reassembler.complete(skipped, None)
+        if self.coalescer is not None:
+            # Small chunks are joined and transcribed as one request
+            self.coalescer.add(seq, audio_bytes)
+        else:
+            self.dispatch_chunks(session_id, [seq], audio_bytes, self.reassembler, self.profile)
 
-        # STT processing
-        transcribed_text, confidence = await self.transcribe_audio(audio_bytes)
+    async def wait_for_stt_slot(self):
+        """Wait until fewer than CONVERSATION_MAX_INFLIGHT_STT chunk tasks are running"""
+        while True:
+            running = {task for task in self.stt_tasks if not task.done()}
+            if len(running) < self.max_inflight_stt:
+                return
+            await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
 
-        # Update cache
-        cache_key = f"session:{session_id}:text"
-        current_text = await self.cache_get(cache_key, "")
-        updated_text = f"{current_text} {transcribed_text}".strip()
-        await self.cache_set(cache_key, updated_text, timeout=3600)
+    def dispatch_chunks(self, session_id, seqs, audio_bytes, reassembler, profile):
+        """Start STT for one or more consecutive chunks joined into audio_bytes"""
+        task = asyncio.create_task(self.transcribe_chunk(session_id, seqs, audio_bytes, reassembler, profile))
+        self.stt_tasks.add(task)
+        task.add_done_callback(self.stt_tasks.discard)
 
-        await self.send(text_data=json.dumps({
+    async def transcribe_chunk(self, session_id, seqs, audio_bytes, reassembler, profile):
+        """Transcribe chunks, store the text and hand the result to the reassembler
+
+        The text is stored under the last sequence number; earlier numbers of
+        a coalesced batch are skipped in the reassembler.
+        """
+        seq = seqs[-1]
+        for covered in seqs[:-1]:
+            await reassembler.complete(covered, None)
+        try:
+            async with self.stt_semaphore:
+                # STT processing
+                started = time.perf_counter()
+                transcribed_text, confidence = await self.transcribe_audio(audio_bytes)
+                profile.add_stt(seqs, time.perf_counter() - started, len(audio_bytes))
+
+            # Append to transcript store
+            await self.transcript_append(session_id, transcribed_text, seq)
+        except Exception as e:
+            logger.warning('Chunk transcription failed: %s', e, extra={'seq': seq})
+            await reassembler.complete(seq, None)
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Transcription failed',
+                'seq': seq
+            }))
+            return
+
+        chunk_logger.info('Chunk transcribed', extra={
+            'seq': seq,
+            'chunks': len(seqs),
+            'bytes': len(audio_bytes),
+            'chars': len(transcribed_text),
+            'confidence': confidence,
+        })
+        message = {
             'type': 'audio_processed',
             'session_id': str(session_id),
             'transcribed_text': transcribed_text,
-            'accumulated_text': updated_text,
-            'confidence': confidence
+            'confidence': confidence,
+            'seq': seq
+        }
+        if len(seqs) > 1:
+            message['coalesced_seqs'] = seqs
+        await reassembler.complete(seq, message)
+
+    async def send_transcript_update(self, session_id, message):
+        """Send a transcript event
+
+        The accumulated text is only read and attached for clients that did
+        not negotiate delta mode; delta clients resync with get_transcript.
+        """
+        updated_text = None
+        if not self.delta_transcripts or self.speculator is not None:
+            updated_text = await self.transcript_read(session_id)
+        if not self.delta_transcripts:
+            message['accumulated_text'] = updated_text
+
+        await self.send(text_data=json.dumps(message))
+
+        if self.speculator is not None:
+            self.speculator.schedule(updated_text)
+
+    async def handle_get_transcript(self, data):
+        """Return the full transcript so far (resync for delta clients)"""
+        session_id = data.get('session_id')
+
+        if not session_id:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'session_id is required'
+            }))
+            return
+
+        chunks = await self.transcript_chunks(session_id)
+        await self.send(text_data=json.dumps({
+            'type': 'transcript',
+            'session_id': str(session_id),
+            'text': join_chunks(chunks),
+            'last_seq': max(chunks) if chunks else None
         }))
 
+    async def handle_start_stream(self, data):
+        """Open a streaming STT session for partial transcripts"""
+        session_id = data.get('session_id')
+
+        if not session_id:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'session_id is required'
+            }))
+            return
+
+        session = await self.resolve_session(session_id)
+        if not session or not session.is_active:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Session not found' if not session else 'Session already ended'
+            }))
+            return
+
+        if self.stt_stream is not None:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Stream already started'
+            }))
+            return
+
+        async def on_transcript(text, confidence, is_final):
+            await self.handle_stream_transcript(session_id, text, confidence, is_final)
+
+        stream = DeepgramStreamingSession(on_transcript)
+        try:
+            await stream.start()
+        except StreamingUnavailable as e:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': str(e)
+            }))
+            return
+
+        self.stt_stream = (str(session_id), stream)
+        await self.send(text_data=json.dumps({
+            'type': 'stream_started',
+            'session_id': str(session_id)
+        }))
+
+    async def handle_stream_audio(self, data):
+        """Forward a base64 audio chunk to the streaming recognizer (JSON clients)"""
+        if not data.get('audio_data'):
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'audio_data is required'
+            }))
+            return
+
+        with StageTimer(STAGE_DECODE, TRANSPORT_WEBSOCKET):
+            audio_bytes = decode_audio_field(data, self.current_message)
+        await self.forward_stream_audio(data.get('session_id'), audio_bytes)
+
+    async def forward_stream_audio(self, session_id, audio_bytes):
+        """Send audio bytes to the active streaming recognizer"""
+        if self.stt_stream is None or self.stt_stream[0] != str(session_id):
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Stream not started'
+            }))
+            return
+
+        if self.profile is not None:
+            self.profile.bytes_in += len(audio_bytes)
+        await self.stt_stream[1].send_audio(audio_bytes)
+
+    async def handle_stop_stream(self, data):
+        """Flush the streaming recognizer and close it"""
+        if self.stt_stream is None:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Stream not started'
+            }))
+            return
+
+        session_id, stream = self.stt_stream
+        self.stt_stream = None
+        await stream.finish()
+
+        await self.send(text_data=json.dumps({
+            'type': 'stream_stopped',
+            'session_id': session_id
+        }))
+
+    async def handle_stream_transcript(self, session_id, text, confidence, is_final):
+        """Push partial/final transcripts; final segments join the session text"""
+        if not is_final:
+            await self.send(text_data=json.dumps({
+                'type': 'partial_transcript',
+                'session_id': str(session_id),
+                'text': text,
+                'confidence': confidence
+            }))
+            return
+
+        seq = self.allocate_seq()
+        await self.transcript_append(session_id, text, seq)
+
+        await self.reassembler.complete(seq, {
+            'type': 'final_transcript',
+            'session_id': str(session_id),
+            'text': text,
+            'confidence': confidence,
+            'seq': seq
+        })
+
     async def handle_end_session(self, data):
         """Handle session end with LLM analysis and TTS generation"""
+        started = time.perf_counter()
         session_id = data.get('session_id')
 
         if not session_id:
@@ -152,7 +642,7 @@ class ConversationConsumer(AsyncWebsocketConsumer):
             return
 
         # Verify session exists
-        session = await self.get_session(session_id)
+        session = await self.resolve_session(session_id)
         if not session:
             await self.send(text_data=json.dumps({
                 'type': 'error',
@@ -167,126 +657,503 @@ class ConversationConsumer(AsyncWebsocketConsumer):
             }))
             return
 
-        # Get accumulated text from Redis
-        cache_key = f"session:{session_id}:text"
-        patient_text = await self.cache_get(cache_key, "")
+        # Flush an open streaming recognizer so its final transcript is included
+        if self.stt_stream is not None and self.stt_stream[0] == str(session_id):
+            _, stream = self.stt_stream
+            self.stt_stream = None
+            await stream.finish()
 
-        # LLM analysis
-        print(f"Starting LLM analysis for session {session_id}")
-        analysis_result = await self.analyze_conversation(patient_text)
-        print(f"LLM analysis complete. Response: {analysis_result['response'][:50]}...")
+        # Let in-flight chunk transcriptions finish before reading the transcript
+        await self.drain_chunks()
+        profile = self.profile
 
-        # Get emotion from database
-        emotion = await self.get_emotion(analysis_result['emotion'])
-        print(f"Emotion selected: {emotion.name if emotion else 'None'}")
+        # Assemble the transcript once, in sequence order
+        patient_text = await self.transcript_read(session_id)
+
+        binary_audio = self.binary_audio or bool(data.get('binary_audio'))
+        streamed_chunks = None
 
-        # Generate TTS audio
-        print(f"Generating TTS audio for text: {analysis_result['response'][:50]}...")
-        ai_audio_data = await self.generate_tts(analysis_result['response'])
-        print(f"TTS audio generated. Size: {len(ai_audio_data) if ai_audio_data else 0} bytes")
+        # Reuse the speculative analysis when the transcript has not changed since
+        speculative_result = None
+        if self.speculator is not None:
+            speculative_result = await self.speculator.resolve(patient_text)
 
-        # Convert audio to base64
-        ai_audio_base64 = base64.b64encode(ai_audio_data).decode('utf-8') if ai_audio_data else ''
-        print(f"Audio base64 length: {len(ai_audio_base64)}")
+        if data.get('stream'):
+            # Stream LLM tokens and synthesise each sentence as soon as it is complete
+            logger.info('Starting streaming LLM/TTS pipeline')
+            # A speculative hit only streams the TTS part; record it as the hit it is
+            profile.llm_mode = 'streamed' if speculative_result is None else 'speculative'
+            # llm and tts time are recorded separately inside stream_response
+            analysis_result, streamed_chunks = await self.stream_response(
+                session_id, patient_text, binary_audio, speculative_result
+            )
+            ai_audio_data = b''
+        elif speculative_result is not None:
+            logger.info('Reusing speculative LLM analysis')
+            profile.llm_mode = 'speculative'
+            analysis_result = speculative_result
+        else:
+            # LLM analysis
+            logger.info('Starting LLM analysis')
+            with profile.measure('llm'):
+                analysis_result = await self.analyze_conversation(patient_text)
+        logger.info('LLM analysis complete', extra={'response_chars': len(analysis_result['response'])})
+
+        # Resolve emotion from the registry
+        emotion = await self.get_emotion(analysis_result['emotion'])
+        logger.info('Emotion selected', extra={'emotion': emotion.name if emotion else None})
+
+        if streamed_chunks is None:
+            # Generate TTS audio
+            with profile.measure('tts'):
+                ai_audio_data = await self.generate_tts(analysis_result['response'])
+            profile.bytes_out += len(ai_audio_data or b'')
+            logger.info('TTS audio generated', extra={'bytes': len(ai_audio_data) if ai_audio_data else 0})
 
         # Update session in database
-        await self.update_session(
-            session_id,
-            patient_text,
-            analysis_result['response'],
-            emotion,
-            analysis_result['reason']
-        )
+        with profile.measure('db'):
+            ended_at = await self.update_session(
+                session_id,
+                patient_text,
+                analysis_result['response'],
+                emotion,
+                analysis_result['reason']
+            )
+        if ended_at is None:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Session already ended'
+            }))
+            return
+        session.ended_at = ended_at
+        session.patient_text = patient_text
+        session.ai_response_text = analysis_result['response']
+        session.emotion_id = emotion.id if emotion else None
+        session.emotion_reason = analysis_result['reason']
 
-        # Clear cache
-        await self.cache_delete(cache_key)
+        # Clear transcript
+        await self.transcript_clear(session_id)
 
-        # Send response with audio
-        response_message = {
-            'type': 'session_ended',
-            'session_id': str(session_id),
-            'patient_text': patient_text,
-            'ai_response_text': analysis_result['response'],
-            'ai_audio_base64': ai_audio_base64,
-            'emotion': {
-                'id': str(emotion.id) if emotion else None,
-                'name': emotion.name if emotion else None,
-                'name_ja': emotion.name_ja if emotion else None
-            },
-            'emotion_reason': analysis_result['reason'],
-            'ended_at': timezone.now().isoformat()
-        }
-        print(f"Sending session_ended message. Audio base64 length: {len(ai_audio_base64)}")
-        await self.send(text_data=json.dumps(response_message))
-        print("session_ended message sent successfully")
+        # Send response with audio. The base64 copy is made only now, so it is
+        # not held across the DB and cache awaits above
+        with self.memory.begin('session_ended', len(ai_audio_data or b'')) as payload:
+            # Binary clients receive the audio as separate frames; others get base64 in JSON
+            if binary_audio:
+                ai_audio_base64 = ''
+            else:
+                ai_audio_base64 = base64.b64encode(ai_audio_data).decode('utf-8') if ai_audio_data else ''
+            response_message = {
+                'type': 'session_ended',
+                'session_id': str(session_id),
+                'patient_text': patient_text,
+                'ai_response_text': analysis_result['response'],
+                'ai_audio_base64': ai_audio_base64,
+                'emotion': {
+                    'id': str(emotion.id) if emotion else None,
+                    'name': emotion.name if emotion else None,
+                    'name_ja': emotion.name_ja if emotion else None
+                },
+                'emotion_reason': analysis_result['reason'],
+                'ended_at': ended_at.isoformat()
+            }
+            if streamed_chunks is not None:
+                response_message['audio_chunks'] = streamed_chunks
+            elif binary_audio:
+                response_message['audio_frames'] = count_frames(ai_audio_data or b'')
+            response_text = json.dumps(response_message)
+            payload.mark()
+        del ai_audio_base64, response_message
+        await self.send(text_data=response_text)
+
+        if binary_audio and ai_audio_data:
+            for frame in iter_audio_frames(session_id, ai_audio_data):
+                await self.send(bytes_data=frame)
+        logger.info('Session ended', extra={'emotion': emotion.name if emotion else None})
+
+        # Persist the latency breakdown once the patient has the response
+        try:
+            await database_offload(profile.save)(session.id, time.perf_counter() - started)
+        except Exception:
+            logger.exception('Failed to record session timing')
 
-    @database_sync_to_async
+        # Push the result to doctor dashboards after the patient has it
+        await apublish_session_ended(session)
+
+    async def stream_response(self, session_id, patient_text, binary_audio, analysis_result=None):
+        """Stream the LLM response and push per-sentence TTS audio as it is ready
+
+        TTS for each sentence starts while the LLM is still generating;
+        audio chunks are sent in sentence order. When ``analysis_result`` is
+        already known (speculative hit) only the TTS part is pipelined.
+
+        The session profile gets the duration of the LLM stream as ``llm``
+        and the sum of the per-sentence TTS requests as ``tts``; the two
+        overlap in wall-clock time.
+
+        Returns:
+            tuple: (analysis_result, number of audio chunks sent)
+        """
+        profile = self.profile
+        splitter = SentenceSplitter()
+        pending = asyncio.Queue()
+
+        async def synthesize(sentence):
+            with profile.measure('tts'):
+                return await self.generate_tts(sentence)
+
+        def enqueue(sentence):
+            pending.put_nowait((sentence, asyncio.create_task(synthesize(sentence))))
+
+        async def on_response_text(text):
+            for sentence in splitter.feed(text):
+                enqueue(sentence)
+
+        sender = asyncio.create_task(self.send_tts_chunks(session_id, pending, binary_audio))
+        try:
+            if analysis_result is None:
+                with StageTimer(STAGE_LLM, TRANSPORT_WEBSOCKET, profile=profile) as timer:
+                    analysis_result = await self.llm_service.astream_analysis(patient_text, on_response_text)
+                    if analysis_result['response'] == ERROR_RESPONSE:
+                        timer.outcome = 'fallback'
+            else:
+                await on_response_text(analysis_result['response'])
+            rest = splitter.flush()
+            if rest:
+                enqueue(rest)
+        finally:
+            pending.put_nowait(None)
+
+        return analysis_result, await sender
+
+    async def send_tts_chunks(self, session_id, pending, binary_audio):
+        """Send queued sentence audio to the client in order"""
+        index = 0
+        while True:
+            item = await pending.get()
+            if item is None:
+                return index
+
+            sentence, tts_task = item
+            audio_data = await tts_task
+            if not audio_data:
+                continue
+            if self.profile is not None:
+                self.profile.bytes_out += len(audio_data)
+
+            message = {
+                'type': 'tts_audio_chunk',
+                'session_id': str(session_id),
+                'index': index,
+                'text': sentence,
+            }
+            if binary_audio:
+                message['bytes'] = len(audio_data)
+                await self.send(text_data=json.dumps(message))
+                await self.send(bytes_data=encode_frame(FRAME_TTS_AUDIO, session_id, index, audio_data))
+            else:
+                message['audio_base64'] = base64.b64encode(audio_data).decode('utf-8')
+                await self.send(text_data=json.dumps(message))
+            index += 1
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        with StageTimer(STAGE_SEND, TRANSPORT_WEBSOCKET):
+            await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+
+    @database_offload
     def create_session(self, patient_id):
         """Create new conversation session"""
-        session = ConversationSession.objects.create(
-            patient_id=patient_id,
-            started_at=timezone.now()
-        )
-        # Refresh from DB with patient preloaded to avoid lazy loading in async context
-        return ConversationSession.objects.select_related('patient').get(id=session.id)
+        with StageTimer(STAGE_DB, TRANSPORT_WEBSOCKET):
+            session = ConversationSession.objects.create(
+                patient_id=patient_id,
+                started_at=timezone.now()
+            )
+            # Refresh from DB with patient preloaded to avoid lazy loading in async context
+            return ConversationSession.objects.select_related('patient').get(id=session.id)
+
+    async def resolve_session(self, session_id):
+        """Get the session for a message, from connection state when possible
+
+        Only a session that this connection has not seen yet is loaded from
+        the database; it then becomes the connection's session.
+        """
+        if self.session is not None and str(self.session.id) == str(session_id):
+            return self.session
+
+        session = await self.get_session(session_id)
+        if session is not None:
+            self.session = session
+            bind_log_context(session_id=str(session.id), patient_id=str(session.patient_id))
+            # Continue numbering after chunks uploaded on a previous connection
+            chunks = await self.transcript_chunks(session.id)
+            self.reset_chunk_state(session.id, max(chunks) + 1 if chunks else 0)
+            await self.join_session_group(session.id)
+        return session
+
+    async def join_session_group(self, session_id):
+        """Move this connection to the channel group of session_id (None leaves)"""
+        if self.channel_layer is None:
+            return
+        group = session_group(session_id) if session_id is not None else None
+        if group == self.session_group:
+            return
+        if self.session_group is not None:
+            await self.channel_layer.group_discard(self.session_group, self.channel_name)
+        if group is not None:
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.session_group = group
+
+    # Channel layer events (see events.py and tasks.py)
+    async def analysis_progress(self, event):
+        """Forward end-of-session analysis progress"""
+        await self.send(text_data=json.dumps({**event, 'type': 'analysis_progress'}))
+
+    async def analysis_failed(self, event):
+        """Forward end-of-session analysis failure"""
+        await self.send(text_data=json.dumps({**event, 'type': 'analysis_failed'}))
 
-    @database_sync_to_async
+    async def session_ended(self, event):
+        """Forward the end of a session ended outside this connection (status only)"""
+        if self.session is not None and str(self.session.id) == event.get('session_id'):
+            self.session.ended_at = parse_datetime(event['ended_at'])
+        await self.send(text_data=json.dumps({**event, 'type': 'session_ended'}))
+
+    @database_offload
     def get_session(self, session_id):
         """Get session from database"""
-        try:
-            return ConversationSession.objects.select_related('patient').get(id=session_id)
-        except ConversationSession.DoesNotExist:
-            return None
+        with StageTimer(STAGE_DB, TRANSPORT_WEBSOCKET) as timer:
+            try:
+                return ConversationSession.objects.select_related('patient').get(id=session_id)
+            except ConversationSession.DoesNotExist:
+                timer.outcome = 'not_found'
+                return None
 
-    @database_sync_to_async
+    @database_offload
     def update_session(self, session_id, patient_text, ai_response, emotion, emotion_reason):
-        """Update session with analysis results"""
-        session = ConversationSession.objects.get(id=session_id)
-        session.ended_at = timezone.now()
-        session.patient_text = patient_text
-        session.ai_response_text = ai_response
-        session.emotion = emotion
-        session.emotion_reason = emotion_reason
-        session.save()
-
-    @database_sync_to_async
-    def get_emotion(self, emotion_name):
-        """Get emotion from database"""
-        try:
-            return Emotion.objects.get(name=emotion_name)
-        except Emotion.DoesNotExist:
-            return Emotion.objects.first()
+        """Update session with analysis results
 
-    @sync_to_async
-    def transcribe_audio(self, audio_bytes):
+        Single UPDATE guarded on ended_at so a session ended elsewhere is not
+        overwritten. Returns ended_at, or None if the session was already ended.
+        """
+        now = timezone.now()
+        with StageTimer(STAGE_DB, TRANSPORT_WEBSOCKET) as timer:
+            updated = ConversationSession.objects.filter(
+                id=session_id,
+                ended_at__isnull=True
+            ).update(
+                ended_at=now,
+                patient_text=patient_text,
+                ai_response_text=ai_response,
+                emotion_id=emotion.id if emotion else None,
+                emotion_reason=emotion_reason,
+                updated_at=now
+            )
+            if not updated:
+                timer.outcome = 'conflict'
+        return now if updated else None
+
+    async def get_emotion(self, emotion_name):
+        """Get emotion entry from the in-process registry"""
+        with StageTimer(STAGE_EMOTION, TRANSPORT_WEBSOCKET) as timer:
+            registry = loaded_registry()
+            if registry is None:
+                timer.outcome = 'load'
+                registry = await database_offload(get_registry)()
+            return registry.resolve(emotion_name)
+
+    async def transcribe_audio(self, audio_bytes):
         """Transcribe audio using Deepgram STT"""
-        deepgram_service = DeepgramService()
-        return deepgram_service.transcribe(audio_bytes)
+        with StageTimer(STAGE_STT, TRANSPORT_WEBSOCKET) as timer:
+            text, confidence = await self.deepgram_service.atranscribe(audio_bytes)
+            if not text:
+                timer.outcome = 'empty'
+            return text, confidence
 
-    @sync_to_async
-    def analyze_conversation(self, patient_text):
+    async def analyze_conversation(self, patient_text):
         """Analyze conversation using LLM"""
-        llm_service = LLMService()
-        return llm_service.analyze_conversation(patient_text)
+        with StageTimer(STAGE_LLM, TRANSPORT_WEBSOCKET) as timer:
+            result = await self.llm_service.aanalyze_conversation(patient_text)
+            if result['response'] == ERROR_RESPONSE:
+                timer.outcome = 'fallback'
+            return result
 
-    @sync_to_async
-    def generate_tts(self, text):
+    async def generate_tts(self, text):
         """Generate TTS audio"""
-        deepgram_service = DeepgramService()
-        return deepgram_service.text_to_speech(text)
-
-    # Cache operations (sync to async)
-    @sync_to_async
-    def cache_get(self, key, default=None):
-        """Get value from cache"""
-        return cache.get(key, default)
-
-    @sync_to_async
-    def cache_set(self, key, value, timeout=None):
-        """Set value in cache"""
-        return cache.set(key, value, timeout=timeout)
-
-    @sync_to_async
-    def cache_delete(self, key):
-        """Delete value from cache"""
-        return cache.delete(key)
+        with StageTimer(STAGE_TTS, TRANSPORT_WEBSOCKET) as timer:
+            audio_data = await self.deepgram_service.atext_to_speech(text)
+            if not audio_data:
+                timer.outcome = 'empty'
+            return audio_data
+
+    # Transcript store operations (sync to async)
+    @offload('db')
+    def transcript_start(self, session_id):
+        """Initialize session transcript"""
+        with StageTimer(STAGE_CACHE, TRANSPORT_WEBSOCKET):
+            get_transcript_store().start(session_id)
+
+    @offload('db')
+    def transcript_append(self, session_id, text, seq=None):
+        """Append a transcribed chunk, returns its sequence number"""
+        with StageTimer(STAGE_CACHE, TRANSPORT_WEBSOCKET):
+            return get_transcript_store().append(session_id, text, seq)
+
+    @offload('db')
+    def transcript_read(self, session_id):
+        """Get accumulated text in sequence order"""
+        with StageTimer(STAGE_CACHE, TRANSPORT_WEBSOCKET):
+            return get_transcript_store().read(session_id)
+
+    @offload('db')
+    def transcript_chunks(self, session_id):
+        """Get transcribed chunks as {seq: text}"""
+        with StageTimer(STAGE_CACHE, TRANSPORT_WEBSOCKET):
+            return get_transcript_store().chunks(session_id)
+
+    @offload('db')
+    def transcript_clear(self, session_id):
+        """Delete session transcript"""
+        with StageTimer(STAGE_CACHE, TRANSPORT_WEBSOCKET):
+            get_transcript_store().clear(session_id)
+
+
+class DoctorDashboardConsumer(AsyncWebsocketConsumer):
+    """WebSocket consumer pushing ended sessions to the doctor dashboard
+
+    Subscriptions are per patient (``?patient_id=`` or ``subscribe`` messages)
+    or to every patient (``?all=1`` / ``{"type": "subscribe", "all": true}``).
+
+    Only logged-in Django users (session cookie, AuthMiddlewareStack in
+    config/asgi.py) are accepted: doctors holding the
+    ``conversations.view_conversationsession`` permission may subscribe to
+    existing patients, and only staff to every patient. Others are closed
+    with code 4403.
+    """
+
+    async def connect(self):
+        """Handle WebSocket connection"""
+        self.groups_joined = set()
+        self.user = self.scope.get('user')
+        if not await self.is_dashboard_user():
+            logger.warning('Dashboard connection rejected')
+            await self.close(code=4403)
+            return
+        await self.accept()
+
+        params = parse_qs(self.scope.get('query_string', b'').decode('utf-8'))
+        denied = []
+        for patient_id in params.get('patient_id', []):
+            if await self.can_view_patient(patient_id):
+                await self.subscribe(patient_group(patient_id))
+            else:
+                denied.append(patient_id)
+        if params.get('all', [''])[0] in ('1', 'true'):
+            if self.user.is_staff:
+                await self.subscribe(DASHBOARD_ALL_GROUP)
+            else:
+                denied.append('all')
+
+        message = {
+            'type': 'connection_established',
+            'subscriptions': sorted(self.groups_joined)
+        }
+        if denied:
+            message['denied'] = denied
+        await self.send(text_data=json.dumps(message))
+
+    async def disconnect(self, close_code):
+        """Handle WebSocket disconnection"""
+        for group in list(self.groups_joined):
+            await self.unsubscribe(group)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        """
+        Handle incoming WebSocket messages
+
+        Expected message types:
+        - subscribe: ``patient_id`` または ``all`` の購読
+        - unsubscribe: 購読解除
+        """
+        try:
+            data = json.loads(text_data or '{}')
+        except json.JSONDecodeError:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Invalid JSON'
+            }))
+            return
+
+        message_type = data.get('type')
+        if message_type not in ('subscribe', 'unsubscribe'):
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': f'Unknown message type: {message_type}'
+            }))
+            return
+
+        if data.get('all'):
+            group = DASHBOARD_ALL_GROUP
+            allowed = self.user.is_staff
+        elif data.get('patient_id'):
+            group = patient_group(data['patient_id'])
+            allowed = message_type == 'unsubscribe' or await self.can_view_patient(data['patient_id'])
+        else:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'patient_id or all is required'
+            }))
+            return
+
+        if not allowed:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Permission denied'
+            }))
+            return
+
+        if message_type == 'subscribe':
+            await self.subscribe(group)
+        else:
+            await self.unsubscribe(group)
+        await self.send(text_data=json.dumps({
+            'type': 'subscriptions',
+            'subscriptions': sorted(self.groups_joined)
+        }))
+
+    @database_offload
+    def is_dashboard_user(self):
+        """ログイン済みのスタッフ、またはセッション閲覧権限を持つ医師か"""
+        user = self.user
+        if user is None or not user.is_authenticated:
+            return False
+        return user.is_staff or user.has_perm('conversations.view_conversationsession')
+
+    @database_offload
+    def can_view_patient(self, patient_id):
+        """患者の通知を購読できるか（病棟の割り当てがないため、権限と患者の存在で判定）"""
+        user = self.user
+        if not (user.is_staff or user.has_perm('conversations.view_conversationsession')):
+            return False
+        try:
+            return Patient.objects.filter(id=int(patient_id)).exists()
+        except (TypeError, ValueError):
+            return False
+
+    async def subscribe(self, group):
+        if self.channel_layer is None or group in self.groups_joined:
+            return
+        await self.channel_layer.group_add(group, self.channel_name)
+        self.groups_joined.add(group)
+
+    async def unsubscribe(self, group):
+        if self.channel_layer is None or group not in self.groups_joined:
+            return
+        await self.channel_layer.group_discard(group, self.channel_name)
+        self.groups_joined.discard(group)
+
+    # Channel layer events (see events.py)
+    async def dashboard_session_ended(self, event):
+        """Forward an ended session summary"""
+        await self.send(text_data=json.dumps({
+            'type': 'session_ended',
+            'session': event['session']
+        }))
@@ -0,0 +1,71 @@
+"""
+Session events pushed to WebSocket consumers over the channel layer.
+
+Every ``ConversationConsumer`` joins the group of the session it is serving,
+so code running outside the consumer (REST views, Celery workers) can notify
+the patient's socket. ``DoctorDashboardConsumer`` joins per-patient groups
+(and the all-patients group) and receives a compact summary whenever a
+session ends. Delivery across processes requires a shared channel layer such
+as Redis; with the in-memory layer only same-process senders reach a socket.
+"""
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from .executors import database_offload
+
+# Dashboard group that receives every patient's events (no ward model yet)
+DASHBOARD_ALL_GROUP = 'dashboard_all'
+
+
+def session_group(session_id):
+    """セッションのチャネルグループ名"""
+    return f"session_{session_id}"
+
+
+def patient_group(patient_id):
+    """患者単位のダッシュボード用チャネルグループ名"""
+    return f"dashboard_patient_{patient_id}"
+
+
+def notify_session(session_id, event_type, payload):
+    """セッションのグループにイベントを送信（同期コード用）
+
+    Args:
+        session_id: セッションID
+        event_type (str): チャネルレイヤーのイベント種別（例: ``analysis.progress``）
+        payload (dict): イベント本文
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(
+        session_group(session_id),
+        {'type': event_type, **payload}
+    )
+
+
+def session_summary(session):
+    """ダッシュボード向けのセッション要約（一覧APIと同じ形式・音声なし）"""
+    from .serializers import ConversationSessionSerializer
+
+    return dict(ConversationSessionSerializer(session).data)
+
+
+async def apublish_session_ended(session):
+    """セッション終了をダッシュボードへ通知（非同期コード用）
+
+    ``session`` は ``patient`` を読み込み済みで、終了結果が反映されていること。
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    # Serialising may (re)load the emotion registry, so keep it off the event loop
+    summary = await database_offload(session_summary)(session)
+    event = {'type': 'dashboard.session_ended', 'session': summary}
+    for group in (patient_group(session.patient_id), DASHBOARD_ALL_GROUP):
+        await channel_layer.group_send(group, event)
+
+
+def publish_session_ended(session):
+    """セッション終了をダッシュボードへ通知（同期コード用）"""
+    async_to_sync(apublish_session_ended)(session)
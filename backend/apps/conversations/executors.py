@@ -0,0 +1,155 @@
+"""
+Dedicated thread pools for blocking work in the conversation pipeline.
+
+``@sync_to_async`` defaults to ``thread_sensitive=True``, which runs every
+call on one shared thread per worker. Blocking STT/LLM/TTS HTTP calls and
+DB queries are instead dispatched to per-service pools so a slow provider
+only occupies its own pool.
+"""
+
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from django.conf import settings
+from apps.core.metrics import registry
+
+DEFAULT_POOL_SIZES = {
+    'stt': 8,
+    'llm': 4,
+    'tts': 4,
+    'db': 4,
+}
+
+tasks_submitted = registry.counter(
+    'conversation_executor_tasks_submitted_total',
+    'Tasks submitted to conversation executor pools'
+)
+tasks_completed = registry.counter(
+    'conversation_executor_tasks_completed_total',
+    'Tasks finished by conversation executor pools'
+)
+queue_depth = registry.gauge(
+    'conversation_executor_queue_depth',
+    'Tasks waiting for a free worker thread'
+)
+active_workers = registry.gauge(
+    'conversation_executor_active_workers',
+    'Worker threads currently running a task'
+)
+
+
+class BoundedExecutor(ThreadPoolExecutor):
+    """サイズ固定のスレッドプール（キュー深度を計測）"""
+
+    def __init__(self, name, max_workers):
+        super().__init__(
+            max_workers=max_workers,
+            thread_name_prefix=f'conversation-{name}'
+        )
+        self.name = name
+        self.size = max_workers
+        self._active = 0
+        self._active_lock = threading.Lock()
+
+        queue_depth.set_function(lambda: self.queue_depth, pool=name)
+        active_workers.set_function(lambda: self.active, pool=name)
+
+    @property
+    def queue_depth(self):
+        """実行待ちタスク数"""
+        return self._work_queue.qsize()
+
+    @property
+    def active(self):
+        """実行中タスク数"""
+        return self._active
+
+    def submit(self, fn, /, *args, **kwargs):
+        tasks_submitted.inc(pool=self.name)
+        return super().submit(self._run, fn, *args, **kwargs)
+
+    def _run(self, fn, *args, **kwargs):
+        with self._active_lock:
+            self._active += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._active_lock:
+                self._active -= 1
+            tasks_completed.inc(pool=self.name)
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'active': self.active,
+            'queue_depth': self.queue_depth,
+            'submitted': tasks_submitted.value(pool=self.name),
+            'completed': tasks_completed.value(pool=self.name),
+        }
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_pool_size(name):
+    """設定からプールサイズを取得"""
+    sizes = getattr(settings, 'CONVERSATION_EXECUTORS', {})
+    return int(sizes.get(name, DEFAULT_POOL_SIZES[name]))
+
+
+def get_executor(name):
+    """名前付きプールを取得（プロセス内で一度だけ生成）"""
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = BoundedExecutor(name, get_pool_size(name))
+                _executors[name] = executor
+    return executor
+
+
+def executor_stats():
+    """全プールの統計を返す"""
+    return {name: executor.stats() for name, executor in list(_executors.items())}
+
+
+def shutdown_executors(wait=True):
+    """全プールを停止（ベンチマーク・テスト用）"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
+
+
+def offload(pool_name):
+    """同期関数を指定プールで実行するコルーチンに変換するデコレータ"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await sync_to_async(
+                func,
+                thread_sensitive=False,
+                executor=get_executor(pool_name)
+            )(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def database_offload(func):
+    """DBアクセスを``db``プールで実行するデコレータ
+
+    ``database_sync_to_async``と同様に前後で古い接続をクローズする。
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await database_sync_to_async(
+            func,
+            thread_sensitive=False,
+            executor=get_executor('db')
+        )(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,8 @@
+"""
+Local stand-ins for external speech/LLM APIs.
+
+Used by benchmarks and load tests to exercise the conversation pipeline
+offline without API keys: ``api`` replaces the Deepgram/OpenAI HTTP APIs
+(stand-in, record and replay transports), ``streaming_stt`` the Deepgram
+streaming WebSocket.
+"""
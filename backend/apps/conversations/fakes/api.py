@@ -0,0 +1,333 @@
+"""
+In-process stand-ins for the Deepgram and OpenAI HTTP APIs.
+
+``FakeAPITransport`` is an httpx transport (sync and async) implementing the
+subset the services use:
+
+- ``POST /v1/listen`` (Deepgram pre-recorded STT)
+- ``POST /v1/chat/completions`` (OpenAI, including ``stream: true`` SSE)
+- ``POST /v1/audio/speech`` (OpenAI TTS)
+
+with per-route latency distributions and error injection. Randomness is
+seeded per request body and occurrence, so a replayed workload behaves the
+same regardless of concurrency.
+
+``RecordingTransport`` forwards to the real APIs and saves every response as
+a fixture file; ``ReplayTransport`` serves those fixtures back. Both key
+fixtures by method, path and a hash of the request body (never headers, so
+API keys are not written to disk).
+
+The shared clients in ``services/clients.py`` install these transports when
+``CONVERSATION_FAKE_APIS['MODE']`` is ``fake``, ``record`` or ``replay``.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from pathlib import Path
+import httpx
+
+CANNED_TRANSCRIPTS = [
+    '今日は少し眠れませんでした。',
+    '朝ごはんは食べられました。',
+    'リハビリが少しつらいです。',
+    '家族が面会に来てくれて嬉しかったです。',
+    '特に変わりはありません。',
+]
+
+FAKE_EMOTIONS = ['joy', 'sadness', 'anxiety', 'gratitude', 'neutral']
+
+DEFAULT_ROUTE = {
+    'LATENCY': {'DIST': 'lognormal', 'MEDIAN': 0.3, 'SIGMA': 0.4},
+    'ERROR_RATE': 0.0,
+    'ERROR_STATUS': 503,
+    'TIMEOUT_RATE': 0.0,
+    'TOKEN_INTERVAL': 0.02,
+}
+
+
+def body_key(method, path, body):
+    """リクエストのフィクスチャキー（ヘッダは含めない）"""
+    if body:
+        try:
+            # Canonical JSON so key order / whitespace does not change the key
+            body = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False).encode('utf-8')
+        except (ValueError, UnicodeDecodeError):
+            pass
+    digest = hashlib.sha256(body or b'').hexdigest()[:32]
+    return f"{method.lower()}-{path.strip('/').replace('/', '_')}-{digest}"
+
+
+def sample_latency(rng, latency):
+    """遅延分布から1件サンプリング（秒）"""
+    dist = latency.get('DIST', 'fixed')
+    if dist == 'fixed':
+        return latency.get('VALUE', latency.get('MEDIAN', 0.0))
+    if dist == 'uniform':
+        return rng.uniform(latency.get('MIN', 0.0), latency.get('MAX', 1.0))
+    if dist == 'lognormal':
+        median = latency.get('MEDIAN', 0.3)
+        return rng.lognormvariate(0.0, latency.get('SIGMA', 0.4)) * median
+    raise ValueError(f'Unknown latency distribution: {dist}')
+
+
+def _route_name(path):
+    if path.endswith('/listen'):
+        return 'listen'
+    if path.endswith('/chat/completions'):
+        return 'chat'
+    if path.endswith('/audio/speech'):
+        return 'speech'
+    return None
+
+
+class FakeAPITransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Deepgram / OpenAI のインプロセス代替
+
+    Args:
+        routes: ルート名（listen / chat / speech）ごとの設定（DEFAULT_ROUTEを上書き）
+        seed: 乱数シード
+    """
+
+    def __init__(self, routes=None, seed=0):
+        routes = routes or {}
+        self.routes = {
+            name: {**DEFAULT_ROUTE, **routes.get('DEFAULT', {}), **routes.get(name, {})}
+            for name in ('listen', 'chat', 'speech')
+        }
+        self.seed = seed
+        self._occurrences = {}
+        self._lock = threading.Lock()
+
+    def _plan(self, request, body):
+        """ルート・遅延・注入するエラーを決める"""
+        route = _route_name(request.url.path)
+        if route is None:
+            return None, None, 0.0, None
+        key = body_key(request.method, request.url.path, body)
+        with self._lock:
+            occurrence = self._occurrences.get(key, 0)
+            self._occurrences[key] = occurrence + 1
+        rng = random.Random(f'{self.seed}:{key}:{occurrence}')
+        config = self.routes[route]
+        delay = sample_latency(rng, config['LATENCY'])
+        roll = rng.random()
+        if roll < config['TIMEOUT_RATE']:
+            fault = 'timeout'
+        elif roll < config['TIMEOUT_RATE'] + config['ERROR_RATE']:
+            fault = 'error'
+        else:
+            fault = None
+        return route, config, delay, fault
+
+    def handle_request(self, request):
+        body = request.read()
+        route, config, delay, fault = self._plan(request, body)
+        time.sleep(delay)
+        return self._respond(request, body, route, config, fault, stream=self._sync_stream)
+
+    async def handle_async_request(self, request):
+        body = await request.aread()
+        route, config, delay, fault = self._plan(request, body)
+        await asyncio.sleep(delay)
+        return self._respond(request, body, route, config, fault, stream=self._async_stream)
+
+    def _respond(self, request, body, route, config, fault, stream):
+        if route is None:
+            return httpx.Response(404, json={'error': f'not faked: {request.url.path}'})
+        if fault == 'timeout':
+            raise httpx.ReadTimeout('Injected timeout', request=request)
+        if fault == 'error':
+            return httpx.Response(config['ERROR_STATUS'], json={'error': {'message': 'Injected error'}})
+
+        if route == 'listen':
+            return httpx.Response(200, json=self.listen_result(body))
+        if route == 'speech':
+            return httpx.Response(200, headers={'Content-Type': 'audio/mpeg'}, content=self.speech_audio(body))
+
+        payload = json.loads(body)
+        content = self.chat_content(payload)
+        if payload.get('stream'):
+            events = [self.chat_chunk(payload, piece) for piece in self._pieces(content)]
+            events.append(b'data: [DONE]\n\n')
+            return httpx.Response(
+                200,
+                headers={'Content-Type': 'text/event-stream'},
+                content=stream(events, config['TOKEN_INTERVAL'])
+            )
+        return httpx.Response(200, json=self.chat_completion(payload, content))
+
+    @staticmethod
+    def _sync_stream(events, interval):
+        for event in events:
+            time.sleep(interval)
+            yield event
+
+    @staticmethod
+    async def _async_stream(events, interval):
+        for event in events:
+            await asyncio.sleep(interval)
+            yield event
+
+    @staticmethod
+    def _pieces(content, size=4):
+        return [content[i:i + size] for i in range(0, len(content), size)]
+
+    @staticmethod
+    def _pick(options, data):
+        return options[int(hashlib.sha256(data).hexdigest(), 16) % len(options)]
+
+    def listen_result(self, audio):
+        """Deepgram /v1/listen のレスポンス"""
+        transcript = self._pick(CANNED_TRANSCRIPTS, audio) if audio else ''
+        return {
+            'metadata': {'request_id': hashlib.sha256(audio).hexdigest()[:16], 'duration': len(audio) / 16000},
+            'results': {
+                'channels': [{'alternatives': [{'transcript': transcript, 'confidence': 0.95}]}]
+            },
+        }
+
+    def speech_audio(self, body):
+        """TTS音声（入力テキストに比例した長さの決定的なバイト列）"""
+        text = json.loads(body).get('input', '')
+        seed = hashlib.sha256(text.encode('utf-8')).digest()
+        return b'ID3' + seed * max(1, len(text) * 8)
+
+    def chat_content(self, payload):
+        """LLMService が期待する JSON 文字列"""
+        prompt = payload['messages'][-1]['content']
+        match = re.search(r'選んでください:\s*\n\s*(.+)', prompt)
+        emotions = [e.strip() for e in match.group(1).split(',')] if match else FAKE_EMOTIONS
+        emotion = self._pick(emotions, prompt.encode('utf-8'))
+        return json.dumps({
+            'response': 'お話しくださってありがとうございます。無理せず過ごしてくださいね。',
+            'emotion': emotion,
+            'reason': '発話内容から推定した感情です（スタンドイン応答）。',
+        }, ensure_ascii=False)
+
+    @staticmethod
+    def chat_completion(payload, content):
+        return {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+        }
+
+    @staticmethod
+    def chat_chunk(payload, piece):
+        chunk = {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': payload.get('model', 'fake'),
+            'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}],
+        }
+        return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8')
+
+
+class FixtureStore:
+    """レスポンスのフィクスチャファイル（1リクエスト1ファイル）"""
+
+    # Response headers worth keeping; everything else (cookies, request ids) is dropped
+    KEEP_HEADERS = ('content-type',)
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, key):
+        return self.directory / f'{key}.json'
+
+    def save(self, request, body, response, content):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        key = body_key(request.method, request.url.path, body)
+        record = {
+            'request': {
+                'method': request.method,
+                'path': request.url.path,
+                'body_sha256': hashlib.sha256(body or b'').hexdigest(),
+            },
+            'response': {
+                'status': response.status_code,
+                'headers': {k: v for k, v in response.headers.items() if k.lower() in self.KEEP_HEADERS},
+                'body_base64': base64.b64encode(content).decode('ascii'),
+            },
+        }
+        self.path(key).write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    def load(self, request, body):
+        key = body_key(request.method, request.url.path, body)
+        try:
+            record = json.loads(self.path(key).read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return httpx.Response(
+                501,
+                json={'error': {'message': f'No fixture for {request.method} {request.url.path} ({key})'}}
+            )
+        response = record['response']
+        return httpx.Response(
+            response['status'],
+            headers=response['headers'],
+            content=base64.b64decode(response['body_base64'])
+        )
+
+
+class RecordingTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """実APIへ転送し、レスポンスをフィクスチャとして保存"""
+
+    def __init__(self, directory, transport=None, async_transport=None):
+        self.store = FixtureStore(directory)
+        self.transport = transport or httpx.HTTPTransport()
+        self.async_transport = async_transport or httpx.AsyncHTTPTransport()
+
+    def handle_request(self, request):
+        body = request.read()
+        response = self.transport.handle_request(request)
+        content = response.read()
+        response.close()
+        self.store.save(request, body, response, content)
+        return httpx.Response(response.status_code, headers=self._headers(response), content=content)
+
+    async def handle_async_request(self, request):
+        body = await request.aread()
+        response = await self.async_transport.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        self.store.save(request, body, response, content)
+        return httpx.Response(response.status_code, headers=self._headers(response), content=content)
+
+    @staticmethod
+    def _headers(response):
+        # The body has already been decoded and buffered
+        skip = ('content-encoding', 'content-length', 'transfer-encoding')
+        return [(k, v) for k, v in response.headers.items() if k.lower() not in skip]
+
+    def close(self):
+        self.transport.close()
+
+    async def aclose(self):
+        await self.async_transport.aclose()
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """保存済みフィクスチャを返す（該当なしは501）"""
+
+    def __init__(self, directory):
+        self.store = FixtureStore(directory)
+
+    def handle_request(self, request):
+        return self.store.load(request, request.read())
+
+    async def handle_async_request(self, request):
+        return self.store.load(request, await request.aread())
@@ -0,0 +1,89 @@
+"""
+Local stand-in for the Deepgram streaming ``/v1/listen`` WebSocket.
+
+Every binary audio message produces an interim ``Results`` event with one
+more token of a canned transcript; every ``final_every`` messages (and on
+``CloseStream``) the accumulated tokens are sent as a final result.
+"""
+
+import asyncio
+import json
+
+try:
+    from websockets.asyncio.server import serve
+except ImportError:  # pragma: no cover - optional dependency
+    serve = None
+
+DEFAULT_TOKENS = ['今日は', '少し', '眠れ', 'ませんでした。', 'でも', '朝ごはんは', '食べられました。']
+
+
+def results_message(transcript, is_final, confidence=0.95):
+    """Deepgram形式の Results メッセージ"""
+    return json.dumps({
+        'type': 'Results',
+        'is_final': is_final,
+        'channel': {
+            'alternatives': [{'transcript': transcript, 'confidence': confidence}]
+        },
+    }, ensure_ascii=False)
+
+
+class FakeStreamingSTTServer:
+    """ストリーミングSTTのローカルサーバ
+
+    Args:
+        latency: 音声メッセージ受信から結果送信までの遅延（秒）
+        final_every: 何チャンクごとに確定結果を返すか
+        tokens: 書き起こしとして返すトークン列
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.05, final_every=5, tokens=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.final_every = final_every
+        self.tokens = tokens or DEFAULT_TOKENS
+        self._server = None
+
+    @property
+    def url(self):
+        return f'ws://{self.host}:{self.port}/v1/listen'
+
+    async def start(self):
+        if serve is None:
+            raise RuntimeError('FakeStreamingSTTServer requires the "websockets" package')
+        self._server = await serve(self._handle, self.host, self.port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _handle(self, connection):
+        pending = []
+        chunks = 0
+        async for message in connection:
+            if isinstance(message, bytes):
+                chunks += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                pending.append(self.tokens[(chunks - 1) % len(self.tokens)])
+                is_final = chunks % self.final_every == 0
+                await connection.send(results_message(''.join(pending), is_final))
+                if is_final:
+                    pending = []
+                continue
+
+            if json.loads(message).get('type') == 'CloseStream':
+                if pending:
+                    await connection.send(results_message(''.join(pending), True))
+                break
@@ -0,0 +1,137 @@
+"""
+End-of-session analysis shared by the REST view and the Celery task.
+
+Reads the accumulated transcript, runs LLM analysis and TTS, and stores the
+result with a single UPDATE guarded on ``ended_at`` so a session that was
+ended elsewhere (WebSocket, a duplicate request) is never overwritten.
+"""
+
+import base64
+import logging
+import time
+from django.db import DatabaseError
+from django.utils import timezone
+from apps.emotions.registry import get_registry
+from .events import publish_session_ended
+from .instrumentation import (
+    STAGE_CACHE,
+    STAGE_DB,
+    STAGE_EMOTION,
+    STAGE_LLM,
+    STAGE_TTS,
+    TRANSPORT_REST,
+    StageTimer,
+)
+from .models import ConversationSession
+from .services import DeepgramService, LLMService
+from .services.llm_service import ERROR_RESPONSE
+from .timing import SessionProfile
+from .transcripts import get_transcript_store, join_chunks
+
+logger = logging.getLogger(__name__)
+
+# Progress stages reported through the ``progress`` callback, in order
+STAGES = ('transcript', 'analysis', 'tts', 'saving')
+
+
+class SessionAlreadyEnded(Exception):
+    """セッションが既に終了している"""
+
+
+def finalize_session(session_id, progress=None, transport=TRANSPORT_REST, chunks=None):
+    """
+    セッションを解析・保存して終了する
+
+    Args:
+        session_id: セッションID
+        progress: ``progress(stage)`` 各段階の開始時に呼ばれる（STAGES参照）
+        transport: 段階別メトリクスの transport ラベル（rest / celery）
+        chunks: トランスクリプト ``{seq: text}``（None ならストアから読む）
+
+    Returns:
+        dict: セッション終了レスポンス（音声はBase64）
+
+    Raises:
+        SessionAlreadyEnded: 保存時点で既に終了していた場合
+    """
+    def report(stage):
+        if progress is not None:
+            progress(stage)
+
+    started = time.perf_counter()
+    profile = SessionProfile(transport)
+
+    # Assemble accumulated text in sequence order
+    report('transcript')
+    store = get_transcript_store()
+    with StageTimer(STAGE_CACHE, transport):
+        if chunks is None:
+            chunks = store.chunks(session_id)
+        profile.load_parked(session_id, chunks)
+    patient_text = join_chunks(chunks)
+
+    # LLM analysis (errors are handled in LLMService, which returns ERROR_RESPONSE)
+    report('analysis')
+    with StageTimer(STAGE_LLM, transport, profile=profile) as timer:
+        analysis_result = LLMService().analyze_conversation(patient_text)
+        if analysis_result['response'] == ERROR_RESPONSE:
+            timer.outcome = 'fallback'
+
+    # Resolve emotion from the registry
+    with StageTimer(STAGE_EMOTION, transport):
+        emotion = get_registry().resolve(analysis_result['emotion'])
+
+    # Generate TTS audio
+    report('tts')
+    with StageTimer(STAGE_TTS, transport, profile=profile) as timer:
+        ai_audio_data = DeepgramService().text_to_speech(analysis_result['response'])
+        if not ai_audio_data:
+            timer.outcome = 'empty'
+    profile.bytes_out = len(ai_audio_data or b'')
+    ai_audio_base64 = base64.b64encode(ai_audio_data).decode('utf-8') if ai_audio_data else ''
+
+    # Update session
+    report('saving')
+    now = timezone.now()
+    with StageTimer(STAGE_DB, transport, profile=profile) as timer:
+        updated = ConversationSession.objects.filter(
+            id=session_id,
+            ended_at__isnull=True
+        ).update(
+            ended_at=now,
+            patient_text=patient_text,
+            ai_response_text=analysis_result['response'],
+            emotion_id=emotion.id if emotion else None,
+            emotion_reason=analysis_result['reason'],
+            updated_at=now
+        )
+        if not updated:
+            timer.outcome = 'conflict'
+    if not updated:
+        raise SessionAlreadyEnded(session_id)
+
+    # Clear transcript
+    with StageTimer(STAGE_CACHE, transport):
+        store.clear(session_id)
+
+    try:
+        profile.save(session_id, time.perf_counter() - started)
+    except DatabaseError:
+        logger.exception('Failed to record session timing')
+
+    # Push the result to doctor dashboards
+    publish_session_ended(ConversationSession.objects.select_related('patient').get(id=session_id))
+
+    return {
+        'session_id': str(session_id),
+        'patient_text': patient_text,
+        'ai_response_text': analysis_result['response'],
+        'ai_audio_base64': ai_audio_base64,
+        'emotion': {
+            'id': str(emotion.id) if emotion else None,
+            'name': emotion.name if emotion else None,
+            'name_ja': emotion.name_ja if emotion else None
+        },
+        'emotion_reason': analysis_result['reason'],
+        'ended_at': now.isoformat()
+    }
@@ -0,0 +1,82 @@
+"""
+Per-stage latency metrics for the conversation pipeline.
+
+``StageTimer`` times a block into the ``conversation_stage_seconds``
+histogram, labelled by pipeline stage, transport and outcome::
+
+    with StageTimer('stt', 'websocket') as timer:
+        text, confidence = await service.atranscribe(audio)
+        if not text:
+            timer.outcome = 'empty'
+
+The outcome is ``ok`` unless the block sets another one, ``error`` when the
+block raises and ``cancelled`` on task cancellation. Exceptions are also
+counted by class in ``conversation_stage_errors_total``. The histogram's
+``_count`` series is the per-outcome request counter. Both are exposed on
+``/metrics`` (apps/core/views.py).
+
+With ``profile=`` the duration is also added to the session's
+``SessionProfile`` (timing.py); ``timer.elapsed`` holds it after the block.
+
+The hot path is one ``perf_counter()`` pair and a bucket bisect under a
+short lock; nothing is formatted until the endpoint is scraped.
+"""
+
+import asyncio
+import time
+from apps.core.metrics import registry
+
+# Pipeline stages (label values of ``stage``)
+STAGE_DECODE = 'decode'      # base64 decode of uploaded audio
+STAGE_STT = 'stt'            # speech-to-text
+STAGE_CACHE = 'cache'        # transcript store operations
+STAGE_LLM = 'llm'            # response / emotion analysis
+STAGE_EMOTION = 'emotion'    # emotion registry lookup
+STAGE_TTS = 'tts'            # text-to-speech
+STAGE_DB = 'db'              # session reads and writes
+STAGE_SEND = 'send'          # WebSocket send
+
+# Transports (label values of ``transport``)
+TRANSPORT_WEBSOCKET = 'websocket'
+TRANSPORT_REST = 'rest'
+TRANSPORT_CELERY = 'celery'
+
+stage_seconds = registry.histogram(
+    'conversation_stage_seconds',
+    'Latency of conversation pipeline stages by transport and outcome'
+)
+stage_errors = registry.counter(
+    'conversation_stage_errors_total',
+    'Exceptions raised in conversation pipeline stages'
+)
+
+
+class StageTimer:
+    """パイプライン段階の所要時間を計測するコンテキストマネージャ"""
+
+    __slots__ = ('stage', 'transport', 'outcome', 'profile', 'started', 'elapsed')
+
+    def __init__(self, stage, transport, outcome='ok', profile=None):
+        self.stage = stage
+        self.transport = transport
+        self.outcome = outcome
+        self.profile = profile
+        self.elapsed = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = self.elapsed = time.perf_counter() - self.started
+        if self.profile is not None:
+            self.profile.add(self.stage, elapsed)
+        outcome = self.outcome
+        if exc_type is not None:
+            if issubclass(exc_type, asyncio.CancelledError):
+                outcome = 'cancelled'
+            else:
+                outcome = 'error'
+                stage_errors.inc(stage=self.stage, transport=self.transport, error=exc_type.__name__)
+        stage_seconds.observe(elapsed, stage=self.stage, transport=self.transport, outcome=outcome)
+        return False
@@ -0,0 +1,90 @@
+"""
+Benchmark adaptive chunk coalescing.
+
+Replays a client that uploads ``--chunks`` chunks of ``--chunk-bytes`` every
+``--interval`` seconds against a simulated STT whose latency is a fixed
+per-request overhead plus a per-KiB cost, once without coalescing and once
+per ``--max-bytes`` threshold. Reports the number of STT requests and the
+end-to-end latency from chunk arrival to its transcript being available.
+"""
+
+import asyncio
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from apps.conversations.coalescing import ChunkCoalescer
+
+
+class Command(BaseCommand):
+    help = 'Compare STT request count and latency with and without chunk coalescing (offline)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunks', type=int, default=50)
+        parser.add_argument('--chunk-bytes', type=int, default=2000)
+        parser.add_argument('--interval', type=float, default=0.05,
+                            help='Seconds between chunks')
+        parser.add_argument('--overhead', type=float, default=0.3,
+                            help='Simulated per-request STT latency in seconds')
+        parser.add_argument('--per-kib', type=float, default=0.002,
+                            help='Simulated STT latency per KiB of audio')
+        parser.add_argument('--max-inflight', type=int, default=3)
+        parser.add_argument('--max-bytes', type=int, nargs='+', default=[8192, 16384, 32768])
+        parser.add_argument('--max-delay', type=float, default=1.0)
+        parser.add_argument('--idle', type=float, default=0.3)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'mode':>18} {'requests':>9} {'p50 ms':>9} {'p95 ms':>9} {'last ms':>9}")
+        self.report('no coalescing', asyncio.run(self.run(options, None)))
+        for max_bytes in options['max_bytes']:
+            self.report(f'max_bytes={max_bytes}', asyncio.run(self.run(options, max_bytes)))
+
+    def report(self, label, result):
+        requests, latencies, last = result
+        latencies = sorted(latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f'{label:>18} {requests:>9} {statistics.median(latencies) * 1000:>9.1f} '
+            f'{p95 * 1000:>9.1f} {last * 1000:>9.1f}'
+        )
+
+    async def run(self, options, max_bytes):
+        semaphore = asyncio.Semaphore(options['max_inflight'])
+        arrivals = {}
+        latencies = []
+        tasks = set()
+        requests = 0
+
+        async def transcribe(seqs, audio_bytes):
+            async with semaphore:
+                await asyncio.sleep(options['overhead'] + options['per_kib'] * len(audio_bytes) / 1024)
+            done = time.monotonic()
+            for seq in seqs:
+                latencies.append(done - arrivals[seq])
+
+        def dispatch(seqs, audio_bytes):
+            nonlocal requests
+            requests += 1
+            task = asyncio.create_task(transcribe(seqs, audio_bytes))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        coalescer = None
+        if max_bytes is not None:
+            coalescer = ChunkCoalescer(dispatch, max_bytes, options['max_delay'], options['idle'])
+
+        chunk = bytes(options['chunk_bytes'])
+        for seq in range(options['chunks']):
+            arrivals[seq] = time.monotonic()
+            if coalescer is not None:
+                coalescer.add(seq, chunk)
+            else:
+                dispatch([seq], chunk)
+            await asyncio.sleep(options['interval'])
+        last_sent = time.monotonic()
+
+        # Like end_session: flush what is buffered and wait for the transcripts
+        if coalescer is not None:
+            coalescer.flush('end')
+        while tasks:
+            await asyncio.gather(*list(tasks))
+        return requests, latencies, time.monotonic() - last_sent
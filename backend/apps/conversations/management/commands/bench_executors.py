@@ -0,0 +1,82 @@
+"""
+Benchmark conversation pipeline throughput with simulated patients.
+
+Each simulated patient performs ``--chunks`` blocking STT calls followed by
+one LLM and one TTS call. Provider latency is simulated with ``time.sleep``
+so no API keys are required. The same workload is run through the legacy
+``sync_to_async`` (single shared thread) path and the dedicated pools.
+"""
+
+import asyncio
+import time
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from apps.conversations.executors import offload, executor_stats, shutdown_executors
+
+
+class Command(BaseCommand):
+    help = 'Benchmark STT/LLM/TTS executor pools with N concurrent simulated patients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', default='1,5,10,20',
+                            help='Comma separated list of concurrent patient counts')
+        parser.add_argument('--chunks', type=int, default=3,
+                            help='process_audio messages per patient')
+        parser.add_argument('--stt-latency', type=float, default=0.3,
+                            help='Simulated STT latency in seconds')
+        parser.add_argument('--llm-latency', type=float, default=0.8,
+                            help='Simulated LLM latency in seconds')
+        parser.add_argument('--tts-latency', type=float, default=0.5,
+                            help='Simulated TTS latency in seconds')
+
+    def handle(self, *args, **options):
+        counts = [int(n) for n in options['patients'].split(',') if n.strip()]
+        latencies = {
+            'stt': options['stt_latency'],
+            'llm': options['llm_latency'],
+            'tts': options['tts_latency'],
+        }
+
+        self.stdout.write(f"{'mode':<8} {'patients':>8} {'seconds':>9} {'sessions/s':>11}")
+        for count in counts:
+            for mode in ('legacy', 'pools'):
+                elapsed = asyncio.run(
+                    self.run_workload(mode, count, options['chunks'], latencies)
+                )
+                self.stdout.write(
+                    f'{mode:<8} {count:>8} {elapsed:>9.2f} {count / elapsed:>11.2f}'
+                )
+
+        self.stdout.write('\nPool stats:')
+        for name, stats in executor_stats().items():
+            self.stdout.write(f'  {name}: {stats}')
+        shutdown_executors()
+
+    async def run_workload(self, mode, patients, chunks, latencies):
+        """指定モードで全患者のセッションを並行実行し、経過秒数を返す"""
+        if mode == 'legacy':
+            calls = {
+                name: sync_to_async(self.blocking_call(delay))
+                for name, delay in latencies.items()
+            }
+        else:
+            calls = {
+                name: offload(name)(self.blocking_call(delay))
+                for name, delay in latencies.items()
+            }
+
+        async def patient_session():
+            for _ in range(chunks):
+                await calls['stt']()
+            await calls['llm']()
+            await calls['tts']()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(patient_session() for _ in range(patients)))
+        return time.perf_counter() - started
+
+    @staticmethod
+    def blocking_call(delay):
+        def call():
+            time.sleep(delay)
+        return call
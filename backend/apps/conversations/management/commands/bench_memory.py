@@ -0,0 +1,230 @@
+"""
+Benchmark worker memory with N concurrent conversation sessions.
+
+Each simulated session handles its payloads the way ``ConversationConsumer``
+does: ``--chunks`` ``process_audio`` messages (the frame text as delivered
+by the ASGI server, the frame-length limit, JSON parsing and base64 decoding
+via ``decode_audio_field``, the decoded audio held while STT is awaited) and
+one ``session_ended`` response carrying a ``--tts-bytes`` MP3 as base64 in
+the JSON dump, or as binary frames with ``--binary``. Provider latency is
+simulated with ``asyncio.sleep``, so no API keys, database or channel layer
+are needed.
+
+Reports the RSS before the run and its peak (sampled from /proc and
+``ru_maxrss``), the peak growth per session, and with ``--tracemalloc`` the
+traced memory per message type from ``MemoryAccount``. Run one
+configuration per process: memory freed by a run is not necessarily
+returned to the OS, which would inflate the baseline of the next one.
+"""
+
+import asyncio
+import base64
+import gc
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import tracemalloc
+from django.core.management.base import BaseCommand
+from apps.conversations.memory import MemoryAccount, decode_audio_field, ensure_tracing
+from apps.conversations.protocol import FRAME_AUDIO_CHUNK, decode_frame, encode_frame, iter_audio_frames
+
+MIB = 1024 * 1024
+
+
+def current_rss():
+    """現在のRSS（バイト、/proc がなければ None）"""
+    try:
+        with open('/proc/self/status', encoding='ascii') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def max_rss():
+    """プロセス開始以降のRSSの最大値（バイト）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RSSSampler:
+    """別スレッドでRSSを定期的に読み、最大値を保持"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.peak = current_rss() or 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, name='rss-sampler', daemon=True)
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss() or 0)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+class Command(BaseCommand):
+    help = 'Measure peak RSS of N concurrent simulated conversation sessions to size worker memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=500)
+        parser.add_argument('--chunks', type=int, default=5,
+                            help='process_audio messages per session')
+        parser.add_argument('--chunk-bytes', type=int, default=16000,
+                            help='Decoded audio bytes per chunk')
+        parser.add_argument('--tts-bytes', type=int, default=200000,
+                            help='MP3 bytes in session_ended')
+        parser.add_argument('--binary', action='store_true',
+                            help='Binary audio frames instead of base64 JSON')
+        parser.add_argument('--stt-latency', type=float, default=0.5)
+        parser.add_argument('--llm-latency', type=float, default=1.0)
+        parser.add_argument('--tts-latency', type=float, default=0.5)
+        parser.add_argument('--send-time', type=float, default=0.05,
+                            help='Seconds a sent message stays buffered by the server')
+        parser.add_argument('--think-time', type=float, default=1.0)
+        parser.add_argument('--ramp', type=float, default=2.0,
+                            help='Seconds over which sessions start')
+        parser.add_argument('--tracemalloc', action='store_true',
+                            help='Account traced memory per message type (slower)')
+        parser.add_argument('--sample-interval', type=float, default=0.005)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.accounts = []
+        self.rejected = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        if options['tracemalloc']:
+            ensure_tracing()
+
+        gc.collect()
+        before = current_rss()
+        with RSSSampler(options['sample_interval']) as sampler:
+            asyncio.run(self.run())
+        self.report(before, sampler.peak)
+
+    async def run(self):
+        await asyncio.gather(*(self.session(index) for index in range(self.options['sessions'])))
+
+    async def session(self, index):
+        options = self.options
+        rng = random.Random(options['seed'] + index)
+        account = MemoryAccount(tracing=options['tracemalloc'])
+        self.accounts.append(account)
+        await asyncio.sleep(rng.uniform(0, options['ramp']))
+
+        for seq in range(options['chunks']):
+            await self.receive(account, self.client_frame(index, seq))
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * options['think_time'])
+
+        await asyncio.sleep(options['llm_latency'] + options['tts_latency'])
+        await self.send_session_ended(account, index, os.urandom(options['tts_bytes']))
+
+    def client_frame(self, session_id, seq):
+        """クライアントが送る process_audio（ASGIサーバから渡される形）"""
+        audio = os.urandom(self.options['chunk_bytes'])
+        if self.options['binary']:
+            return encode_frame(FRAME_AUDIO_CHUNK, session_id, seq, audio)
+        return json.dumps({
+            'type': 'process_audio',
+            'session_id': str(session_id),
+            'seq': seq,
+            'audio_data': 'data:audio/webm;base64,' + base64.b64encode(audio).decode('ascii'),
+        })
+
+    async def receive(self, account, frame):
+        """ConversationConsumer.receive と同じ順序で受信メッセージを処理"""
+        binary = isinstance(frame, bytes)
+        if len(frame) > account.frame_limit(binary):
+            self.rejected += 1
+            return
+        message = account.begin('binary_audio' if binary else None, len(frame))
+        try:
+            if binary:
+                audio_bytes = decode_frame(frame).payload
+                message.mark()
+            else:
+                data = json.loads(frame)
+                message.mark(data.get('type'))
+                audio_bytes = decode_audio_field(data, message)
+            # STT in flight: the decoded audio and the frame (held by the ASGI message) stay alive
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(self.options['stt_latency'])
+            finally:
+                self.in_flight -= 1
+            del audio_bytes
+        finally:
+            message.finish()
+
+    async def send_session_ended(self, account, session_id, audio):
+        binary = self.options['binary']
+        with account.begin('session_ended', len(audio)) as payload:
+            audio_base64 = '' if binary else base64.b64encode(audio).decode('utf-8')
+            text = json.dumps({
+                'type': 'session_ended',
+                'session_id': str(session_id),
+                'patient_text': '今日は少し眠れませんでした。',
+                'ai_response_text': 'そうでしたか。お昼に少し休めるといいですね。',
+                'ai_audio_base64': audio_base64,
+                'emotion': {'id': None, 'name': None, 'name_ja': None},
+                'emotion_reason': '',
+            })
+            payload.mark()
+        del audio_base64
+        await asyncio.sleep(self.options['send_time'])
+        del text
+        if binary:
+            for _ in iter_audio_frames(session_id, audio):
+                await asyncio.sleep(0)
+
+    def report(self, before, sampled_peak):
+        options = self.options
+        peak = max(sampled_peak, max_rss())
+        sessions = options['sessions']
+        self.stdout.write(
+            f"{sessions} sessions, {options['chunks']} x {options['chunk_bytes']} B chunks, "
+            f"{options['tts_bytes']} B TTS, {'binary' if options['binary'] else 'base64 JSON'}"
+        )
+        self.stdout.write(f"max concurrent STT (decoded audio held): {self.max_in_flight}")
+        if self.rejected:
+            self.stdout.write(f'rejected (MAX_PAYLOAD_BYTES): {self.rejected}')
+        if before is None:
+            self.stdout.write(f'RSS peak (ru_maxrss): {peak / MIB:.1f} MiB')
+        else:
+            growth = peak - before
+            self.stdout.write(f'RSS before: {before / MIB:.1f} MiB')
+            self.stdout.write(f'RSS peak:   {peak / MIB:.1f} MiB')
+            self.stdout.write(
+                f'growth:     {growth / MIB:.1f} MiB ({growth / sessions / 1024:.1f} KiB per session)'
+            )
+
+        if not options['tracemalloc']:
+            return
+        self.stdout.write(f'tracemalloc peak: {tracemalloc.get_traced_memory()[1] / MIB:.1f} MiB')
+        totals = {}
+        for account in self.accounts:
+            for message_type, (messages, size, traced) in account.totals.items():
+                entry = totals.setdefault(message_type, [0, 0, 0])
+                entry[0] += messages
+                entry[1] += size
+                entry[2] = max(entry[2], traced)
+        self.stdout.write(f"\n{'message type':<16} {'messages':>9} {'mean KiB':>9} {'max traced KiB':>15}")
+        for message_type, (messages, size, traced) in sorted(totals.items()):
+            self.stdout.write(
+                f'{message_type:<16} {messages:>9} {size / messages / 1024:>9.1f} {traced / 1024:>15.1f}'
+            )
@@ -0,0 +1,101 @@
+"""
+Benchmark the pre-STT voice-activity trimming stage.
+
+Runs VoiceActivityTrimmer over recorded audio fixtures (every file in
+``--fixtures``) and reports, per file and in total, the audio seconds and
+upload bytes that would no longer be sent to STT, plus processing time.
+Without fixtures, ``--synthetic`` recordings (silence / tone / silence) are
+generated so the stage can be checked offline.
+"""
+
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from apps.conversations.services.vad import (
+    SAMPLE_RATE,
+    VoiceActivityTrimmer,
+    encode_wav,
+    np,
+    vad_available,
+)
+
+AUDIO_SUFFIXES = {'.webm', '.wav', '.mp3', '.ogg', '.m4a', '.flac'}
+
+
+class Command(BaseCommand):
+    help = 'Measure seconds/bytes saved by VAD trimming over audio fixtures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fixtures', help='Directory of recorded audio files')
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help='Number of generated recordings when no fixtures are given')
+        parser.add_argument('--format', choices=['webm', 'wav'], default='webm',
+                            help='Encoding of trimmed audio')
+
+    def handle(self, *args, **options):
+        if not vad_available():
+            raise CommandError('VAD needs numpy (uv sync --extra vad) and an ffmpeg binary')
+
+        samples = self.load_fixtures(options['fixtures']) if options['fixtures'] else []
+        samples += self.synthetic(options['synthetic'])
+        if not samples:
+            raise CommandError('Give --fixtures DIR and/or --synthetic N')
+
+        trimmer = VoiceActivityTrimmer({'ENABLED': True, 'OUTPUT_FORMAT': options['format']})
+        totals = {'in_s': 0.0, 'kept_s': 0.0, 'in_b': 0, 'out_b': 0, 'elapsed': 0.0}
+
+        for name, audio in samples:
+            content_type = 'audio/wav' if name.endswith('.wav') else 'audio/webm'
+            started = time.perf_counter()
+            result = trimmer.process(audio, content_type)
+            elapsed = time.perf_counter() - started
+
+            sent = len(result.audio) if result.audio is not None else 0
+            in_s = result.input_seconds or 0.0
+            kept_s = result.kept_seconds if result.kept_seconds is not None else in_s
+            self.stdout.write(
+                f'{name:30} {result.outcome:9} {in_s:6.2f}s -> {kept_s:6.2f}s  '
+                f'{len(audio):8d}B -> {sent:8d}B  {elapsed * 1000:7.1f}ms'
+            )
+            totals['in_s'] += in_s
+            totals['kept_s'] += kept_s
+            totals['in_b'] += len(audio)
+            totals['out_b'] += sent
+            totals['elapsed'] += elapsed
+
+        saved_s = totals['in_s'] - totals['kept_s']
+        self.stdout.write('')
+        self.stdout.write(f"files:          {len(samples)}")
+        self.stdout.write(f"audio seconds:  {totals['in_s']:.2f} -> {totals['kept_s']:.2f} (saved {saved_s:.2f}s)")
+        self.stdout.write(f"upload bytes:   {totals['in_b']} -> {totals['out_b']} (saved {totals['in_b'] - totals['out_b']})")
+        self.stdout.write(f"processing:     {totals['elapsed'] * 1000:.1f}ms total")
+
+    @staticmethod
+    def load_fixtures(directory):
+        path = Path(directory)
+        if not path.is_dir():
+            raise CommandError(f'Not a directory: {directory}')
+        return [
+            (p.name, p.read_bytes())
+            for p in sorted(path.iterdir())
+            if p.suffix.lower() in AUDIO_SUFFIXES
+        ]
+
+    @staticmethod
+    def synthetic(count):
+        """前後に無音がある録音（最後の1件は無音のみ）を生成"""
+        rng = np.random.default_rng(0)
+        samples = []
+        for i in range(count):
+            lead, speech, tail = 1.0 + i % 3, 0.0 if i == count - 1 else 2.0, 1.5
+            t = np.arange(int(speech * SAMPLE_RATE)) / SAMPLE_RATE
+            voice = 0.3 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+            signal = np.concatenate([
+                np.zeros(int(lead * SAMPLE_RATE)),
+                voice,
+                np.zeros(int(tail * SAMPLE_RATE)),
+            ])
+            signal += rng.normal(0, 0.001, len(signal))
+            pcm = (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+            samples.append((f'synthetic-{i}.wav', encode_wav(pcm)))
+        return samples
@@ -0,0 +1,347 @@
+"""
+Load generator for the ``ws/conversation/`` WebSocket.
+
+Opens ``--connections`` concurrent patient connections (ramped up over
+``--ramp`` seconds). Each one plays ``start_session`` → ``--chunks`` ×
+``process_audio`` (with think-time between chunks) → ``end_session``,
+``--sessions`` times. Reports throughput and p50/p95/p99 latency per message
+type. Audio comes from recorded fixture files (one file per chunk, cycled)
+or synthetic bytes.
+
+Run the server against the local API stand-ins for a fully offline test::
+
+    CONVERSATION_FAKE_APIS=fake daphne config.asgi:application
+    python manage.py loadtest_conversation --patient-id 1 --connections 50
+
+With ``--metrics-url`` the server's ``/metrics`` is scraped before and after
+the run and the event-loop lag and blocked call sites recorded in between
+are reported (start the server with ``ASGI_LOOP_WATCHDOG=true``).
+
+Requires the optional ``websockets`` package (``uv sync --extra streaming``).
+"""
+
+import asyncio
+import base64
+import json
+import math
+import random
+import time
+import urllib.request
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from apps.conversations.protocol import FRAME_AUDIO_CHUNK, encode_frame
+
+try:
+    from websockets.asyncio.client import connect as ws_connect
+except ImportError:  # pragma: no cover - optional dependency
+    ws_connect = None
+
+
+def percentile(values, q):
+    """最近傍順位法によるパーセンタイル"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def scrape_metrics(url, token=''):
+    """Prometheus形式のメトリクスを {(名前, ラベル文字列): 値} で取得"""
+    request = urllib.request.Request(url)
+    if token:
+        request.add_header('Authorization', f'Bearer {token}')
+    with urllib.request.urlopen(request, timeout=10) as response:
+        text = response.read().decode('utf-8')
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        series, _, value = line.rpartition(' ')
+        name, _, labels = series.partition('{')
+        samples[(name, labels.rstrip('}'))] = float(value)
+    return samples
+
+
+def histogram_quantile(q, buckets):
+    """[(上限, 累積件数), ...] から分位点の上限値を返す"""
+    if not buckets or buckets[-1][1] <= 0:
+        return None
+    rank = q * buckets[-1][1]
+    for bound, count in buckets:
+        if count >= rank:
+            return bound
+    return buckets[-1][0]
+
+
+class Connection:
+    """1接続分の送受信（応答は種別と seq で待ち合わせる）"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.waiters = {}
+        self.binary_bytes = 0
+        self.reader = asyncio.create_task(self.read_loop())
+
+    def expect(self, message_type, seq=None):
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[(message_type, seq)] = future
+        return future
+
+    def resolve(self, key, message):
+        future = self.waiters.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    async def read_loop(self):
+        async for raw in self.ws:
+            if isinstance(raw, bytes):
+                self.binary_bytes += len(raw)
+                continue
+            message = json.loads(raw)
+            message['_received'] = time.perf_counter()
+            message_type = message.get('type')
+            if message_type == 'audio_processed':
+                for seq in message.get('coalesced_seqs') or [message.get('seq')]:
+                    self.resolve(('audio_processed', seq), message)
+            elif message_type == 'error':
+                if message.get('seq') is not None:
+                    self.resolve(('audio_processed', message['seq']), message)
+                else:
+                    # Errors without a seq answer the pending session-level request
+                    for key in [k for k in self.waiters if k[1] is None]:
+                        self.resolve(key, message)
+            else:
+                self.resolve((message_type, None), message)
+
+    async def close(self):
+        self.reader.cancel()
+        await self.ws.close()
+
+
+class Command(BaseCommand):
+    help = 'Load test ws/conversation/ with N concurrent simulated patients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='ws://localhost:8000/ws/conversation/')
+        parser.add_argument('--patient-id', action='append', required=True,
+                            help='Existing patient id (repeat to spread connections)')
+        parser.add_argument('--connections', type=int, default=10)
+        parser.add_argument('--sessions', type=int, default=1,
+                            help='Sessions played per connection')
+        parser.add_argument('--chunks', type=int, default=5,
+                            help='process_audio messages per session')
+        parser.add_argument('--fixtures', help='Directory of recorded audio files (one per chunk)')
+        parser.add_argument('--chunk-bytes', type=int, default=16000,
+                            help='Synthetic chunk size when --fixtures is not given')
+        parser.add_argument('--think-time', type=float, default=1.0,
+                            help='Mean seconds between chunks (exponentially distributed)')
+        parser.add_argument('--ramp', type=float, default=5.0,
+                            help='Seconds over which connections are opened')
+        parser.add_argument('--timeout', type=float, default=60.0,
+                            help='Seconds to wait for each reply')
+        parser.add_argument('--binary', action='store_true',
+                            help='Upload audio as binary frames instead of base64 JSON')
+        parser.add_argument('--stream', action='store_true',
+                            help='Request a streamed end_session response')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--metrics-url',
+                            help='Server /metrics URL for event-loop lag and blocked call sites')
+        parser.add_argument('--metrics-token', default='')
+
+    def handle(self, *args, **options):
+        if ws_connect is None:
+            raise CommandError('loadtest_conversation requires the "websockets" package (uv sync --extra streaming)')
+
+        self.options = options
+        self.audio = self.load_audio(options)
+        self.latencies = {}
+        self.errors = {}
+        self.sessions_completed = 0
+        self.messages = 0
+
+        before = self.scrape() if options['metrics_url'] else None
+        started = time.perf_counter()
+        asyncio.run(self.run())
+        elapsed = time.perf_counter() - started
+        self.report(elapsed)
+        if before is not None:
+            self.report_server(before, self.scrape())
+
+    def scrape(self):
+        try:
+            return scrape_metrics(self.options['metrics_url'], self.options['metrics_token'])
+        except OSError as e:
+            raise CommandError(f'Cannot read {self.options["metrics_url"]}: {e}')
+
+    @staticmethod
+    def load_audio(options):
+        if not options['fixtures']:
+            rng = random.Random(options['seed'])
+            return [rng.randbytes(options['chunk_bytes']) for _ in range(8)]
+        path = Path(options['fixtures'])
+        if not path.is_dir():
+            raise CommandError(f'Not a directory: {path}')
+        files = [p.read_bytes() for p in sorted(path.iterdir()) if p.is_file()]
+        if not files:
+            raise CommandError(f'No fixture files in {path}')
+        return files
+
+    def record(self, message_type, seconds):
+        self.latencies.setdefault(message_type, []).append(seconds)
+
+    def fail(self, message_type, reason):
+        key = f'{message_type}:{reason}'
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    async def run(self):
+        connections = self.options['connections']
+        delay = self.options['ramp'] / connections if connections else 0
+        tasks = []
+        for index in range(connections):
+            tasks.append(asyncio.create_task(self.patient(index)))
+            await asyncio.sleep(delay)
+        await asyncio.gather(*tasks)
+
+    async def patient(self, index):
+        options = self.options
+        rng = random.Random(f"{options['seed']}:{index}")
+        patient_id = options['patient_id'][index % len(options['patient_id'])]
+        try:
+            ws = await ws_connect(options['url'], max_size=None)
+        except Exception as e:
+            self.fail('connect', type(e).__name__)
+            return
+
+        conn = Connection(ws)
+        try:
+            await asyncio.wait_for(conn.expect('connection_established'), options['timeout'])
+            for _ in range(options['sessions']):
+                if not await self.play_session(conn, patient_id, rng):
+                    break
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            self.fail('connection', type(e).__name__)
+        finally:
+            await conn.close()
+
+    async def request(self, conn, message_type, reply_type, payload):
+        """送信して応答を待ち、遅延を記録（失敗時はNone）"""
+        waiter = conn.expect(reply_type)
+        sent = time.perf_counter()
+        await conn.ws.send(json.dumps({'type': message_type, **payload}))
+        self.messages += 1
+        try:
+            reply = await asyncio.wait_for(waiter, self.options['timeout'])
+        except asyncio.TimeoutError:
+            self.fail(message_type, 'timeout')
+            return None
+        if reply.get('type') == 'error':
+            self.fail(message_type, 'error')
+            return None
+        self.record(message_type, time.perf_counter() - sent)
+        return reply
+
+    async def play_session(self, conn, patient_id, rng):
+        options = self.options
+        started = await self.request(conn, 'start_session', 'session_started', {
+            'patient_id': patient_id,
+            'binary_audio': options['binary'],
+            'delta': True,
+        })
+        if started is None:
+            return False
+        session_id = started['session_id']
+
+        # Chunks are sent on the client's own schedule; replies are awaited concurrently
+        pending = []
+        for seq in range(options['chunks']):
+            await asyncio.sleep(rng.expovariate(1 / options['think_time']) if options['think_time'] else 0)
+            audio = self.audio[rng.randrange(len(self.audio))]
+            pending.append(asyncio.create_task(self.send_chunk(conn, session_id, seq, audio)))
+        await asyncio.gather(*pending)
+
+        end_payload = {'session_id': session_id, 'stream': options['stream']}
+        first_audio = conn.expect('tts_audio_chunk') if options['stream'] else None
+        sent = time.perf_counter()
+        ended = await self.request(conn, 'end_session', 'session_ended', end_payload)
+        if first_audio is not None:
+            if first_audio.done() and first_audio.result().get('type') == 'tts_audio_chunk':
+                self.record('first_tts_audio', first_audio.result()['_received'] - sent)
+            conn.waiters.pop(('tts_audio_chunk', None), None)
+        if ended is None:
+            return False
+        self.sessions_completed += 1
+        return True
+
+    async def send_chunk(self, conn, session_id, seq, audio):
+        waiter = conn.expect('audio_processed', seq)
+        sent = time.perf_counter()
+        if self.options['binary']:
+            await conn.ws.send(encode_frame(FRAME_AUDIO_CHUNK, session_id, seq, audio))
+        else:
+            await conn.ws.send(json.dumps({
+                'type': 'process_audio',
+                'session_id': session_id,
+                'audio_data': base64.b64encode(audio).decode('ascii'),
+                'seq': seq,
+            }))
+        self.messages += 1
+        try:
+            reply = await asyncio.wait_for(waiter, self.options['timeout'])
+        except asyncio.TimeoutError:
+            self.fail('process_audio', 'timeout')
+            return
+        if reply.get('type') == 'error':
+            self.fail('process_audio', 'error')
+            return
+        self.record('process_audio', time.perf_counter() - sent)
+
+    def report(self, elapsed):
+        ms = lambda v: f'{v * 1000:9.1f}' if v is not None else f"{'-':>9}"
+        self.stdout.write(f'connections:        {self.options["connections"]}')
+        self.stdout.write(f'elapsed:            {elapsed:.2f}s')
+        self.stdout.write(f'sessions completed: {self.sessions_completed} ({self.sessions_completed / elapsed:.2f}/s)')
+        self.stdout.write(f'messages sent:      {self.messages} ({self.messages / elapsed:.2f}/s)')
+        self.stdout.write('')
+        self.stdout.write(f"{'message':<16} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for message_type, values in self.latencies.items():
+            self.stdout.write(
+                f'{message_type:<16} {len(values):>7} {ms(percentile(values, 50))} '
+                f'{ms(percentile(values, 95))} {ms(percentile(values, 99))} {ms(max(values))}'
+            )
+        if self.errors:
+            self.stdout.write('')
+            self.stdout.write('errors:')
+            for key, count in sorted(self.errors.items()):
+                self.stdout.write(f'  {key}: {count}')
+
+    def report_server(self, before, after):
+        """実行中にサーバー側で記録されたイベントループ遅延とブロック箇所"""
+        delta = {key: value - before.get(key, 0.0) for key, value in after.items()}
+
+        buckets = []
+        for (name, labels), count in delta.items():
+            if name == 'asgi_event_loop_lag_seconds_bucket':
+                bound = labels.split('le="', 1)[1].rstrip('"')
+                buckets.append((float('inf') if bound == '+Inf' else float(bound), count))
+        buckets.sort()
+
+        self.stdout.write('')
+        if not buckets or buckets[-1][1] <= 0:
+            self.stdout.write('event loop lag: no samples (is ASGI_LOOP_WATCHDOG enabled?)')
+        else:
+            bound = lambda q: f'<= {histogram_quantile(q, buckets) * 1000:g} ms'
+            self.stdout.write(
+                f'event loop lag:     p50 {bound(0.5)}, p99 {bound(0.99)} '
+                f'({int(buckets[-1][1])} heartbeats)'
+            )
+
+        sites = sorted(
+            ((count, labels.split('site="', 1)[1].rstrip('"')) for (name, labels), count in delta.items()
+             if name == 'asgi_event_loop_blocked_total' and count > 0),
+            reverse=True
+        )
+        if sites:
+            self.stdout.write('blocked call sites:')
+            for count, site in sites:
+                self.stdout.write(f'  {int(count):>5}  {site}')
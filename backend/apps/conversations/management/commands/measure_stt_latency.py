@@ -0,0 +1,86 @@
+"""
+Measure streaming STT latency-to-first-word.
+
+Streams an audio file (or synthetic bytes) in real-time paced chunks through
+DeepgramStreamingSession and reports when the first partial and final
+transcripts arrive. Without ``--url`` a local FakeStreamingSTTServer is
+started so the measurement runs offline.
+"""
+
+import asyncio
+import time
+from django.core.management.base import BaseCommand
+from apps.conversations.fakes.streaming_stt import FakeStreamingSTTServer
+from apps.conversations.services import DeepgramStreamingSession
+
+
+class Command(BaseCommand):
+    help = 'Measure latency-to-first-word of streaming STT (offline by default)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Streaming endpoint (default: local stand-in server)')
+        parser.add_argument('--file', help='Audio file to stream (default: synthetic bytes)')
+        parser.add_argument('--chunk-bytes', type=int, default=4000)
+        parser.add_argument('--interval', type=float, default=0.1,
+                            help='Seconds between chunks (real-time pacing)')
+        parser.add_argument('--chunks', type=int, default=20,
+                            help='Number of synthetic chunks when --file is not given')
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help='Stand-in server processing latency in seconds')
+
+    def handle(self, *args, **options):
+        if options['file']:
+            with open(options['file'], 'rb') as f:
+                audio = f.read()
+        else:
+            audio = bytes(options['chunk_bytes'] * options['chunks'])
+
+        chunk_size = options['chunk_bytes']
+        chunks = [audio[i:i + chunk_size] for i in range(0, len(audio), chunk_size)]
+        result = asyncio.run(self.measure(options, chunks))
+
+        recording = len(chunks) * options['interval']
+        self.stdout.write(f"chunks sent:             {len(chunks)} ({recording:.2f}s of audio)")
+        self.stdout.write(f"first partial:           {self.fmt(result['first_partial'])}")
+        self.stdout.write(f"first final:             {self.fmt(result['first_final'])}")
+        self.stdout.write(f"last final after finish: {self.fmt(result['after_finish'])}")
+        self.stdout.write(f"partials / finals:       {result['partials']} / {result['finals']}")
+
+    @staticmethod
+    def fmt(seconds):
+        return 'n/a' if seconds is None else f'{seconds * 1000:.0f} ms'
+
+    async def measure(self, options, chunks):
+        if options['url']:
+            return await self.stream(options['url'], chunks, options['interval'])
+
+        async with FakeStreamingSTTServer(latency=options['latency']) as server:
+            return await self.stream(server.url, chunks, options['interval'])
+
+    async def stream(self, url, chunks, interval):
+        result = {'first_partial': None, 'first_final': None, 'after_finish': None,
+                  'partials': 0, 'finals': 0}
+        started = time.perf_counter()
+        finished_sending = None
+
+        async def on_transcript(text, confidence, is_final):
+            elapsed = time.perf_counter() - started
+            if is_final:
+                result['finals'] += 1
+                if result['first_final'] is None:
+                    result['first_final'] = elapsed
+                if finished_sending is not None:
+                    result['after_finish'] = time.perf_counter() - finished_sending
+            else:
+                result['partials'] += 1
+                if result['first_partial'] is None:
+                    result['first_partial'] = elapsed
+
+        stream = DeepgramStreamingSession(on_transcript, url=url)
+        await stream.start()
+        for chunk in chunks:
+            await stream.send_audio(chunk)
+            await asyncio.sleep(interval)
+        finished_sending = time.perf_counter()
+        await stream.finish()
+        return result
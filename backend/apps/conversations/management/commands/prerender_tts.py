@@ -0,0 +1,44 @@
+"""
+Pre-render fixed fallback phrases into the TTS cache.
+
+Run at deploy time so the empty-input and error paths of LLMService never
+need a TTS network call. Entries are pinned and never evicted.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.conversations.services import DeepgramService
+from apps.conversations.services.llm_service import FALLBACK_RESPONSES
+from apps.conversations.services.tts_cache import get_tts_cache
+
+
+class Command(BaseCommand):
+    help = 'Pre-render LLM fallback phrases into the TTS cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render phrases that are already cached')
+
+    def handle(self, *args, **options):
+        tts_cache = get_tts_cache()
+        if tts_cache is None:
+            raise CommandError('TTS cache is disabled (set TTS_CACHE BACKEND to "disk" or "cache")')
+
+        service = DeepgramService()
+        failed = 0
+        for text in FALLBACK_RESPONSES:
+            key = service._speech_cache_key(service._speech_params(text))
+            if not options['force'] and tts_cache.get(key):
+                self.stdout.write(f'Cached: {text}')
+                continue
+
+            audio_data = service.text_to_speech(text, use_cache=False)
+            if not audio_data:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'Failed: {text}'))
+                continue
+
+            tts_cache.set(key, audio_data, pinned=True)
+            self.stdout.write(self.style.SUCCESS(f'Rendered: {text} ({len(audio_data)} bytes)'))
+
+        if failed:
+            raise CommandError(f'{failed} phrase(s) could not be rendered')
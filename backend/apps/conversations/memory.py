@@ -0,0 +1,195 @@
+"""
+Memory accounting for audio payloads of the conversation pipeline.
+
+Audio is held several times while a message is handled: a JSON
+``process_audio`` frame is alive as the frame text, the parsed base64
+string, the data-URL-stripped copy and the decoded bytes at once, and a
+``session_ended`` response as the MP3, its base64 copy and the JSON dump.
+
+- ``MAX_PAYLOAD_BYTES`` bounds the decoded audio of one message. Frames are
+  rejected by length (``frame_limit``) before JSON parsing or
+  base64 decoding, so an oversized message never allocates its copies.
+- ``MemoryAccount`` accounts the messages of one connection per message
+  type: count and frame size always (``conversation_message_bytes``), and
+  with ``TRACEMALLOC`` on, the memory traced from the start of the message
+  to the point where all its copies are alive
+  (``conversation_message_memory_bytes``). Those sections contain no
+  ``await``, so other connections on the loop do not allocate in between;
+  executor threads can, which makes single values noisy but not the
+  distribution. The per-connection totals are logged on disconnect.
+
+tracemalloc slows down every allocation in the process, so enable it for
+sizing runs (``bench_memory``) or on a single canary worker.
+"""
+
+import base64
+import threading
+import tracemalloc
+from django.conf import settings
+from apps.core.metrics import registry
+from .protocol import HEADER
+
+DEFAULT_CONFIG = {
+    'MAX_PAYLOAD_BYTES': 5 * 1024 * 1024,
+    'TRACEMALLOC': False,
+    'TRACEMALLOC_FRAMES': 1,
+}
+
+# JSON fields and data-URL prefix allowed on top of the base64 audio
+ENVELOPE_BYTES = 4096
+
+# Label values of message_type; client-supplied types outside this set are "other"
+MESSAGE_TYPES = frozenset({
+    'start_session',
+    'process_audio',
+    'end_session',
+    'get_transcript',
+    'start_stream',
+    'stream_audio',
+    'stop_stream',
+    'binary_audio',
+    'session_ended',
+})
+
+SIZE_BUCKETS = (
+    1024, 4096, 16384, 65536, 262144,
+    1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024, 64 * 1024 * 1024,
+)
+
+message_bytes = registry.histogram(
+    'conversation_message_bytes',
+    'Size of WebSocket messages by type (session_ended: the MP3)',
+    buckets=SIZE_BUCKETS
+)
+message_memory = registry.histogram(
+    'conversation_message_memory_bytes',
+    'Memory traced while a message holds its payload copies (tracemalloc)',
+    buckets=SIZE_BUCKETS
+)
+rejected_payloads = registry.counter(
+    'conversation_payload_rejected_total',
+    'Messages rejected for exceeding MAX_PAYLOAD_BYTES'
+)
+traced_memory = registry.gauge(
+    'conversation_traced_memory_bytes',
+    'Memory traced by tracemalloc in this process (current and peak)'
+)
+
+_tracing_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, 'CONVERSATION_MEMORY', {})}
+
+
+def encoded_size(size):
+    """size バイトを base64 にしたときの長さ"""
+    return 4 * ((size + 2) // 3)
+
+
+def frame_limit(max_payload, binary=False):
+    """受信メッセージ1件の長さの上限（JSONは base64 と ENVELOPE_BYTES 分を加算）"""
+    if binary:
+        return HEADER.size + max_payload
+    return encoded_size(max_payload) + ENVELOPE_BYTES
+
+
+def ensure_tracing(frames=1):
+    """tracemalloc を開始（プロセスで1回）"""
+    with _tracing_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            traced_memory.set_function(lambda: tracemalloc.get_traced_memory()[0], kind='current')
+            traced_memory.set_function(lambda: tracemalloc.get_traced_memory()[1], kind='peak')
+
+
+def decode_audio_field(data, message=None):
+    """メッセージの ``audio_data``（base64、data URL可）をデコード
+
+    フィールドは dict から取り除くので、戻った時点で base64 のコピーは残らず
+    デコード済みのバイト列だけが生存する（STTの待機中に保持されるのはこれのみ）。
+    ``message`` にはデコード直後に mark() する。
+
+    Raises:
+        ValueError: base64 として不正な場合（binascii.Error）
+    """
+    value = data.pop('audio_data')
+    if not isinstance(value, str):
+        raise ValueError('audio_data must be a string')
+    if value.startswith('data:audio'):
+        value = value.split(',', 1)[1]
+    audio_bytes = base64.b64decode(value, validate=True)
+    if message is not None:
+        message.mark()
+    return audio_bytes
+
+
+class MessageMemory:
+    """1メッセージ分の計測（MemoryAccount.begin で作成、with でも使える）"""
+
+    __slots__ = ('account', 'message_type', 'size', 'baseline', 'traced')
+
+    def __init__(self, account, message_type, size):
+        self.account = account
+        self.message_type = message_type
+        self.size = size
+        self.baseline = tracemalloc.get_traced_memory()[0] if account.tracing else None
+        self.traced = 0
+
+    def mark(self, message_type=None):
+        """コピーが生存している時点の追跡メモリを記録（種別が判明したら指定）"""
+        if message_type is not None:
+            self.message_type = message_type
+        if self.baseline is not None:
+            self.traced = max(self.traced, tracemalloc.get_traced_memory()[0] - self.baseline)
+
+    def finish(self):
+        self.account.record(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish()
+        return False
+
+
+class MemoryAccount:
+    """1接続分のメッセージ種別ごとのメモリ集計
+
+    Args:
+        tracing: tracemalloc で計測するか（None なら TRACEMALLOC 設定に従う）
+    """
+
+    def __init__(self, tracing=None):
+        config = get_config()
+        self.max_payload = config['MAX_PAYLOAD_BYTES']
+        self.tracing = bool(config['TRACEMALLOC'] if tracing is None else tracing)
+        if self.tracing:
+            ensure_tracing(config['TRACEMALLOC_FRAMES'])
+        # message_type -> [messages, bytes, max traced bytes]
+        self.totals = {}
+        self.peak = 0
+
+    def frame_limit(self, binary=False):
+        return frame_limit(self.max_payload, binary)
+
+    def begin(self, message_type, size):
+        return MessageMemory(self, message_type, size)
+
+    def record(self, message):
+        message_type = message.message_type if message.message_type in MESSAGE_TYPES else 'other'
+        message_bytes.observe(message.size, message_type=message_type)
+        entry = self.totals.setdefault(message_type, [0, 0, 0])
+        entry[0] += 1
+        entry[1] += message.size
+        if message.baseline is not None:
+            message_memory.observe(message.traced, message_type=message_type)
+            entry[2] = max(entry[2], message.traced)
+            self.peak = max(self.peak, message.traced)
+
+    def summary(self):
+        return {
+            message_type: {'messages': messages, 'bytes': size, 'max_traced_bytes': traced}
+            for message_type, (messages, size, traced) in self.totals.items()
+        }
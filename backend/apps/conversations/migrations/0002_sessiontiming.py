@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionTiming',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='timing', serialize=False, to='conversations.conversationsession', verbose_name='会話セッション')),
+                ('transport', models.CharField(help_text='websocket / rest / celery', max_length=16, verbose_name='経路')),
+                ('llm_mode', models.CharField(choices=[('direct', '通常'), ('streamed', 'ストリーミング'), ('speculative', '投機的解析の再利用')], default='direct', max_length=16, verbose_name='LLM実行方式')),
+                ('total_ms', models.PositiveIntegerField(default=0, help_text='終了要求から応答送信まで', verbose_name='終了処理時間')),
+                ('stt_ms', models.PositiveIntegerField(default=0, verbose_name='STT合計')),
+                ('stt_max_ms', models.PositiveIntegerField(default=0, verbose_name='STT最大')),
+                ('stt_requests', models.PositiveIntegerField(default=0, verbose_name='STTリクエスト数')),
+                ('chunk_count', models.PositiveIntegerField(default=0, verbose_name='チャンク数')),
+                ('stt_chunks', models.JSONField(blank=True, default=list, help_text='[最終seq, チャンク数, ms, バイト数] のリスト', verbose_name='STTリクエスト別')),
+                ('llm_ms', models.PositiveIntegerField(default=0, verbose_name='LLM')),
+                ('tts_ms', models.PositiveIntegerField(default=0, verbose_name='TTS')),
+                ('db_ms', models.PositiveIntegerField(default=0, verbose_name='DB')),
+                ('bytes_in', models.PositiveBigIntegerField(default=0, verbose_name='受信音声バイト数')),
+                ('bytes_out', models.PositiveBigIntegerField(default=0, verbose_name='送信音声バイト数')),
+                ('stt_model', models.CharField(blank=True, max_length=64, verbose_name='STTモデル')),
+                ('llm_model', models.CharField(blank=True, max_length=64, verbose_name='LLMモデル')),
+                ('tts_model', models.CharField(blank=True, max_length=64, verbose_name='TTSモデル')),
+                ('recorded_at', models.DateTimeField(auto_now_add=True, verbose_name='記録日時')),
+            ],
+            options={
+                'verbose_name': 'セッション処理時間',
+                'verbose_name_plural': 'セッション処理時間',
+                'db_table': 'conversation_session_timings',
+                'ordering': ['-recorded_at'],
+                'indexes': [models.Index(fields=['recorded_at', 'total_ms'], name='idx_timing_recorded_total')],
+            },
+        ),
+    ]
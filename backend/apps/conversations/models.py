@@ -91,3 +91,75 @@ class ConversationSession(TimeStampedModel):
         if self.ended_at and self.started_at:
             return (self.ended_at - self.started_at).total_seconds()
         return None
+
+
+class SessionTiming(models.Model):
+    """セッションの処理時間内訳
+
+    セッション終了時に1回だけ書き込む（apps/conversations/timing.py）。
+    時間はすべてミリ秒。
+    """
+
+    LLM_MODE_CHOICES = [
+        ('direct', '通常'),
+        ('streamed', 'ストリーミング'),
+        ('speculative', '投機的解析の再利用'),
+    ]
+
+    session = models.OneToOneField(
+        ConversationSession,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='timing',
+        verbose_name='会話セッション'
+    )
+    transport = models.CharField(
+        max_length=16,
+        verbose_name='経路',
+        help_text='websocket / rest / celery'
+    )
+    llm_mode = models.CharField(
+        max_length=16,
+        choices=LLM_MODE_CHOICES,
+        default='direct',
+        verbose_name='LLM実行方式'
+    )
+    total_ms = models.PositiveIntegerField(
+        default=0,
+        verbose_name='終了処理時間',
+        help_text='終了要求から応答送信まで'
+    )
+    stt_ms = models.PositiveIntegerField(default=0, verbose_name='STT合計')
+    stt_max_ms = models.PositiveIntegerField(default=0, verbose_name='STT最大')
+    stt_requests = models.PositiveIntegerField(default=0, verbose_name='STTリクエスト数')
+    chunk_count = models.PositiveIntegerField(default=0, verbose_name='チャンク数')
+    stt_chunks = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='STTリクエスト別',
+        help_text='[最終seq, チャンク数, ms, バイト数] のリスト'
+    )
+    llm_ms = models.PositiveIntegerField(default=0, verbose_name='LLM')
+    tts_ms = models.PositiveIntegerField(default=0, verbose_name='TTS')
+    db_ms = models.PositiveIntegerField(default=0, verbose_name='DB')
+    bytes_in = models.PositiveBigIntegerField(default=0, verbose_name='受信音声バイト数')
+    bytes_out = models.PositiveBigIntegerField(default=0, verbose_name='送信音声バイト数')
+    stt_model = models.CharField(max_length=64, blank=True, verbose_name='STTモデル')
+    llm_model = models.CharField(max_length=64, blank=True, verbose_name='LLMモデル')
+    tts_model = models.CharField(max_length=64, blank=True, verbose_name='TTSモデル')
+    recorded_at = models.DateTimeField(auto_now_add=True, verbose_name='記録日時')
+
+    class Meta:
+        db_table = 'conversation_session_timings'
+        ordering = ['-recorded_at']
+        indexes = [
+            models.Index(
+                fields=['recorded_at', 'total_ms'],
+                name='idx_timing_recorded_total'
+            ),
+        ]
+        verbose_name = 'セッション処理時間'
+        verbose_name_plural = 'セッション処理時間'
+
+    def __str__(self):
+        return f"Timing {self.session_id} ({self.total_ms} ms)"
@@ -0,0 +1,69 @@
+"""
+Binary WebSocket frame protocol for ``ws/conversation/``.
+
+Audio travels as raw bytes behind a fixed 14-byte big-endian header instead
+of base64 inside JSON text frames::
+
+    version (uint8) | frame type (uint8) | session id (uint64) | sequence (uint32) | payload
+
+JSON text frames remain supported for older clients.
+"""
+
+import struct
+from collections import namedtuple
+
+PROTOCOL_VERSION = 1
+
+HEADER = struct.Struct('!BBQI')
+
+# Client → server
+FRAME_AUDIO_CHUNK = 0x01
+FRAME_STREAM_AUDIO = 0x02
+# Server → client
+FRAME_TTS_AUDIO = 0x81
+
+FRAME_TYPES = frozenset({FRAME_AUDIO_CHUNK, FRAME_STREAM_AUDIO, FRAME_TTS_AUDIO})
+
+# TTS audio is split into frames of this size
+TTS_FRAME_SIZE = 64 * 1024
+
+Frame = namedtuple('Frame', ['frame_type', 'session_id', 'seq', 'payload'])
+
+
+class FrameError(ValueError):
+    """不正なバイナリフレーム"""
+
+
+def encode_frame(frame_type, session_id, seq, payload):
+    """ヘッダとペイロードを連結してバイナリフレームを生成"""
+    return HEADER.pack(PROTOCOL_VERSION, frame_type, int(session_id), seq) + payload
+
+
+def decode_frame(data):
+    """バイナリフレームを解析
+
+    Raises:
+        FrameError: ヘッダが短い、バージョンが不一致、または未知のフレーム種別の場合
+    """
+    if len(data) < HEADER.size:
+        raise FrameError(f'Frame too short: {len(data)} bytes')
+
+    version, frame_type, session_id, seq = HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise FrameError(f'Unsupported protocol version: {version}')
+    if frame_type not in FRAME_TYPES:
+        raise FrameError(f'Unknown frame type: {frame_type}')
+
+    return Frame(frame_type, session_id, seq, data[HEADER.size:])
+
+
+def iter_audio_frames(session_id, audio_data, frame_type=FRAME_TTS_AUDIO, frame_size=TTS_FRAME_SIZE):
+    """音声データを固定サイズのバイナリフレームに分割"""
+    view = memoryview(audio_data)
+    for seq, offset in enumerate(range(0, len(view), frame_size)):
+        yield encode_frame(frame_type, session_id, seq, view[offset:offset + frame_size])
+
+
+def count_frames(audio_data, frame_size=TTS_FRAME_SIZE):
+    """分割後のフレーム数"""
+    return (len(audio_data) + frame_size - 1) // frame_size
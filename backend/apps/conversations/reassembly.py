@@ -0,0 +1,57 @@
+"""
+Ordered reassembly of concurrently processed audio chunks.
+
+Chunks of one session are transcribed concurrently and may finish out of
+order; ``ChunkReassembler`` buffers finished results and emits them strictly
+in sequence-number order.
+"""
+
+import asyncio
+
+
+class ChunkReassembler:
+    """シーケンス番号順に結果を送出する
+
+    Args:
+        emit: ``await emit(payload)`` 順番が来た結果を送出するコルーチン関数
+        next_seq: 最初に期待するシーケンス番号
+    """
+
+    def __init__(self, emit, next_seq=0):
+        self.emit = emit
+        self.next_seq = next_seq
+        self._ready = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def pending(self):
+        """順番待ちの結果数"""
+        return len(self._ready)
+
+    async def complete(self, seq, payload):
+        """チャンクの完了を通知（payloadがNoneなら送出せずに順番だけ進める）"""
+        async with self._lock:
+            if seq < self.next_seq:
+                # Late duplicate of an already emitted sequence number
+                if payload is not None:
+                    await self.emit(payload)
+                return
+            if seq in self._ready:
+                # Duplicate of a result still waiting for its turn; the first one wins
+                return
+
+            self._ready[seq] = payload
+            while self.next_seq in self._ready:
+                ready = self._ready.pop(self.next_seq)
+                self.next_seq += 1
+                if ready is not None:
+                    await self.emit(ready)
+
+    async def flush(self):
+        """欠番を飛ばして残りの結果を番号順に送出"""
+        async with self._lock:
+            for seq in sorted(self._ready):
+                ready = self._ready.pop(seq)
+                self.next_seq = seq + 1
+                if ready is not None:
+                    await self.emit(ready)
@@ -7,4 +7,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     path('ws/conversation/', consumers.ConversationConsumer.as_asgi()),
+    path('ws/dashboard/', consumers.DoctorDashboardConsumer.as_asgi()),
 ]
@@ -3,7 +3,9 @@ Conversation serializers.
 """
 
 from rest_framework import serializers
-from .models import ConversationSession
+from apps.emotions.registry import get_registry
+from .memory import frame_limit, get_config as get_memory_config
+from .models import ConversationSession, SessionTiming
 
 
 class ConversationSessionSerializer(serializers.ModelSerializer):
@@ -12,8 +14,8 @@ class ConversationSessionSerializer(serializers.ModelSerializer):
     patient = serializers.PrimaryKeyRelatedField(read_only=True)
     patient_name = serializers.CharField(source='patient.name', read_only=True)
     emotion = serializers.PrimaryKeyRelatedField(read_only=True)
-    emotion_name = serializers.CharField(source='emotion.name_ja', read_only=True)
-    emotion_key = serializers.CharField(source='emotion.name', read_only=True)
+    emotion_name = serializers.SerializerMethodField()
+    emotion_key = serializers.SerializerMethodField()
     duration = serializers.ReadOnlyField()
     is_active = serializers.ReadOnlyField()
 
@@ -27,6 +29,38 @@ class ConversationSessionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'patient', 'emotion', 'started_at', 'duration', 'is_active']
 
+    def _emotion_entry(self, obj):
+        # Resolve from the in-process registry instead of joining/querying Emotion per row
+        if obj.emotion_id is None:
+            return None
+        return get_registry().by_id(obj.emotion_id)
+
+    def get_emotion_name(self, obj):
+        entry = self._emotion_entry(obj)
+        return entry.name_ja if entry else None
+
+    def get_emotion_key(self, obj):
+        entry = self._emotion_entry(obj)
+        return entry.name if entry else None
+
+
+class SessionTimingSerializer(serializers.ModelSerializer):
+    """セッション処理時間シリアライザ"""
+
+    patient = serializers.IntegerField(source='session.patient_id', read_only=True)
+    ended_at = serializers.DateTimeField(source='session.ended_at', read_only=True)
+    day = serializers.DateField(read_only=True)
+
+    class Meta:
+        model = SessionTiming
+        fields = [
+            'session', 'patient', 'ended_at', 'day', 'transport', 'llm_mode',
+            'total_ms', 'stt_ms', 'stt_max_ms', 'stt_requests', 'chunk_count',
+            'stt_chunks', 'llm_ms', 'tts_ms', 'db_ms', 'bytes_in', 'bytes_out',
+            'stt_model', 'llm_model', 'tts_model', 'recorded_at'
+        ]
+        read_only_fields = fields
+
 
 class AudioChunkSerializer(serializers.Serializer):
     """音声チャンクシリアライザ"""
@@ -37,6 +71,11 @@ class AudioChunkSerializer(serializers.Serializer):
     def validate_audio_data(self, value):
         """音声データのバリデーション"""
         import base64
+
+        # デコード前に長さで上限を確認
+        limit = frame_limit(get_memory_config()['MAX_PAYLOAD_BYTES'])
+        if len(value) > limit:
+            raise serializers.ValidationError(f"音声データが大きすぎます（最大{limit}バイト）")
         
         # Data URL形式の場合、カンマ以降を取得
         if value.startswith('data:audio'):
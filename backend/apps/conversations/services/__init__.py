@@ -3,6 +3,7 @@ Conversation services.
 """
 
 from .deepgram_service import DeepgramService
+from .deepgram_streaming import DeepgramStreamingSession, StreamingUnavailable
 from .llm_service import LLMService
 
-__all__ = ['DeepgramService', 'LLMService']
+__all__ = ['DeepgramService', 'DeepgramStreamingSession', 'StreamingUnavailable', 'LLMService']
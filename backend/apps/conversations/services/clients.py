@@ -0,0 +1,139 @@
+"""
+Process-wide HTTP client pools for external speech/LLM APIs.
+
+Clients are created once per worker process (async clients once per event
+loop) and reused across requests so keep-alive connections and TLS sessions
+survive between utterances. HTTP/2 is enabled when the optional ``h2``
+package is installed.
+"""
+
+import asyncio
+import threading
+import weakref
+import httpx
+import openai
+from django.conf import settings
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+_lock = threading.Lock()
+_sync_client = None
+_sync_openai_client = None
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _client_options(is_async=False):
+    """共通のクライアント設定（スタンドイン/記録/再生モードではtransportを差し替える）"""
+    pool = getattr(settings, 'CONVERSATION_HTTP_POOL', {})
+    options = {
+        'http2': HTTP2_AVAILABLE and pool.get('HTTP2', True),
+        'limits': httpx.Limits(
+            max_connections=pool.get('MAX_CONNECTIONS', 100),
+            max_keepalive_connections=pool.get('MAX_KEEPALIVE_CONNECTIONS', 20),
+            keepalive_expiry=pool.get('KEEPALIVE_EXPIRY', 60.0),
+        ),
+        'timeout': httpx.Timeout(pool.get('TIMEOUT', 30.0), connect=pool.get('CONNECT_TIMEOUT', 5.0)),
+    }
+    transport = _fake_transport(options, is_async)
+    if transport is not None:
+        options['transport'] = transport
+    return options
+
+
+def _fake_transport(options, is_async):
+    """CONVERSATION_FAKE_APIS に応じたtransport（無効ならNone）"""
+    config = getattr(settings, 'CONVERSATION_FAKE_APIS', {})
+    mode = config.get('MODE')
+    if not mode:
+        return None
+
+    from ..fakes.api import FakeAPITransport, RecordingTransport, ReplayTransport
+
+    if mode == 'fake':
+        return FakeAPITransport(config.get('ROUTES'), config.get('SEED', 0))
+    if mode == 'replay':
+        return ReplayTransport(config['FIXTURES'])
+    if mode == 'record':
+        real = {'http2': options['http2'], 'limits': options['limits']}
+        if is_async:
+            return RecordingTransport(config['FIXTURES'], async_transport=httpx.AsyncHTTPTransport(**real))
+        return RecordingTransport(config['FIXTURES'], transport=httpx.HTTPTransport(**real))
+    raise ValueError(f'Unknown CONVERSATION_FAKE_APIS mode: {mode}')
+
+
+def _openai_api_key():
+    # The OpenAI client refuses to start without a key; stand-ins do not need one
+    if getattr(settings, 'CONVERSATION_FAKE_APIS', {}).get('MODE') in ('fake', 'replay'):
+        return settings.OPENAI_API_KEY or 'fake'
+    return settings.OPENAI_API_KEY
+
+
+def get_http_client():
+    """同期HTTPクライアント（プロセス内で共有）"""
+    global _sync_client
+    if _sync_client is None:
+        with _lock:
+            if _sync_client is None:
+                _sync_client = httpx.Client(**_client_options())
+    return _sync_client
+
+
+def get_openai_client():
+    """同期OpenAIクライアント（プロセス内で共有）"""
+    global _sync_openai_client
+    if _sync_openai_client is None:
+        # Resolved before taking _lock, which get_http_client() takes too
+        http_client = get_http_client()
+        with _lock:
+            if _sync_openai_client is None:
+                _sync_openai_client = openai.OpenAI(
+                    api_key=_openai_api_key(),
+                    http_client=http_client,
+                    # Retries are left to the resilience endpoints, so a call never outlives its deadline
+                    max_retries=0
+                )
+    return _sync_openai_client
+
+
+def _loop_clients():
+    """実行中のイベントループに紐づく非同期クライアントを取得
+
+    httpx.AsyncClientの接続はイベントループに束縛されるため、
+    ループごとに1組だけ生成する。
+    """
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.get(loop)
+    if clients is None:
+        http_client = httpx.AsyncClient(**_client_options(is_async=True))
+        clients = {
+            'http': http_client,
+            'openai': openai.AsyncOpenAI(
+                api_key=_openai_api_key(),
+                http_client=http_client,
+                max_retries=0
+            ),
+        }
+        _async_clients[loop] = clients
+    return clients
+
+
+def get_async_http_client():
+    """非同期HTTPクライアント（イベントループ内で共有）"""
+    return _loop_clients()['http']
+
+
+def get_async_openai_client():
+    """非同期OpenAIクライアント（イベントループ内で共有）"""
+    return _loop_clients()['openai']
+
+
+async def close_async_clients():
+    """現在のイベントループのクライアントをクローズ"""
+    clients = _async_clients.pop(asyncio.get_running_loop(), None)
+    if clients is not None:
+        await clients['http'].aclose()
@@ -2,10 +2,24 @@
 Deepgram STT/TTS Service using Deepgram API.
 """
 
-import base64
-import os
-import requests
+import logging
+import httpx
 from django.conf import settings
+from ..executors import offload
+from .clients import (
+    get_http_client,
+    get_async_http_client,
+    get_openai_client,
+    get_async_openai_client,
+)
+from .resilience import ResilienceError, get_endpoint
+from .tts_cache import get_tts_cache, tts_cache_key
+from .vad import get_trimmer
+
+logger = logging.getLogger(__name__)
+
+STT_MODEL = 'nova-2'
+TTS_MODEL = 'tts-1'  # or "tts-1-hd" for higher quality
 
 
 class DeepgramService:
@@ -15,6 +29,35 @@ class DeepgramService:
         self.api_key = settings.DEEPGRAM_API_KEY
         self.base_url = "https://api.deepgram.com/v1"
 
+    def _listen_request(self, audio_data, content_type="audio/webm", timeout=30):
+        """/listen リクエストのパラメータを組み立てる"""
+        return {
+            'url': f"{self.base_url}/listen",
+            'headers': {
+                "Authorization": f"Token {self.api_key}",
+                "Content-Type": content_type
+            },
+            'params': {
+                "model": STT_MODEL,
+                "language": "ja",
+                "punctuate": "true",
+                "utterances": "true"
+            },
+            'content': audio_data,
+            'timeout': timeout,
+        }
+
+    @staticmethod
+    def _parse_transcript(result):
+        """Deepgramのレスポンスから (transcript, confidence) を取り出す"""
+        alternatives = result.get('results', {}).get('channels', [{}])[0].get('alternatives', [{}])
+        if alternatives:
+            transcript = alternatives[0].get('transcript', '')
+            confidence = alternatives[0].get('confidence', 0.0)
+            return transcript, confidence
+
+        return '', 0.0
+
     def transcribe(self, audio_data):
         """
         音声データをテキストに変換（STT）
@@ -25,80 +68,155 @@ class DeepgramService:
         Returns:
             tuple: (transcribed_text, confidence)
         """
-        url = f"{self.base_url}/listen"
-        
-        headers = {
-            "Authorization": f"Token {self.api_key}",
-            "Content-Type": "audio/webm"
-        }
-        
-        params = {
-            "model": "nova-2",
-            "language": "ja",
-            "punctuate": "true",
-            "utterances": "true"
-        }
+        trimmer = get_trimmer()
+        content_type = "audio/webm"
+        if trimmer is not None:
+            # Drop silent chunks and trim leading/trailing silence before upload
+            vad_result = trimmer.process(audio_data, content_type)
+            if vad_result.audio is None:
+                return '', 0.0
+            audio_data, content_type = vad_result.audio, vad_result.content_type
+
+        endpoint = get_endpoint('stt')
+
+        def listen():
+            response = get_http_client().post(
+                **self._listen_request(audio_data, content_type, endpoint.deadline)
+            )
+            response.raise_for_status()
+            return response.json()
 
         try:
-            response = requests.post(
-                url,
-                headers=headers,
-                params=params,
-                data=audio_data,
-                timeout=30
+            return self._parse_transcript(endpoint.call(listen))
+
+        # ValueError: non-JSON response body (json.JSONDecodeError)
+        except (httpx.HTTPError, ResilienceError, ValueError) as e:
+            logger.warning('Deepgram STT error: %s', e, extra={'error': type(e).__name__})
+            return '', 0.0
+
+    async def atranscribe(self, audio_data):
+        """
+        音声データをテキストに変換（STT・非同期版）
+
+        Args:
+            audio_data (bytes): 音声データ（バイナリ）
+
+        Returns:
+            tuple: (transcribed_text, confidence)
+        """
+        trimmer = get_trimmer()
+        content_type = "audio/webm"
+        if trimmer is not None:
+            # Decoding and VAD are CPU/subprocess work; keep them off the event loop
+            vad_result = await offload('stt')(trimmer.process)(audio_data, content_type)
+            if vad_result.audio is None:
+                return '', 0.0
+            audio_data, content_type = vad_result.audio, vad_result.content_type
+
+        endpoint = get_endpoint('stt')
+
+        async def listen():
+            response = await get_async_http_client().post(
+                **self._listen_request(audio_data, content_type, endpoint.deadline)
             )
             response.raise_for_status()
-            
-            result = response.json()
-            
-            # Extract transcript and confidence
-            alternatives = result.get('results', {}).get('channels', [{}])[0].get('alternatives', [{}])
-            if alternatives:
-                transcript = alternatives[0].get('transcript', '')
-                confidence = alternatives[0].get('confidence', 0.0)
-                return transcript, confidence
-            
-            return '', 0.0
-            
-        except requests.exceptions.RequestException as e:
-            print(f"Deepgram STT Error: {e}")
+            return response.json()
+
+        try:
+            return self._parse_transcript(await endpoint.acall(listen))
+
+        # ValueError: non-JSON response body (json.JSONDecodeError)
+        except (httpx.HTTPError, ResilienceError, ValueError) as e:
+            logger.warning('Deepgram STT error: %s', e, extra={'error': type(e).__name__})
             return '', 0.0
 
-    def text_to_speech(self, text):
+    @staticmethod
+    def _speech_params(text):
+        return {
+            'model': TTS_MODEL,
+            'voice': "nova",   # Options: alloy, echo, fable, onyx, nova, shimmer
+            'response_format': "mp3",
+            'input': text,
+        }
+
+    @staticmethod
+    def _speech_cache_key(params):
+        return tts_cache_key(params['input'], params['model'], params['voice'], params['response_format'])
+
+    def text_to_speech(self, text, use_cache=True):
         """
         テキストを音声に変換（TTS）
         Note: Deepgram Aura doesn't support Japanese yet, so using OpenAI TTS instead
 
         Args:
             text (str): 音声化するテキスト
+            use_cache (bool): TTSキャッシュを参照・保存するか
 
         Returns:
             bytes: 音声データ（MP3形式）
         """
         if not text or text.strip() == '':
-            print("TTS Warning: Empty text provided")
+            logger.warning('TTS skipped: empty text')
             return b''
 
-        # Use OpenAI TTS API (supports Japanese)
-        from openai import OpenAI
+        params = self._speech_params(text)
+        tts_cache = get_tts_cache() if use_cache else None
+        if tts_cache is not None:
+            cached = tts_cache.get(self._speech_cache_key(params))
+            if cached:
+                return cached
 
+        # Use OpenAI TTS API (supports Japanese)
         try:
-            print(f"TTS Request (OpenAI): {text[:50]}...")
-            client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            logger.debug('TTS request', extra={'chars': len(text)})
+            endpoint = get_endpoint('tts')
+            response = endpoint.call(
+                lambda: get_openai_client().audio.speech.create(**params, timeout=endpoint.deadline)
+            )
+
+            audio_data = response.content
+            logger.debug('TTS response', extra={'bytes': len(audio_data)})
+            if tts_cache is not None and audio_data:
+                tts_cache.set(self._speech_cache_key(params), audio_data)
+            return audio_data
+
+        except Exception as e:
+            logger.exception('OpenAI TTS error: %s', e)
+            return b''
+
+    async def atext_to_speech(self, text):
+        """
+        テキストを音声に変換（TTS・非同期版）
+
+        Args:
+            text (str): 音声化するテキスト
+
+        Returns:
+            bytes: 音声データ（MP3形式）
+        """
+        if not text or text.strip() == '':
+            logger.warning('TTS skipped: empty text')
+            return b''
+
+        params = self._speech_params(text)
+        tts_cache = get_tts_cache()
+        if tts_cache is not None:
+            cached = await offload('db')(tts_cache.get)(self._speech_cache_key(params))
+            if cached:
+                return cached
 
-            response = client.audio.speech.create(
-                model="tts-1",  # or "tts-1-hd" for higher quality
-                voice="nova",   # Options: alloy, echo, fable, onyx, nova, shimmer
-                input=text
+        try:
+            logger.debug('TTS request', extra={'chars': len(text)})
+            response = await get_endpoint('tts').acall(
+                lambda: get_async_openai_client().audio.speech.create(**params)
             )
 
-            # Read binary audio data from response
-            audio_data = response.read()
-            print(f"TTS Success: Received {len(audio_data)} bytes")
+            audio_data = response.content
+            logger.debug('TTS response', extra={'bytes': len(audio_data)})
+            if tts_cache is not None and audio_data:
+                await offload('db')(tts_cache.set)(self._speech_cache_key(params), audio_data)
             return audio_data
 
         except Exception as e:
-            print(f"OpenAI TTS Error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('OpenAI TTS error: %s', e)
             return b''
@@ -0,0 +1,108 @@
+"""
+Deepgram streaming STT over WebSocket.
+
+Audio chunks are forwarded to ``/v1/listen`` as they arrive and interim /
+final transcripts are delivered through an async callback. Requires the
+optional ``websockets`` package (``uv sync --extra streaming``).
+"""
+
+import asyncio
+import json
+from urllib.parse import urlencode
+from django.conf import settings
+
+try:
+    from websockets.asyncio.client import connect as ws_connect
+except ImportError:  # pragma: no cover - optional dependency
+    ws_connect = None
+
+
+class StreamingUnavailable(RuntimeError):
+    """ストリーミングSTTが利用できない"""
+
+
+class DeepgramStreamingSession:
+    """1セッション分のDeepgramストリーミング接続
+
+    Args:
+        on_transcript: ``await on_transcript(text, confidence, is_final)``
+        url: ストリーミングエンドポイント（省略時は設定値）
+    """
+
+    def __init__(self, on_transcript, url=None):
+        self.on_transcript = on_transcript
+        self.url = url or settings.DEEPGRAM_STREAMING_URL
+        self.api_key = settings.DEEPGRAM_API_KEY
+        self._ws = None
+        self._reader = None
+
+    @staticmethod
+    def _params():
+        return {
+            "model": "nova-2",
+            "language": "ja",
+            "punctuate": "true",
+            "interim_results": "true",
+        }
+
+    async def start(self):
+        """ストリーミング接続を開始"""
+        if ws_connect is None:
+            raise StreamingUnavailable('Streaming STT requires the "websockets" package')
+
+        self._ws = await ws_connect(
+            f"{self.url}?{urlencode(self._params())}",
+            additional_headers={"Authorization": f"Token {self.api_key}"},
+            max_size=None,
+        )
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def send_audio(self, audio_data):
+        """音声チャンクを送信"""
+        if self._ws is None:
+            raise StreamingUnavailable('Streaming session is not started')
+        await self._ws.send(bytes(audio_data))
+
+    async def finish(self, timeout=10.0):
+        """残りの音声を確定させて接続を閉じる"""
+        if self._ws is None:
+            return
+        try:
+            await self._ws.send(json.dumps({"type": "CloseStream"}))
+            await asyncio.wait_for(asyncio.shield(self._reader), timeout)
+        except Exception:
+            pass
+        finally:
+            await self.close()
+
+    async def close(self):
+        """接続を即座に閉じる"""
+        if self._reader is not None:
+            if self._reader.done():
+                if not self._reader.cancelled():
+                    self._reader.exception()
+            else:
+                self._reader.cancel()
+        if self._ws is not None:
+            await self._ws.close()
+        self._ws = None
+        self._reader = None
+
+    async def _read_loop(self):
+        async for message in self._ws:
+            if isinstance(message, bytes):
+                continue
+            data = json.loads(message)
+            if data.get('type') != 'Results':
+                continue
+
+            alternatives = data.get('channel', {}).get('alternatives', [{}])
+            transcript = alternatives[0].get('transcript', '') if alternatives else ''
+            if not transcript:
+                continue
+
+            await self.on_transcript(
+                transcript,
+                alternatives[0].get('confidence', 0.0),
+                bool(data.get('is_final'))
+            )
@@ -2,17 +2,32 @@
 LLM Service using OpenAI GPT for emotion analysis and response generation.
 """
 
+import asyncio
 import json
-import openai
-from django.conf import settings
-from apps.emotions.models import Emotion
+import logging
+from apps.emotions.registry import get_registry, loaded_registry
+from ..executors import database_offload
+from ..streaming import JSONStringFieldExtractor
+from .clients import get_openai_client, get_async_openai_client
+from .resilience import get_endpoint
+
+logger = logging.getLogger(__name__)
+
+LLM_MODEL = 'gpt-4o-mini'  # gpt-4o-miniはjson_objectをサポート
+
+DEFAULT_EMOTIONS = ['joy', 'sadness', 'fear', 'anger', 'neutral']
+
+# Fixed responses used when there is no input or the LLM call fails
+EMPTY_INPUT_RESPONSE = '何かお話しされたいことはありますか？'
+ERROR_RESPONSE = 'お話を聞かせていただき、ありがとうございます。'
+FALLBACK_RESPONSES = (EMPTY_INPUT_RESPONSE, ERROR_RESPONSE)
 
 
 class LLMService:
     """OpenAI LLM Service for conversation analysis"""
 
     def __init__(self):
-        self.client = openai.Client(api_key=settings.OPENAI_API_KEY)
+        self.client = get_openai_client()
 
     def analyze_conversation(self, patient_text):
         """
@@ -29,16 +44,145 @@ class LLMService:
             }
         """
         if not patient_text or patient_text.strip() == '':
-            return {
-                'response': '何かお話しされたいことはありますか？',
-                'emotion': 'neutral',
-                'reason': '患者からの発話がありませんでした。'
-            }
+            return self._empty_result()
+
+        emotion_names = self._load_emotion_names()
+
+        try:
+            endpoint = get_endpoint('llm')
+            response = endpoint.call(lambda: self.client.chat.completions.create(
+                **self._completion_params(patient_text, emotion_names),
+                timeout=endpoint.deadline
+            ))
+            return self._parse_result(response, emotion_names)
+
+        except Exception as e:
+            logger.warning('LLM analysis error: %s', e, extra={'error': type(e).__name__})
+            return self._error_result()
+
+    async def aanalyze_conversation(self, patient_text):
+        """
+        会話テキストを分析し、応答と感情を生成（非同期版）
+
+        Args:
+            patient_text (str): 患者の会話テキスト
+
+        Returns:
+            dict: analyze_conversation と同じ形式
+        """
+        if not patient_text or patient_text.strip() == '':
+            return self._empty_result()
+
+        emotion_names = await self._aload_emotion_names()
+
+        try:
+            response = await get_endpoint('llm').acall(
+                lambda: get_async_openai_client().chat.completions.create(
+                    **self._completion_params(patient_text, emotion_names)
+                )
+            )
+            return self._parse_result(response, emotion_names)
+
+        except Exception as e:
+            logger.warning('LLM analysis error: %s', e, extra={'error': type(e).__name__})
+            return self._error_result()
+
+    async def astream_analysis(self, patient_text, on_response_text):
+        """
+        LLM応答をストリーミングで生成し、``response``フィールドを逐次通知
 
-        # Get emotions list
-        emotions_list = list(Emotion.objects.values_list('name', flat=True))
-        if not emotions_list:
-            emotions_list = ['joy', 'sadness', 'fear', 'anger', 'neutral']
+        Args:
+            patient_text (str): 患者の会話テキスト
+            on_response_text: ``await on_response_text(delta)`` 応答テキストの差分
+
+        Returns:
+            dict: analyze_conversation と同じ形式
+        """
+        if not patient_text or patient_text.strip() == '':
+            result = self._empty_result()
+            await on_response_text(result['response'])
+            return result
+
+        emotion_names = await self._aload_emotion_names()
+        extractor = JSONStringFieldExtractor('response')
+        streamed = []
+
+        endpoint = get_endpoint('llm')
+        started = None
+
+        try:
+            # Streaming is not hedged; the breaker and deadline still apply. The
+            # client timeout bounds each read, so the deadline covers the whole stream
+            started = endpoint.before()
+            async with asyncio.timeout(endpoint.deadline):
+                stream = await get_async_openai_client().chat.completions.create(
+                    **self._completion_params(patient_text, emotion_names),
+                    stream=True,
+                    timeout=endpoint.deadline
+                )
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    text = extractor.feed(delta)
+                    if text:
+                        streamed.append(text)
+                        await on_response_text(text)
+
+            result = json.loads(extractor.buffer)
+            result['emotion'] = self._resolve_emotion(result.get('emotion', 'neutral'), emotion_names)
+            endpoint.after(started)
+            return result
+
+        except asyncio.CancelledError:
+            if started is not None:
+                endpoint.breaker.release()
+            raise
+
+        except Exception as e:
+            logger.warning('LLM analysis error: %s', e, extra={'error': type(e).__name__})
+            if started is not None:
+                endpoint.after(started, e)
+            result = self._error_result()
+            if streamed:
+                # Part of the response has already been spoken; keep it as the final text
+                result['response'] = ''.join(streamed)
+            else:
+                await on_response_text(result['response'])
+            return result
+
+    @staticmethod
+    def _load_emotion_names():
+        """登録済みの感情名一覧（感情レジストリから取得）"""
+        return list(get_registry().names)
+
+    async def _aload_emotion_names(self):
+        """登録済みの感情名一覧（読み込み済みならDBアクセスなし）"""
+        registry = loaded_registry()
+        if registry is not None:
+            return list(registry.names)
+        return await database_offload(self._load_emotion_names)()
+
+    @staticmethod
+    def _empty_result():
+        return {
+            'response': EMPTY_INPUT_RESPONSE,
+            'emotion': 'neutral',
+            'reason': '患者からの発話がありませんでした。'
+        }
+
+    @staticmethod
+    def _error_result():
+        # Return fallback response
+        return {
+            'response': ERROR_RESPONSE,
+            'emotion': 'neutral',
+            'reason': 'システムエラーのため、詳細な分析ができませんでした。'
+        }
+
+    def _completion_params(self, patient_text, emotion_names):
+        """chat.completions.create の引数を組み立てる"""
+        emotions_list = emotion_names or DEFAULT_EMOTIONS
 
         prompt = f"""あなたは共感的で非批判的な医療AIアシスタントです。
 
@@ -58,38 +202,28 @@ JSON形式で返答してください:
   "reason": "感情選定理由"
 }}"""
 
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",  # gpt-4o-miniはjson_objectをサポート
-                messages=[
-                    {"role": "system", "content": "あなたは共感的な医療AIアシスタントです。患者の気持ちに寄り添い、非批判的に応答します。"},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.7,
-                max_tokens=500
-            )
+        return {
+            'model': LLM_MODEL,
+            'messages': [
+                {"role": "system", "content": "あなたは共感的な医療AIアシスタントです。患者の気持ちに寄り添い、非批判的に応答します。"},
+                {"role": "user", "content": prompt}
+            ],
+            'response_format': {"type": "json_object"},
+            'temperature': 0.7,
+            'max_tokens': 500,
+        }
 
-            result = json.loads(response.choices[0].message.content)
-            
-            # Validate emotion exists in database
-            emotion_name = result.get('emotion', 'neutral')
-            if not Emotion.objects.filter(name=emotion_name).exists():
-                # Fallback to neutral if emotion not found
-                emotion_name = 'neutral'
-                if not Emotion.objects.filter(name='neutral').exists():
-                    # Use first available emotion
-                    emotion_name = emotions_list[0] if emotions_list else 'joy'
-            
-            result['emotion'] = emotion_name
-            
-            return result
+    def _parse_result(self, response, emotion_names):
+        """LLMレスポンスを解析し、感情名をDB登録済みのものに正規化"""
+        result = json.loads(response.choices[0].message.content)
+        result['emotion'] = self._resolve_emotion(result.get('emotion', 'neutral'), emotion_names)
+        return result
 
-        except Exception as e:
-            print(f"LLM Analysis Error: {e}")
-            # Return fallback response
-            return {
-                'response': 'お話を聞かせていただき、ありがとうございます。',
-                'emotion': 'neutral',
-                'reason': 'システムエラーのため、詳細な分析ができませんでした。'
-            }
+    @staticmethod
+    def _resolve_emotion(emotion_name, emotion_names):
+        """感情名がDBに存在しなければ neutral → 先頭の感情 の順でフォールバック"""
+        if emotion_name in emotion_names:
+            return emotion_name
+        if 'neutral' in emotion_names:
+            return 'neutral'
+        return (emotion_names or DEFAULT_EMOTIONS)[0]
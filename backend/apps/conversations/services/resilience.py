@@ -0,0 +1,259 @@
+"""
+Resilience layer for external speech/LLM APIs.
+
+Each endpoint (``stt``, ``llm``, ``tts``) gets:
+
+- a deadline passed to the HTTP/OpenAI client (sync) or enforced with
+  ``asyncio.wait_for`` (async); the shared OpenAI clients do not retry
+  (``max_retries=0``), so one call cannot outlive it;
+- a circuit breaker over the last ``WINDOW`` calls that opens when the error
+  rate or the slow-call rate crosses its threshold, rejects calls with
+  ``CircuitOpen`` for ``OPEN_SECONDS`` so callers fall back immediately, then
+  lets a single probe through (half-open) before closing again;
+- optional hedging (async only): if the first attempt has not finished after
+  the endpoint's recent p95 latency, a second identical attempt is started
+  and whichever succeeds first wins.
+
+Settings live in ``CONVERSATION_RESILIENCE`` (``DEFAULT`` merged with the
+per-endpoint dict).
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from apps.core.metrics import registry
+
+external_requests = registry.counter(
+    'conversation_external_requests_total',
+    'External API calls by endpoint and outcome (success/error/timeout/rejected)'
+)
+external_latency = registry.counter(
+    'conversation_external_latency_seconds_total',
+    'Total latency of completed external API calls by endpoint'
+)
+hedged_requests = registry.counter(
+    'conversation_hedged_requests_total',
+    'Hedged calls that succeeded, by endpoint and winning attempt (primary/hedge)'
+)
+circuit_state = registry.gauge(
+    'conversation_circuit_state',
+    'Circuit breaker state by endpoint (0=closed, 1=half-open, 2=open)'
+)
+circuit_opened = registry.counter(
+    'conversation_circuit_opened_total',
+    'Times a circuit breaker opened, by endpoint'
+)
+
+DEFAULT_POLICY = {
+    'DEADLINE': 30.0,
+    'WINDOW': 20,
+    'MIN_CALLS': 10,
+    'ERROR_RATE': 0.5,
+    'SLOW_CALL_SECONDS': 10.0,
+    'SLOW_RATE': 0.8,
+    'OPEN_SECONDS': 30.0,
+    'HEDGE': False,
+    'HEDGE_QUANTILE': 0.95,
+    'HEDGE_MIN_DELAY': 0.5,
+}
+
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+
+class ResilienceError(Exception):
+    """耐障害レイヤーが呼び出しを打ち切った"""
+
+
+class CircuitOpen(ResilienceError):
+    """サーキットブレーカーが開いているため呼び出しを拒否"""
+
+
+class DeadlineExceeded(ResilienceError):
+    """締め切りまでに応答がなかった"""
+
+
+class CircuitBreaker:
+    """直近の呼び出し結果にもとづくサーキットブレーカー"""
+
+    def __init__(self, name, policy):
+        self.name = name
+        self.policy = policy
+        self.state = CLOSED
+        self._results = deque(maxlen=policy['WINDOW'])
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        circuit_state.set_function(lambda: self.state, endpoint=name)
+
+    def allow(self):
+        """呼び出し可否を判定（不可ならCircuitOpen）"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.policy['OPEN_SECONDS']:
+                    raise CircuitOpen(self.name)
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpen(self.name)
+                self._probing = True
+
+    def release(self):
+        """結果を記録せずに呼び出しを終える（キャンセル時）"""
+        with self._lock:
+            self._probing = False
+
+    def record(self, ok, duration):
+        """呼び出し結果を記録"""
+        slow = duration >= self.policy['SLOW_CALL_SECONDS']
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if ok and not slow:
+                    self.state = CLOSED
+                    self._results.clear()
+                else:
+                    self._open()
+                return
+
+            self._results.append((ok, slow))
+            calls = len(self._results)
+            if calls < self.policy['MIN_CALLS']:
+                return
+            errors = sum(1 for result_ok, _ in self._results if not result_ok)
+            slows = sum(1 for _, result_slow in self._results if result_slow)
+            if errors / calls >= self.policy['ERROR_RATE'] or slows / calls >= self.policy['SLOW_RATE']:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._results.clear()
+        circuit_opened.inc(endpoint=self.name)
+
+
+class Endpoint:
+    """1つの外部APIエンドポイントの締め切り・ブレーカー・ヘッジ設定"""
+
+    def __init__(self, name, policy):
+        self.name = name
+        self.policy = policy
+        self.deadline = policy['DEADLINE']
+        self.breaker = CircuitBreaker(name, policy)
+        self._latencies = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+    def hedge_delay(self):
+        """ヘッジを開始するまでの待ち時間（直近レイテンシのp95）"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < self.policy['MIN_CALLS']:
+            return None
+        index = min(len(latencies) - 1, int(len(latencies) * self.policy['HEDGE_QUANTILE']))
+        return max(self.policy['HEDGE_MIN_DELAY'], latencies[index])
+
+    def before(self):
+        """呼び出し前のチェック（ブレーカーが開いていればCircuitOpen）"""
+        try:
+            self.breaker.allow()
+        except CircuitOpen:
+            external_requests.inc(endpoint=self.name, outcome='rejected')
+            raise
+        return time.monotonic()
+
+    def after(self, started, error=None):
+        """呼び出し結果を記録"""
+        duration = time.monotonic() - started
+        self.breaker.record(error is None, duration)
+        if error is None:
+            outcome = 'success'
+            with self._lock:
+                self._latencies.append(duration)
+        elif isinstance(error, (DeadlineExceeded, asyncio.TimeoutError)) or 'timeout' in type(error).__name__.lower():
+            outcome = 'timeout'
+        else:
+            outcome = 'error'
+        external_requests.inc(endpoint=self.name, outcome=outcome)
+        external_latency.inc(duration, endpoint=self.name)
+
+    def call(self, func):
+        """同期呼び出し（締め切りは ``self.deadline`` をクライアントのtimeoutに渡す）"""
+        started = self.before()
+        try:
+            result = func()
+        except Exception as e:
+            self.after(started, e)
+            raise
+        self.after(started)
+        return result
+
+    async def acall(self, factory):
+        """非同期呼び出し（``factory()`` は毎回新しいコルーチンを返す）"""
+        started = self.before()
+        try:
+            if self.policy['HEDGE']:
+                result = await self._hedged(factory)
+            else:
+                result = await self._attempt(factory)
+        except asyncio.CancelledError:
+            # Cancelled by the caller (e.g. a superseded speculative analysis): not a failure
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self.after(started, e)
+            raise
+        self.after(started)
+        return result
+
+    async def _attempt(self, factory):
+        try:
+            return await asyncio.wait_for(factory(), self.deadline)
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded(f'{self.name} exceeded {self.deadline}s') from e
+
+    async def _hedged(self, factory):
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(self._attempt(factory))
+        attempts = [primary]
+        try:
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                attempts.append(asyncio.ensure_future(self._attempt(factory)))
+
+            pending = set(attempts)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(attempts) > 1:
+                            hedged_requests.inc(endpoint=self.name, winner='primary' if task is primary else 'hedge')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+
+_endpoints = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint(name):
+    """設定にもとづくエンドポイント（プロセス内で共有）"""
+    endpoint = _endpoints.get(name)
+    if endpoint is None:
+        with _endpoints_lock:
+            endpoint = _endpoints.get(name)
+            if endpoint is None:
+                config = getattr(settings, 'CONVERSATION_RESILIENCE', {})
+                policy = {**DEFAULT_POLICY, **config.get('DEFAULT', {}), **config.get(name, {})}
+                endpoint = _endpoints[name] = Endpoint(name, policy)
+    return endpoint
@@ -0,0 +1,141 @@
+"""
+Content-addressed cache for synthesised TTS audio.
+
+Audio is keyed by a hash of (text, model, voice, format). The disk backend
+keeps at most ``MAX_BYTES`` of audio and evicts least recently used files;
+pinned entries (pre-rendered fallback phrases) are never evicted. The
+``cache`` backend stores audio in a Django cache (e.g. Redis configured with
+an LRU ``maxmemory-policy``).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import caches
+
+
+def tts_cache_key(text, model, voice, audio_format):
+    """TTSパラメータからキャッシュキーを生成"""
+    payload = json.dumps([text, model, voice, audio_format], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DiskTTSCache:
+    """ディスク上のLRU TTSキャッシュ"""
+
+    def __init__(self, location, max_bytes):
+        self.location = Path(location)
+        self.max_bytes = max_bytes
+        self._total = None
+        self._lock = threading.Lock()
+
+    def _path(self, key, pinned=False):
+        base = self.location / 'pinned' if pinned else self.location / 'lru'
+        return base / key[:2] / key
+
+    def get(self, key):
+        for pinned in (True, False):
+            path = self._path(key, pinned)
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                continue
+            if not pinned:
+                # Touch so mtime reflects last access for LRU eviction
+                os.utime(path)
+            return data
+        return None
+
+    def set(self, key, data, pinned=False):
+        path = self._path(key, pinned)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        existing = path.stat().st_size if path.exists() else 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        if not pinned:
+            with self._lock:
+                if self._total is None:
+                    self._total = self._scan_total()
+                else:
+                    self._total += len(data) - existing
+                if self._total > self.max_bytes:
+                    self._evict()
+
+    def _lru_files(self):
+        root = self.location / 'lru'
+        if not root.exists():
+            return []
+        return [p for p in root.glob('*/*') if p.is_file()]
+
+    def _scan_total(self):
+        return sum(p.stat().st_size for p in self._lru_files())
+
+    def _evict(self):
+        """最終アクセスが古い順に削除して上限以下にする"""
+        files = []
+        for path in self._lru_files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._total = total
+
+
+class DjangoCacheTTSCache:
+    """Djangoキャッシュ（Redis等）を使うTTSキャッシュ"""
+
+    def __init__(self, alias='default', timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    def _key(self, key):
+        return f"tts:{key}"
+
+    def get(self, key):
+        return caches[self.alias].get(self._key(key))
+
+    def set(self, key, data, pinned=False):
+        # Pinned entries never expire; eviction is left to the cache server
+        timeout = None if pinned else self.timeout
+        caches[self.alias].set(self._key(key), data, timeout=timeout)
+
+
+_tts_cache = None
+_tts_cache_lock = threading.Lock()
+
+
+def get_tts_cache():
+    """設定に応じたTTSキャッシュを返す（無効ならNone）"""
+    global _tts_cache
+    if _tts_cache is None:
+        with _tts_cache_lock:
+            if _tts_cache is None:
+                config = getattr(settings, 'TTS_CACHE', {})
+                backend = config.get('BACKEND')
+                if backend == 'disk':
+                    _tts_cache = DiskTTSCache(config['LOCATION'], config.get('MAX_BYTES', 100 * 1024 * 1024))
+                elif backend == 'cache':
+                    _tts_cache = DjangoCacheTTSCache(config.get('ALIAS', 'default'), config.get('TIMEOUT'))
+                else:
+                    _tts_cache = False
+    return _tts_cache or None
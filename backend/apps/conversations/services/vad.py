@@ -0,0 +1,239 @@
+"""
+Energy-based voice-activity trimming before STT.
+
+Incoming audio is decoded to 16 kHz mono PCM with ``ffmpeg`` and split into
+short frames; a frame counts as speech when its RMS energy is clearly above
+the recording's noise floor, or moderately above it with a speech-like
+zero-crossing rate. Chunks without quiet parts to estimate a floor from
+(continuous speech) are judged on the absolute ``THRESHOLD_DB`` only. Chunks without any speech are dropped before upload, and
+long leading/trailing silence is cut off and the remainder re-encoded.
+
+Requires the optional ``numpy`` package (``uv sync --extra vad``) and an
+``ffmpeg`` binary; without them, or for audio ffmpeg cannot decode on its own
+(e.g. MediaRecorder continuation chunks without a header), audio is passed
+through unchanged.
+"""
+
+import io
+import shutil
+import subprocess
+import wave
+from collections import namedtuple
+from django.conf import settings
+from apps.core.metrics import registry
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+SAMPLE_RATE = 16000
+
+vad_chunks = registry.counter(
+    'conversation_vad_chunks_total',
+    'Audio chunks seen by the VAD stage by outcome (dropped/trimmed/unchanged/skipped)'
+)
+vad_input_seconds = registry.counter(
+    'conversation_vad_input_seconds_total',
+    'Decoded audio seconds seen by the VAD stage'
+)
+vad_saved_seconds = registry.counter(
+    'conversation_vad_saved_seconds_total',
+    'Audio seconds not sent to STT because they were silent'
+)
+vad_saved_bytes = registry.counter(
+    'conversation_vad_saved_bytes_total',
+    'Upload bytes saved by the VAD stage'
+)
+
+# audio: bytes to send (None = drop), content_type: MIME type of audio,
+# outcome: dropped/trimmed/unchanged/skipped, input/kept seconds of audio
+VADResult = namedtuple('VADResult', ['audio', 'content_type', 'outcome', 'input_seconds', 'kept_seconds'])
+
+
+class VADUnavailable(RuntimeError):
+    """VADが利用できない（numpy / ffmpeg がない、または音声をデコードできない）"""
+
+
+def vad_available():
+    """numpy と ffmpeg が利用可能か"""
+    return np is not None and shutil.which('ffmpeg') is not None
+
+
+def decode_pcm(audio_data, timeout=10):
+    """音声を16kHzモノラルのint16配列にデコード"""
+    if not vad_available():
+        raise VADUnavailable('numpy and ffmpeg are required')
+    proc = subprocess.run(
+        ['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', 'pipe:0',
+         '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), 'pipe:1'],
+        input=audio_data,
+        capture_output=True,
+        timeout=timeout
+    )
+    if proc.returncode != 0:
+        raise VADUnavailable(proc.stderr.decode('utf-8', 'replace').strip() or 'ffmpeg failed')
+    return np.frombuffer(proc.stdout, dtype=np.int16)
+
+
+def encode_webm(pcm, timeout=10):
+    """int16 PCMをWebM/Opusにエンコード"""
+    proc = subprocess.run(
+        ['ffmpeg', '-nostdin', '-loglevel', 'error',
+         '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), '-i', 'pipe:0',
+         '-c:a', 'libopus', '-b:a', '32k', '-f', 'webm', 'pipe:1'],
+        input=pcm.tobytes(),
+        capture_output=True,
+        timeout=timeout
+    )
+    if proc.returncode != 0:
+        raise VADUnavailable(proc.stderr.decode('utf-8', 'replace').strip() or 'ffmpeg failed')
+    return proc.stdout
+
+
+def encode_wav(pcm):
+    """int16 PCMをWAVにエンコード"""
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+def energy_dbfs(pcm):
+    """PCM全体のRMSエネルギー（dBFS）"""
+    if len(pcm) == 0:
+        return -200.0
+    samples = pcm.astype(np.float32) / 32768.0
+    return float(20.0 * np.log10(max(float(np.sqrt(np.mean(samples * samples))), 1e-10)))
+
+
+def speech_mask(pcm, frame_ms=20, threshold_db=-45.0, noise_margin_db=12.0, zcr_range=(0.02, 0.35), pad_ms=200):
+    """フレームごとの発話判定（ベクトル化）
+
+    Args:
+        pcm: int16 PCM（16kHz）
+        frame_ms: フレーム長（ミリ秒）
+        threshold_db: 発話とみなす最小エネルギー（dBFS）
+        noise_margin_db: ノイズフロアからの余裕（dB）
+        zcr_range: 有声音とみなすゼロ交差率の範囲
+        pad_ms: 発話フレームの前後に残す余白（ミリ秒）
+
+    Returns:
+        tuple: (フレームごとのbool配列, 1フレームのサンプル数)
+    """
+    frame = SAMPLE_RATE * frame_ms // 1000
+    count = len(pcm) // frame
+    if count == 0:
+        return np.zeros(0, dtype=bool), frame
+
+    frames = pcm[:count * frame].reshape(count, frame).astype(np.float32) / 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    energy_db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+    # Adaptive threshold: quiet rooms use the absolute floor, noisy ones the noise floor + margin.
+    # The floor is only estimated when the chunk has quiet and loud parts; a chunk without
+    # dynamic range (continuous speech, or steady noise) is judged on the absolute floor alone
+    noise_floor = np.percentile(energy_db, 10)
+    if np.percentile(energy_db, 90) - noise_floor >= noise_margin_db:
+        strong = max(threshold_db, noise_floor + noise_margin_db)
+        weak = max(threshold_db, noise_floor + noise_margin_db / 2)
+    else:
+        strong = weak = threshold_db
+    voiced = (zcr >= zcr_range[0]) & (zcr <= zcr_range[1])
+    mask = (energy_db >= strong) | ((energy_db >= weak) & voiced)
+
+    # Dilate so word onsets/offsets around detected speech are kept
+    pad = pad_ms // frame_ms
+    if pad and mask.any():
+        kernel = np.ones(2 * pad + 1, dtype=np.int32)
+        mask = np.convolve(mask.astype(np.int32), kernel, mode='same') > 0
+    return mask, frame
+
+
+class VoiceActivityTrimmer:
+    """STT前の無音除去
+
+    Args:
+        config: ``CONVERSATION_VAD`` 形式の設定（省略時は設定値）
+    """
+
+    def __init__(self, config=None):
+        config = config if config is not None else getattr(settings, 'CONVERSATION_VAD', {})
+        self.threshold_db = config.get('THRESHOLD_DB', -45.0)
+        self.noise_margin_db = config.get('NOISE_MARGIN_DB', 12.0)
+        self.pad_ms = config.get('PAD_MS', 200)
+        self.min_trim_seconds = config.get('MIN_TRIM_SECONDS', 0.5)
+        self.output_format = config.get('OUTPUT_FORMAT', 'webm')
+
+    def process(self, audio_data, content_type='audio/webm'):
+        """
+        無音チャンクを破棄し、前後の無音を除去する
+
+        Args:
+            audio_data (bytes): 音声データ
+            content_type (str): 音声データのMIMEタイプ
+
+        Returns:
+            VADResult: audioがNoneなら送信不要（発話なし）
+        """
+        try:
+            pcm = decode_pcm(audio_data)
+        except (VADUnavailable, subprocess.TimeoutExpired):
+            vad_chunks.inc(outcome='skipped')
+            return VADResult(audio_data, content_type, 'skipped', None, None)
+
+        result = self._trim(pcm, audio_data, content_type)
+        vad_chunks.inc(outcome=result.outcome)
+        vad_input_seconds.inc(result.input_seconds)
+        vad_saved_seconds.inc(result.input_seconds - result.kept_seconds)
+        sent = len(result.audio) if result.audio is not None else 0
+        if sent < len(audio_data):
+            vad_saved_bytes.inc(len(audio_data) - sent)
+        return result
+
+    def _trim(self, pcm, audio_data, content_type):
+        input_seconds = len(pcm) / SAMPLE_RATE
+        mask, frame = speech_mask(
+            pcm,
+            threshold_db=self.threshold_db,
+            noise_margin_db=self.noise_margin_db,
+            pad_ms=self.pad_ms
+        )
+        if not mask.any():
+            # Never drop a chunk that is loud overall, whatever the frame-level decision
+            if energy_dbfs(pcm) >= self.threshold_db + self.noise_margin_db:
+                return VADResult(audio_data, content_type, 'unchanged', input_seconds, input_seconds)
+            return VADResult(None, content_type, 'dropped', input_seconds, 0.0)
+
+        speech = np.flatnonzero(mask)
+        start = speech[0] * frame
+        end = min(len(pcm), (speech[-1] + 1) * frame)
+        kept_seconds = (end - start) / SAMPLE_RATE
+        if input_seconds - kept_seconds < self.min_trim_seconds:
+            return VADResult(audio_data, content_type, 'unchanged', input_seconds, input_seconds)
+
+        segment = pcm[start:end]
+        if self.output_format == 'wav':
+            return VADResult(encode_wav(segment), 'audio/wav', 'trimmed', input_seconds, kept_seconds)
+        try:
+            return VADResult(encode_webm(segment), 'audio/webm', 'trimmed', input_seconds, kept_seconds)
+        except (VADUnavailable, subprocess.TimeoutExpired):
+            return VADResult(encode_wav(segment), 'audio/wav', 'trimmed', input_seconds, kept_seconds)
+
+
+_trimmer = None
+
+
+def get_trimmer():
+    """設定で有効ならプロセス共有のTrimmerを返す（無効ならNone）"""
+    global _trimmer
+    if not getattr(settings, 'CONVERSATION_VAD', {}).get('ENABLED', False):
+        return None
+    if _trimmer is None:
+        _trimmer = VoiceActivityTrimmer()
+    return _trimmer
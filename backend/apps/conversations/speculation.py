@@ -0,0 +1,113 @@
+"""
+Speculative emotion analysis while the patient is still talking.
+
+After each transcript update the accumulated text is analysed in the
+background (debounced). Results are keyed by a hash of the text, so an
+``end_session`` with unchanged text can reuse the result instead of waiting
+for a fresh LLM round trip.
+"""
+
+import asyncio
+import hashlib
+import time
+from apps.core.metrics import registry
+
+speculative_requests = registry.counter(
+    'conversation_speculative_analysis_total',
+    'end_session lookups of speculative analysis by outcome (hit/miss)'
+)
+speculative_saved_seconds = registry.counter(
+    'conversation_speculative_saved_seconds_total',
+    'LLM latency saved by reusing speculative analysis'
+)
+speculative_started = registry.counter(
+    'conversation_speculative_started_total',
+    'Speculative analyses started'
+)
+
+
+def text_key(text):
+    """テキストのハッシュキー"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class SpeculativeAnalyzer:
+    """1接続分の投機的解析
+
+    Args:
+        analyze: ``await analyze(text)`` 解析結果を返すコルーチン関数
+        debounce: 最後の更新から解析開始までの待機秒数
+    """
+
+    def __init__(self, analyze, debounce=1.5):
+        self.analyze = analyze
+        self.debounce = debounce
+        self._timer = None
+        self._task = None
+        self._key = None
+        self._started_at = None
+        self._finished_at = None
+
+    def schedule(self, text):
+        """テキスト更新を通知（デバウンス後に解析を開始）"""
+        if self._timer is not None:
+            self._timer.cancel()
+        if text and text.strip():
+            self._timer = asyncio.create_task(self._debounced(text))
+
+    async def _debounced(self, text):
+        await asyncio.sleep(self.debounce)
+        key = text_key(text)
+        if key == self._key:
+            return
+
+        self._cancel_task()
+        self._key = key
+        self._started_at = time.perf_counter()
+        self._finished_at = None
+        self._task = asyncio.create_task(self.analyze(text))
+        self._task.add_done_callback(self._on_done)
+        speculative_started.inc()
+
+    def _on_done(self, task):
+        if task is self._task:
+            self._finished_at = time.perf_counter()
+
+    async def resolve(self, text):
+        """終了時のテキストに一致する解析結果を返す（不一致ならNone）"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if self._task is None or text_key(text) != self._key:
+            speculative_requests.inc(outcome='miss')
+            self._cancel_task()
+            return None
+
+        task = self._task
+        finished_at = self._finished_at or time.perf_counter()
+        try:
+            result = await task
+        except Exception:
+            speculative_requests.inc(outcome='miss')
+            return None
+        finally:
+            self._task = None
+            self._key = None
+
+        speculative_requests.inc(outcome='hit')
+        speculative_saved_seconds.inc(finished_at - self._started_at)
+        return result
+
+    def _cancel_task(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._key = None
+
+    def cancel(self):
+        """保留中のタイマーと解析を全てキャンセル"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._cancel_task()
@@ -0,0 +1,133 @@
+"""
+Incremental text helpers for the streaming end-of-session pipeline.
+
+``JSONStringFieldExtractor`` decodes one string field of a JSON object while
+it is still being generated, and ``SentenceSplitter`` cuts the decoded text
+at sentence boundaries so TTS can start before the LLM finishes.
+"""
+
+import re
+
+_ESCAPES = {
+    '"': '"',
+    '\\': '\\',
+    '/': '/',
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+}
+
+SENTENCE_TERMINATORS = '。！？!?．\n'
+CLOSING_BRACKETS = '」』）)'
+
+
+class JSONStringFieldExtractor:
+    """ストリーミング中のJSONから文字列フィールドの値を逐次取り出す"""
+
+    def __init__(self, field):
+        self._key = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ''
+        self._pos = None
+        self.done = False
+
+    @property
+    def buffer(self):
+        """受信済みのJSON全体"""
+        return self._buffer
+
+    def feed(self, chunk):
+        """チャンクを追加し、新たにデコードできた文字列を返す"""
+        self._buffer += chunk
+        if self.done:
+            return ''
+
+        if self._pos is None:
+            match = self._key.search(self._buffer)
+            if not match:
+                return ''
+            self._pos = match.end()
+
+        buffer = self._buffer
+        i = self._pos
+        out = []
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '\\':
+                if i + 1 >= len(buffer):
+                    break
+                escaped = buffer[i + 1]
+                if escaped == 'u':
+                    if i + 6 > len(buffer):
+                        break
+                    code = int(buffer[i + 2:i + 6], 16)
+                    if 0xD800 <= code < 0xDC00:
+                        # Characters outside the BMP arrive as a surrogate pair;
+                        # wait until it is known whether the low half follows
+                        following = buffer[i + 6:i + 8]
+                        if len(following) < 2 and '\\u'.startswith(following):
+                            break
+                        if following == '\\u':
+                            if i + 12 > len(buffer):
+                                break
+                            low = int(buffer[i + 8:i + 12], 16)
+                            if 0xDC00 <= low < 0xE000:
+                                out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                                i += 12
+                                continue
+                    out.append(chr(code))
+                    i += 6
+                    continue
+                out.append(_ESCAPES.get(escaped, escaped))
+                i += 2
+                continue
+            if char == '"':
+                self.done = True
+                i += 1
+                break
+            out.append(char)
+            i += 1
+
+        self._pos = i
+        return ''.join(out)
+
+
+class SentenceSplitter:
+    """テキストを文単位に区切る"""
+
+    def __init__(self, min_length=2):
+        self.min_length = min_length
+        self._pending = ''
+
+    def feed(self, text):
+        """テキストを追加し、確定した文のリストを返す"""
+        self._pending += text
+        sentences = []
+        start = 0
+        i = 0
+        pending = self._pending
+        while i < len(pending):
+            if pending[i] in SENTENCE_TERMINATORS:
+                end = i + 1
+                while end < len(pending) and pending[end] in SENTENCE_TERMINATORS + CLOSING_BRACKETS:
+                    end += 1
+                # Wait for more text if the terminator run may continue
+                if end == len(pending):
+                    break
+                sentence = pending[start:end].strip()
+                if len(sentence) >= self.min_length:
+                    sentences.append(sentence)
+                    start = end
+                i = end
+                continue
+            i += 1
+
+        self._pending = pending[start:]
+        return sentences
+
+    def flush(self):
+        """残りのテキストを返す"""
+        rest = self._pending.strip()
+        self._pending = ''
+        return rest
@@ -0,0 +1,57 @@
+"""
+Celery tasks for conversations.
+"""
+
+from celery import shared_task
+from .events import notify_session
+from .finalize import SessionAlreadyEnded, finalize_session
+from .instrumentation import TRANSPORT_CELERY
+
+
+@shared_task(bind=True)
+def analyze_session(self, session_id, chunks=None):
+    """
+    セッション終了時の解析（LLM + TTS + 保存）をワーカーで実行
+
+    ``chunks`` はリクエストを受けたプロセスで読んだトランスクリプト
+    （``[[seq, text], ...]``）。ワーカーは別プロセスなので、プロセス内の
+    トランスクリプトストアからは読めない。
+
+    進捗は ``analysis_progress``、完了は ``session_ended``、失敗は
+    ``analysis_failed`` としてセッションのWebSocketへ通知する。
+    完了通知は状態のみで、結果（音声を含む）はタスクの戻り値として
+    結果バックエンドに保存し、クライアントはRESTで取得する。
+    """
+    job_id = self.request.id
+
+    def progress(stage):
+        notify_session(session_id, 'analysis.progress', {
+            'job_id': job_id,
+            'session_id': str(session_id),
+            'stage': stage
+        })
+
+    if chunks is not None:
+        # JSON has no integer keys, so the chunks travel as [seq, text] pairs
+        chunks = {int(seq): text for seq, text in chunks}
+
+    try:
+        result = finalize_session(session_id, progress, transport=TRANSPORT_CELERY, chunks=chunks)
+    except SessionAlreadyEnded:
+        notify_session(session_id, 'analysis.failed', {
+            'job_id': job_id,
+            'session_id': str(session_id),
+            'error': 'session_already_ended',
+            'message': 'セッションは既に終了しています'
+        })
+        return None
+
+    # The audio stays out of the channel layer; the client fetches the result
+    # from the result backend (GET /api/v1/sessions/{id}/jobs/{job_id}/)
+    notify_session(session_id, 'session.ended', {
+        'job_id': job_id,
+        'session_id': result['session_id'],
+        'status': 'completed',
+        'ended_at': result['ended_at']
+    })
+    return result
@@ -0,0 +1,43 @@
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+from apps.conversations.coalescing import CLUSTER_ID, EBML_MAGIC, ChunkCoalescer, container_header
+
+HEADER = EBML_MAGIC + b'header-and-tracks'
+FIRST = HEADER + CLUSTER_ID + b'cluster-0'
+
+
+class ChunkCoalescerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.batches = []
+        # max_bytes is large so only explicit flushes and gaps send a batch
+        self.coalescer = ChunkCoalescer(lambda seqs, audio: self.batches.append((seqs, audio)), max_bytes=1 << 20)
+        self.addCleanup(self.coalescer.cancel)
+
+    def add(self, *chunks):
+        async def run():
+            for seq, audio in chunks:
+                self.coalescer.add(seq, audio)
+        async_to_sync(run)()
+
+    def test_container_header_stops_at_first_cluster(self):
+        self.assertEqual(container_header(FIRST), HEADER)
+        self.assertEqual(container_header(HEADER), HEADER)
+        self.assertIsNone(container_header(b'\x00\x01pcm'))
+
+    def test_webm_header_is_prepended_to_later_batches(self):
+        self.add((0, FIRST), (1, b'-a'))
+        self.coalescer.flush()
+        self.add((2, b'-b'), (3, b'-c'))
+        self.coalescer.flush()
+        self.assertEqual(self.batches, [
+            ([0, 1], FIRST + b'-a'),
+            ([2, 3], HEADER + b'-b-c'),
+        ])
+
+    def test_raw_pcm_is_joined_unchanged(self):
+        self.add((0, b'\x00\x01'), (1, b'\x02\x03'))
+        self.coalescer.flush()
+        self.add((3, b'\x04'))
+        self.coalescer.flush()
+        self.assertEqual(self.batches, [([0, 1], b'\x00\x01\x02\x03'), ([3], b'\x04')])
@@ -0,0 +1,33 @@
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, override_settings
+from apps.conversations.consumers import ConversationConsumer
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    OPENAI_API_KEY='test-key',
+)
+class ProcessAudioValidationTests(SimpleTestCase):
+    """Malformed process_audio fields get a specific error, not the exception text"""
+
+    async def replies(self, messages):
+        communicator = WebsocketCommunicator(ConversationConsumer.as_asgi(), '/ws/conversation/')
+        await communicator.connect()
+        await communicator.receive_json_from()
+        replies = []
+        for message in messages:
+            await communicator.send_json_to({'type': 'process_audio', 'session_id': '1', **message})
+            replies.append(await communicator.receive_json_from())
+        await communicator.disconnect()
+        return replies
+
+    def test_invalid_seq(self):
+        messages = [{'seq': seq, 'audio_data': 'AAAA'} for seq in ('x', -1, True, 1.5, [0])]
+        for reply in async_to_sync(self.replies)(messages):
+            self.assertEqual(reply, {'type': 'error', 'message': 'Invalid seq'})
+
+    def test_invalid_base64(self):
+        messages = [{'seq': 0, 'audio_data': audio} for audio in ('abc', '!!!!', 'data:audio/webm;base64,AA=A', 123)]
+        for reply in async_to_sync(self.replies)(messages):
+            self.assertEqual(reply, {'type': 'error', 'message': 'Invalid audio payload'})
@@ -0,0 +1,92 @@
+import base64
+import json
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from apps.conversations import executors
+from apps.conversations.consumers import ConversationConsumer
+from apps.emotions.registry import get_registry
+from apps.patients.models import Patient
+
+ANALYSIS = {'emotion': 'happy', 'response': 'それは良かったですね。', 'reason': '前向きな発言'}
+
+
+def on_test_thread(func, thread_sensitive=False, executor=None):
+    # CaptureQueriesContext only sees the test thread's connection, so run the
+    # consumer's database work there instead of on the db pool
+    return database_sync_to_async(func)
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    CONVERSATION_COALESCE={'ENABLED': False},
+    CONVERSATION_SPECULATIVE_ANALYSIS=False,
+    CONVERSATION_VAD={'ENABLED': False},
+    OPENAI_API_KEY='test-key',
+)
+class SessionQueryCountTests(TransactionTestCase):
+    """A session touches the database on start and end only, however many chunks it has"""
+
+    def setUp(self):
+        self.patient = Patient.objects.create(name='患者', email='patient@example.com', password='x')
+        # Loaded once per process in production; keep it out of the count
+        get_registry()
+        for patcher in (
+            mock.patch.object(executors, 'database_sync_to_async', on_test_thread),
+            mock.patch.object(ConversationConsumer, 'transcribe_audio',
+                              mock.AsyncMock(return_value=('今日は元気です', 0.9))),
+            mock.patch.object(ConversationConsumer, 'analyze_conversation',
+                              mock.AsyncMock(return_value=ANALYSIS)),
+            mock.patch.object(ConversationConsumer, 'generate_tts',
+                              mock.AsyncMock(return_value=b'mp3')),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def run_session(self, chunks):
+        communicator = WebsocketCommunicator(ConversationConsumer.as_asgi(), '/ws/conversation/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+
+        await communicator.send_json_to({'type': 'start_session', 'patient_id': self.patient.id})
+        started = await communicator.receive_json_from()
+        self.assertEqual(started['type'], 'session_started')
+        session_id = started['session_id']
+
+        audio = base64.b64encode(b'\x00' * 3200).decode('ascii')
+        for seq in range(chunks):
+            await communicator.send_json_to({
+                'type': 'process_audio',
+                'session_id': session_id,
+                'seq': seq,
+                'audio_data': audio,
+            })
+        for _ in range(chunks):
+            processed = await communicator.receive_json_from()
+            self.assertEqual(processed['type'], 'audio_processed')
+
+        await communicator.send_json_to({'type': 'end_session', 'session_id': session_id})
+        ended = await communicator.receive_json_from(timeout=5)
+        self.assertEqual(ended['type'], 'session_ended', json.dumps(ended, ensure_ascii=False))
+        # Wait for the timing row and the dashboard summary written after the response
+        await communicator.disconnect()
+
+    def count_queries(self, chunks):
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(self.run_session)(chunks)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def test_chunks_do_not_query(self):
+        one = self.count_queries(1)
+        many = self.count_queries(20)
+        self.assertEqual(len(many), len(one), '\n'.join(many))
+
+    def test_full_session_queries(self):
+        # start: INSERT + SELECT with patient; end: guarded UPDATE + SessionTiming INSERT
+        with self.assertNumQueries(4):
+            async_to_sync(self.run_session)(5)
@@ -0,0 +1,69 @@
+import asyncio
+import base64
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+from apps.conversations import executors
+from apps.conversations.consumers import ConversationConsumer
+from apps.conversations.models import SessionTiming
+from apps.conversations.tests.test_consumer_queries import ANALYSIS, on_test_thread
+from apps.patients.models import Patient
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    CONVERSATION_COALESCE={'ENABLED': False},
+    CONVERSATION_SPECULATIVE_DEBOUNCE=0,
+    CONVERSATION_VAD={'ENABLED': False},
+    OPENAI_API_KEY='test-key',
+)
+class SessionTimingModeTests(TransactionTestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(name='患者', email='patient@example.com', password='x')
+        self.analyze = mock.AsyncMock(return_value=ANALYSIS)
+        for patcher in (
+            mock.patch.object(executors, 'database_sync_to_async', on_test_thread),
+            mock.patch.object(ConversationConsumer, 'transcribe_audio',
+                              mock.AsyncMock(return_value=('今日は元気です', 0.9))),
+            mock.patch.object(ConversationConsumer, 'analyze_conversation', self.analyze),
+            mock.patch.object(ConversationConsumer, 'generate_tts',
+                              mock.AsyncMock(return_value=b'mp3')),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def run_streamed_session(self):
+        communicator = WebsocketCommunicator(ConversationConsumer.as_asgi(), '/ws/conversation/')
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({
+            'type': 'start_session',
+            'patient_id': self.patient.id,
+            'speculative': True,
+        })
+        session_id = (await communicator.receive_json_from())['session_id']
+
+        await communicator.send_json_to({
+            'type': 'process_audio',
+            'session_id': session_id,
+            'seq': 0,
+            'audio_data': base64.b64encode(b'\x00' * 3200).decode('ascii'),
+        })
+        self.assertEqual((await communicator.receive_json_from())['type'], 'audio_processed')
+        # Let the debounced speculative analysis start and finish
+        await asyncio.sleep(0.1)
+
+        await communicator.send_json_to({'type': 'end_session', 'session_id': session_id, 'stream': True})
+        while (message := await communicator.receive_json_from(timeout=5))['type'] != 'session_ended':
+            self.assertEqual(message['type'], 'tts_audio_chunk')
+        await communicator.disconnect()
+        return session_id
+
+    def test_streamed_speculative_hit_is_recorded_as_speculative(self):
+        session_id = async_to_sync(self.run_streamed_session)()
+        self.assertEqual(self.analyze.await_count, 1)
+        timing = SessionTiming.objects.get(session_id=session_id)
+        self.assertEqual(timing.llm_mode, 'speculative')
+        self.assertEqual(timing.llm_ms, 0)
@@ -0,0 +1,61 @@
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser, Permission, User
+from django.test import TransactionTestCase, override_settings
+from apps.conversations.consumers import DoctorDashboardConsumer
+from apps.conversations.events import DASHBOARD_ALL_GROUP, patient_group
+from apps.patients.models import Patient
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class DashboardAuthorizationTests(TransactionTestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(name='患者', email='patient@example.com', password='x')
+        self.doctor = User.objects.create_user('doctor', password='x')
+        self.doctor.user_permissions.add(
+            Permission.objects.get(codename='view_conversationsession', content_type__app_label='conversations')
+        )
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def communicator(self, user, query=''):
+        communicator = WebsocketCommunicator(DoctorDashboardConsumer.as_asgi(), f'/ws/dashboard/{query}')
+        communicator.scope['user'] = user
+        return communicator
+
+    async def rejected(self, user):
+        communicator = self.communicator(user, '?all=1')
+        connected, code = await communicator.connect()
+        return not connected and code == 4403
+
+    def test_rejects_anonymous_and_users_without_permission(self):
+        self.assertTrue(async_to_sync(self.rejected)(AnonymousUser()))
+        self.assertTrue(async_to_sync(self.rejected)(User.objects.create_user('nurse', password='x')))
+
+    async def doctor_session(self):
+        communicator = self.communicator(self.doctor, f'?patient_id={self.patient.id}&patient_id=999&all=1')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        established = await communicator.receive_json_from()
+        self.assertEqual(established['subscriptions'], [patient_group(self.patient.id)])
+        self.assertEqual(established['denied'], ['999', 'all'])
+
+        await communicator.send_json_to({'type': 'subscribe', 'all': True})
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'error', 'message': 'Permission denied'})
+        await communicator.send_json_to({'type': 'subscribe', 'patient_id': '999'})
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'error', 'message': 'Permission denied'})
+        await communicator.disconnect()
+
+    def test_doctor_subscribes_to_existing_patients_only(self):
+        async_to_sync(self.doctor_session)()
+
+    async def staff_session(self):
+        communicator = self.communicator(self.staff, '?all=1')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        established = await communicator.receive_json_from()
+        self.assertEqual(established['subscriptions'], [DASHBOARD_ALL_GROUP])
+        await communicator.disconnect()
+
+    def test_staff_subscribes_to_all_patients(self):
+        async_to_sync(self.staff_session)()
@@ -0,0 +1,134 @@
+import asyncio
+import base64
+from unittest import mock
+from asgiref.sync import async_to_sync
+from celery.backends.cache import CacheBackend
+from channels.layers import get_channel_layer
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+from apps.conversations.events import session_group
+from apps.conversations.models import ConversationSession
+from apps.conversations.services import DeepgramService, LLMService
+from apps.conversations.tasks import analyze_session
+from apps.conversations.tests.test_consumer_queries import ANALYSIS
+from apps.conversations.transcripts import get_transcript_store
+from apps.patients.models import Patient
+from config.celery import app
+
+# Celery reads CELERY_* once at import, so the eager settings go on the app itself
+EAGER_CONF = {
+    'task_always_eager': True,
+    'task_store_eager_result': True,
+}
+
+
+@override_settings(
+    CELERY_TASK_ALWAYS_EAGER=True,
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    OPENAI_API_KEY='test-key',
+)
+class AsyncEndSessionTests(APITransactionTestCase):
+
+    def setUp(self):
+        previous = {key: app.conf[key] for key in EAGER_CONF}
+        app.conf.update(EAGER_CONF)
+        self.addCleanup(app.conf.update, previous)
+        # Eager results are stored in an in-memory result backend (cache+memory://)
+        backend = CacheBackend(app=app, url='memory://')
+        for patcher in (
+            mock.patch.object(type(app), 'backend', new_callable=mock.PropertyMock, return_value=backend),
+            mock.patch.object(LLMService, 'analyze_conversation', return_value=ANALYSIS),
+            mock.patch.object(DeepgramService, 'text_to_speech', return_value=b'mp3'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.client.force_authenticate(User.objects.create_user('doctor', password='x'))
+        patient = Patient.objects.create(name='患者', email='patient@example.com', password='x')
+        self.session = ConversationSession.objects.create(patient=patient, started_at=timezone.now())
+        store = get_transcript_store()
+        store.append(self.session.id, '元気です', 1)
+        store.append(self.session.id, '今日は', 0)
+        self.addCleanup(store.clear, self.session.id)
+
+        # Stand in for the patient's socket to see what the task reports
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(session_group(self.session.id), self.channel)
+
+    def end(self):
+        return self.client.post(reverse('session-end', kwargs={'pk': self.session.id}) + '?async=1')
+
+    def poll(self, job_id):
+        return self.client.get(reverse('session-job', kwargs={'pk': self.session.id, 'job_id': job_id}))
+
+    def events(self):
+        events = []
+        while True:
+            try:
+                events.append(self.layer.channels[self.channel].get_nowait()[1])
+            except asyncio.QueueEmpty:
+                return events
+
+    def test_async_end_returns_job_and_result_is_polled(self):
+        response = self.end()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'queued')
+        self.assertEqual(response.data['session_id'], str(self.session.id))
+        job_id = response.data['job_id']
+
+        result = self.poll(job_id)
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(result.data['status'], 'completed')
+        self.assertEqual(result.data['job_id'], job_id)
+        self.assertEqual(result.data['patient_text'], '今日は 元気です')
+        self.assertEqual(result.data['ai_response_text'], ANALYSIS['response'])
+        self.assertEqual(base64.b64decode(result.data['ai_audio_base64']), b'mp3')
+
+        self.session.refresh_from_db()
+        self.assertFalse(self.session.is_active)
+        self.assertEqual(self.session.ai_response_text, ANALYSIS['response'])
+
+        events = self.events()
+        self.assertEqual(
+            [event['stage'] for event in events if event['type'] == 'analysis.progress'],
+            ['transcript', 'analysis', 'tts', 'saving']
+        )
+        self.assertEqual(events[-1]['type'], 'session.ended')
+        self.assertEqual(events[-1]['job_id'], job_id)
+
+    def test_second_end_reports_already_ended(self):
+        self.assertEqual(self.end().status_code, status.HTTP_202_ACCEPTED)
+
+        response = self.end()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'session_already_ended')
+
+    def test_task_racing_an_earlier_end_does_not_overwrite_it(self):
+        first = self.end().data['job_id']
+        ended_at = ConversationSession.objects.get(id=self.session.id).ended_at
+        self.events()
+
+        # A second job queued before the first one saved passes the view's
+        # check; the guarded UPDATE in finalize_session refuses it
+        LLMService.analyze_conversation.return_value = {**ANALYSIS, 'response': '上書き'}
+        second = analyze_session.delay(self.session.id, [[0, '別の発言']]).id
+
+        response = self.poll(second)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['error'], 'session_already_ended')
+        self.assertEqual(self.poll(first).data['status'], 'completed')
+
+        session = ConversationSession.objects.get(id=self.session.id)
+        self.assertEqual(session.ended_at, ended_at)
+        self.assertEqual(session.ai_response_text, ANALYSIS['response'])
+        self.assertEqual(self.events()[-1]['type'], 'analysis.failed')
+
+    def test_unknown_job_is_reported_as_queued(self):
+        response = self.poll('no-such-job')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'queued')
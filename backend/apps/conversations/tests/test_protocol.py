@@ -0,0 +1,51 @@
+from django.test import SimpleTestCase
+from apps.conversations.protocol import (
+    FRAME_AUDIO_CHUNK,
+    FRAME_STREAM_AUDIO,
+    FRAME_TTS_AUDIO,
+    HEADER,
+    PROTOCOL_VERSION,
+    Frame,
+    FrameError,
+    count_frames,
+    decode_frame,
+    encode_frame,
+    iter_audio_frames,
+)
+
+
+class FrameProtocolTests(SimpleTestCase):
+
+    def test_header_is_fourteen_big_endian_bytes(self):
+        self.assertEqual(HEADER.size, 14)
+        frame = encode_frame(FRAME_AUDIO_CHUNK, 0x0102030405060708, 0x0A0B0C0D, b'pcm')
+        self.assertEqual(
+            frame,
+            bytes([PROTOCOL_VERSION, FRAME_AUDIO_CHUNK, 1, 2, 3, 4, 5, 6, 7, 8, 0x0A, 0x0B, 0x0C, 0x0D]) + b'pcm'
+        )
+
+    def test_round_trip(self):
+        for frame_type in (FRAME_AUDIO_CHUNK, FRAME_STREAM_AUDIO, FRAME_TTS_AUDIO):
+            for session_id, seq, payload in ((1, 0, b''), (2 ** 64 - 1, 2 ** 32 - 1, b'\x00\xff' * 100), ('42', 7, b'x')):
+                decoded = decode_frame(encode_frame(frame_type, session_id, seq, payload))
+                self.assertEqual(decoded, Frame(frame_type, int(session_id), seq, payload))
+
+    def test_short_frame_is_rejected(self):
+        frame = encode_frame(FRAME_AUDIO_CHUNK, 1, 0, b'')
+        for size in range(HEADER.size):
+            with self.assertRaisesMessage(FrameError, f'Frame too short: {size} bytes'):
+                decode_frame(frame[:size])
+
+    def test_unknown_type_and_version_are_rejected(self):
+        with self.assertRaisesMessage(FrameError, 'Unknown frame type: 127'):
+            decode_frame(HEADER.pack(PROTOCOL_VERSION, 0x7F, 1, 0) + b'x')
+        with self.assertRaisesMessage(FrameError, 'Unsupported protocol version: 2'):
+            decode_frame(HEADER.pack(2, FRAME_AUDIO_CHUNK, 1, 0) + b'x')
+
+    def test_audio_is_split_into_numbered_frames(self):
+        audio = bytes(range(256)) * 10
+        frames = [decode_frame(frame) for frame in iter_audio_frames(9, audio, frame_size=1000)]
+        self.assertEqual(len(frames), count_frames(audio, frame_size=1000))
+        self.assertEqual([frame.seq for frame in frames], [0, 1, 2])
+        self.assertEqual(b''.join(frame.payload for frame in frames), audio)
+        self.assertEqual(count_frames(b''), 0)
@@ -0,0 +1,61 @@
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+from apps.conversations.reassembly import ChunkReassembler
+
+
+class ChunkReassemblerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.emitted = []
+
+        async def emit(payload):
+            self.emitted.append(payload)
+
+        self.reassembler = ChunkReassembler(emit)
+
+    def complete(self, *results):
+        async def run():
+            for seq, payload in results:
+                await self.reassembler.complete(seq, payload)
+        async_to_sync(run)()
+
+    def test_out_of_order_results_are_emitted_in_seq_order(self):
+        self.complete((2, 'c'), (1, 'b'))
+        self.assertEqual(self.emitted, [])
+        self.assertEqual(self.reassembler.pending, 2)
+
+        self.complete((0, 'a'), (4, 'e'), (3, 'd'))
+        self.assertEqual(self.emitted, ['a', 'b', 'c', 'd', 'e'])
+        self.assertEqual(self.reassembler.pending, 0)
+        self.assertEqual(self.reassembler.next_seq, 5)
+
+    def test_none_advances_without_emitting(self):
+        self.complete((1, 'b'), (0, None))
+        self.assertEqual(self.emitted, ['b'])
+        self.assertEqual(self.reassembler.next_seq, 2)
+
+    def test_duplicate_of_pending_seq_keeps_the_first_result(self):
+        self.complete((1, 'first'), (1, 'second'), (0, 'a'))
+        self.assertEqual(self.emitted, ['a', 'first'])
+
+    def test_late_result_for_emitted_seq_is_sent_immediately(self):
+        self.complete((0, 'a'), (1, 'b'), (0, 'late'), (0, None))
+        self.assertEqual(self.emitted, ['a', 'b', 'late'])
+        self.assertEqual(self.reassembler.next_seq, 2)
+
+    def test_gap_holds_later_results_until_flush(self):
+        self.complete((0, 'a'), (2, 'c'), (5, 'f'))
+        self.assertEqual(self.emitted, ['a'])
+
+        async_to_sync(self.reassembler.flush)()
+        self.assertEqual(self.emitted, ['a', 'c', 'f'])
+        self.assertEqual(self.reassembler.next_seq, 6)
+
+        # The skipped number arriving after the flush is not held back
+        self.complete((1, 'b'), (6, 'g'))
+        self.assertEqual(self.emitted, ['a', 'c', 'f', 'b', 'g'])
+
+    def test_starts_at_next_seq(self):
+        reassembler = ChunkReassembler(self.reassembler.emit, next_seq=10)
+        async_to_sync(reassembler.complete)(10, 'k')
+        self.assertEqual(self.emitted, ['k'])
@@ -0,0 +1,150 @@
+import asyncio
+import base64
+import codecs
+import json
+from types import SimpleNamespace
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+from apps.conversations.consumers import ConversationConsumer
+from apps.conversations.instrumentation import TRANSPORT_WEBSOCKET
+from apps.conversations.services import llm_service
+from apps.conversations.services.llm_service import LLMService
+from apps.conversations.streaming import JSONStringFieldExtractor, SentenceSplitter
+from apps.conversations.timing import SessionProfile
+
+RESPONSE = 'お話ありがとう。「"大丈夫"」ですね！\t😀また明日\\お会いしましょう/'
+ANALYSIS = {'emotion': 'joy', 'response': RESPONSE, 'reason': '"安心" した様子'}
+
+
+def split_at(text, *offsets):
+    bounds = [0, *offsets, len(text)]
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def extract(deltas):
+    extractor = JSONStringFieldExtractor('response')
+    return ''.join(extractor.feed(delta) for delta in deltas), extractor
+
+
+class JSONStringFieldExtractorTests(SimpleTestCase):
+
+    def test_escapes_survive_every_split_point(self):
+        # \uXXXX escapes, a surrogate pair and \" / \\ / \t / \/ are all cut somewhere
+        document = json.dumps(ANALYSIS, ensure_ascii=True).replace('/', '\\/')
+        for first in range(1, len(document)):
+            for second in range(first, len(document), 7):
+                text, extractor = extract(split_at(document, first, second))
+                self.assertEqual(text, RESPONSE, (first, second))
+                self.assertEqual(json.loads(extractor.buffer), ANALYSIS)
+
+    def test_one_character_at_a_time(self):
+        text, extractor = extract(json.dumps(ANALYSIS, ensure_ascii=True))
+        self.assertEqual(text, RESPONSE)
+        self.assertTrue(extractor.done)
+
+    def test_split_unicode_escape_waits_for_all_digits(self):
+        extractor = JSONStringFieldExtractor('response')
+        self.assertEqual(extractor.feed('{"response": "a\\u30'), 'a')
+        self.assertEqual(extractor.feed('4'), '')
+        self.assertEqual(extractor.feed('2\\ud83d'), 'あ')
+        self.assertEqual(extractor.feed('\\ud'), '')
+        self.assertEqual(extractor.feed('e00"}'), '😀')
+
+    def test_deltas_split_at_utf8_byte_offsets(self):
+        # The SDK decodes the byte stream incrementally; a split inside a
+        # multi-byte character yields a shorter or empty delta
+        raw = json.dumps(ANALYSIS, ensure_ascii=False).encode('utf-8')
+        for offset in range(1, len(raw)):
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            deltas = [decoder.decode(raw[:offset]), decoder.decode(raw[offset:], final=True)]
+            self.assertEqual(extract(deltas)[0], RESPONSE, offset)
+
+    def test_key_split_across_deltas_and_quotes_inside_other_fields(self):
+        document = '{"reason": "\\"response\\": \\"x\\"", "resp' + 'onse" :  "本文", "emotion": "joy"}'
+        for offset in range(1, len(document)):
+            self.assertEqual(extract(split_at(document, offset))[0], '本文', offset)
+
+    def test_text_after_closing_quote_is_ignored(self):
+        extractor = JSONStringFieldExtractor('response')
+        self.assertEqual(extractor.feed('{"response": "終わり", "reason": "続き"}'), '終わり')
+        self.assertEqual(extractor.feed(' '), '')
+        self.assertTrue(extractor.buffer.endswith('} '))
+
+
+class SentenceSplitterTests(SimpleTestCase):
+
+    def split(self, deltas, min_length=2):
+        splitter = SentenceSplitter(min_length)
+        sentences = [sentence for delta in deltas for sentence in splitter.feed(delta)]
+        rest = splitter.flush()
+        return sentences + ([rest] if rest else [])
+
+    def test_sentences_at_every_split_point(self):
+        text = 'こんにちは。本当ですか！？「はい。」では、また\n明日'
+        expected = ['こんにちは。', '本当ですか！？', '「はい。」', 'では、また', '明日']
+        self.assertEqual(self.split([text]), expected)
+        for offset in range(1, len(text)):
+            self.assertEqual(self.split(split_at(text, offset)), expected, offset)
+        self.assertEqual(self.split(list(text)), expected)
+
+    def test_terminator_at_end_of_delta_waits_for_more_text(self):
+        splitter = SentenceSplitter()
+        self.assertEqual(splitter.feed('はい！'), [])
+        self.assertEqual(splitter.feed('？」次'), ['はい！？」'])
+        self.assertEqual(splitter.flush(), '次')
+
+    def test_short_fragments_join_the_next_sentence(self):
+        self.assertEqual(self.split(['あ。', 'いいですね。そう。'], min_length=3), ['あ。いいですね。', 'そう。'])
+
+
+@override_settings(OPENAI_API_KEY='test-key')
+class StreamResponseOrderTests(SimpleTestCase):
+    """Per-sentence TTS runs concurrently but reaches the client in sentence order"""
+
+    SENTENCES = ['お話ありがとう。', '「"大丈夫"」ですね！', '😀また明日\\お会いしましょう/']
+
+    def setUp(self):
+        self.sent = []
+        self.consumer = ConversationConsumer()
+        self.consumer.llm_service = LLMService()
+        self.consumer.profile = SessionProfile(TRANSPORT_WEBSOCKET)
+        self.consumer.send = mock.AsyncMock(side_effect=lambda text_data=None, bytes_data=None: self.sent.append(text_data))
+
+        # Earlier sentences take longer to synthesize than later ones
+        delays = dict(zip(self.SENTENCES, (0.05, 0.02, 0)))
+
+        async def generate_tts(sentence):
+            await asyncio.sleep(delays[sentence])
+            return sentence.encode('utf-8')
+
+        self.consumer.generate_tts = generate_tts
+        patcher = mock.patch.object(LLMService, '_aload_emotion_names', mock.AsyncMock(return_value=['joy', 'neutral']))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def openai_stream(self, deltas):
+        async def stream():
+            for delta in deltas:
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+        create = mock.AsyncMock(return_value=stream())
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        return mock.patch.object(llm_service, 'get_async_openai_client', return_value=client)
+
+    def test_audio_chunks_follow_sentence_order(self):
+        document = json.dumps(ANALYSIS, ensure_ascii=True)
+        # Three-character deltas starting at an odd offset cut escapes and quotes
+        deltas = [document[:1]] + [document[i:i + 3] for i in range(1, len(document), 3)]
+        with self.openai_stream(deltas):
+            result, count = async_to_sync(self.consumer.stream_response)(1, '今日は元気です', binary_audio=False)
+
+        self.assertEqual(result['response'], RESPONSE)
+        self.assertEqual(count, len(self.SENTENCES))
+        messages = [json.loads(text) for text in self.sent]
+        self.assertEqual([message['index'] for message in messages], [0, 1, 2])
+        self.assertEqual([message['text'] for message in messages], self.SENTENCES)
+        self.assertEqual(
+            [base64.b64decode(message['audio_base64']).decode('utf-8') for message in messages],
+            self.SENTENCES
+        )
@@ -0,0 +1,82 @@
+import os
+import threading
+import uuid
+from unittest import skipUnless
+import redis
+from django.test import SimpleTestCase
+from apps.conversations.transcripts import LocalTranscriptStore, RedisTranscriptStore
+
+THREADS = 8
+CHUNKS_PER_THREAD = 50
+
+REDIS_URL = os.environ.get('TRANSCRIPT_STORE_URL', '')
+
+
+def redis_available():
+    if not REDIS_URL:
+        return False
+    try:
+        return redis.Redis.from_url(REDIS_URL, socket_connect_timeout=1).ping()
+    except redis.RedisError:
+        return False
+
+
+class TranscriptStoreChecks:
+    """Concurrency guarantees shared by every transcript store"""
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.store = self.make_store()
+        self.session_id = f'test-{uuid.uuid4().hex}'
+        self.addCleanup(self.store.clear, self.session_id)
+
+    def run_parallel(self, append):
+        barrier = threading.Barrier(THREADS)
+
+        def worker(worker_id):
+            barrier.wait()
+            for i in range(CHUNKS_PER_THREAD):
+                append(worker_id, i)
+
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    def test_parallel_appends_keep_every_chunk_in_seq_order(self):
+        total = THREADS * CHUNKS_PER_THREAD
+
+        def append(worker_id, i):
+            # Interleave the seqs so neighbouring numbers come from different threads
+            seq = i * THREADS + worker_id
+            self.assertEqual(self.store.append(self.session_id, f'c{seq}', seq), seq)
+
+        self.run_parallel(append)
+        self.assertEqual(self.store.read(self.session_id), ' '.join(f'c{seq}' for seq in range(total)))
+
+    def test_parallel_appends_without_seq_get_distinct_numbers(self):
+        self.run_parallel(lambda worker_id, i: self.store.append(self.session_id, f'w{worker_id}c{i}'))
+        chunks = self.store.chunks(self.session_id)
+        self.assertEqual(sorted(chunks), list(range(THREADS * CHUNKS_PER_THREAD)))
+
+    def test_duplicate_seq_is_refused(self):
+        self.assertEqual(self.store.append(self.session_id, 'first', 0), 0)
+        self.assertIsNone(self.store.append(self.session_id, 'again', 0))
+        self.assertEqual(self.store.append(self.session_id, 'next'), 1)
+        self.assertEqual(self.store.read(self.session_id), 'first next')
+
+
+class LocalTranscriptStoreTests(TranscriptStoreChecks, SimpleTestCase):
+
+    def make_store(self):
+        return LocalTranscriptStore()
+
+
+@skipUnless(redis_available(), 'TRANSCRIPT_STORE_URL is not set or Redis is unreachable')
+class RedisTranscriptStoreTests(TranscriptStoreChecks, SimpleTestCase):
+
+    def make_store(self):
+        return RedisTranscriptStore(redis.Redis.from_url(REDIS_URL))
@@ -0,0 +1,44 @@
+from unittest import mock, skipIf
+from django.test import SimpleTestCase
+from apps.conversations.services import vad
+from apps.conversations.services.vad import SAMPLE_RATE, VoiceActivityTrimmer, np, speech_mask
+
+
+def tone(seconds, amplitude=0.3, frequency=220.0):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t) * 32767).astype(np.int16)
+
+
+def noise(seconds, amplitude, seed=0):
+    samples = np.random.default_rng(seed).normal(0, amplitude, int(SAMPLE_RATE * seconds))
+    return (samples * 32767).clip(-32768, 32767).astype(np.int16)
+
+
+@skipIf(np is None, 'numpy is not installed')
+class SpeechMaskTests(SimpleTestCase):
+
+    def process(self, pcm):
+        trimmer = VoiceActivityTrimmer({'OUTPUT_FORMAT': 'wav'})
+        with mock.patch.object(vad, 'decode_pcm', return_value=pcm):
+            return trimmer.process(b'audio', 'audio/webm')
+
+    def test_continuous_speech_is_kept(self):
+        # No silence to estimate a noise floor from: every frame is above THRESHOLD_DB
+        for pcm in (tone(2.0), noise(2.0, 0.1)):
+            mask, _ = speech_mask(pcm)
+            self.assertTrue(mask.all())
+            result = self.process(pcm)
+            self.assertEqual(result.outcome, 'unchanged')
+            self.assertEqual(result.audio, b'audio')
+
+    def test_silence_is_dropped(self):
+        result = self.process(noise(1.0, 0.0005))
+        self.assertEqual(result.outcome, 'dropped')
+        self.assertIsNone(result.audio)
+
+    def test_leading_and_trailing_silence_is_trimmed(self):
+        quiet = noise(1.0, 0.0005)
+        result = self.process(np.concatenate([quiet, tone(1.0), quiet]))
+        self.assertEqual(result.outcome, 'trimmed')
+        self.assertLess(result.kept_seconds, result.input_seconds)
+        self.assertGreaterEqual(result.kept_seconds, 1.0)
@@ -0,0 +1,99 @@
+"""
+Per-session latency breakdown (``SessionTiming``).
+
+``SessionProfile`` collects the stage durations, audio sizes and models of
+one session and is written once when the session ends. WebSocket
+connections keep the profile in memory. REST chunk uploads arrive as
+separate requests, possibly on different workers, so each chunk's STT time
+and size is parked in the cache under its sequence number (``park_chunk``)
+and collected by ``finalize_session``.
+"""
+
+import time
+from contextlib import contextmanager
+from django.core.cache import cache
+from .models import SessionTiming
+from .services.deepgram_service import STT_MODEL, TTS_MODEL
+from .services.llm_service import LLM_MODEL
+from .transcripts import TRANSCRIPT_TTL
+
+# Per-request entries kept in stt_chunks (the totals still cover every request)
+MAX_STT_ENTRIES = 500
+
+
+def _ms(seconds):
+    return int(round(seconds * 1000))
+
+
+def _chunk_key(session_id, seq):
+    return f"session:{session_id}:timing:{seq}"
+
+
+def park_chunk(session_id, seq, seconds, size):
+    """チャンクのSTT時間とサイズをセッション終了まで保存（REST）"""
+    cache.set(_chunk_key(session_id, seq), (seconds, size), TRANSCRIPT_TTL)
+
+
+class SessionProfile:
+    """1セッション分の処理時間の集計"""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.llm_mode = 'direct'
+        # One entry per STT request: [last seq, chunks, ms, bytes]
+        self.stt = []
+        self.stages = {'llm': 0.0, 'tts': 0.0, 'db': 0.0}
+        self.chunk_count = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def add_stt(self, seqs, seconds, size):
+        """STTリクエスト1件（結合されたチャンクは seqs に複数）"""
+        self.stt.append([seqs[-1], len(seqs), _ms(seconds), size])
+        self.chunk_count += len(seqs)
+        self.bytes_in += size
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def load_parked(self, session_id, seqs):
+        """park_chunk で保存したチャンクを取り込み、キャッシュから削除"""
+        keys = {_chunk_key(session_id, seq): seq for seq in seqs}
+        if not keys:
+            return
+        parked = cache.get_many(list(keys))
+        for key in sorted(parked, key=keys.get):
+            seconds, size = parked[key]
+            self.add_stt([keys[key]], seconds, size)
+        cache.delete_many(list(keys))
+
+    def save(self, session_id, total_seconds):
+        """SessionTiming に書き込む（同期、セッション終了時に1回）"""
+        stt_ms = [entry[2] for entry in self.stt]
+        return SessionTiming.objects.create(
+            session_id=session_id,
+            transport=self.transport,
+            llm_mode=self.llm_mode,
+            total_ms=_ms(total_seconds),
+            stt_ms=sum(stt_ms),
+            stt_max_ms=max(stt_ms, default=0),
+            stt_requests=len(self.stt),
+            chunk_count=self.chunk_count,
+            stt_chunks=self.stt[:MAX_STT_ENTRIES],
+            llm_ms=_ms(self.stages['llm']),
+            tts_ms=_ms(self.stages['tts']),
+            db_ms=_ms(self.stages['db']),
+            bytes_in=self.bytes_in,
+            bytes_out=self.bytes_out,
+            stt_model=STT_MODEL,
+            llm_model=LLM_MODEL,
+            tts_model=TTS_MODEL,
+        )
@@ -0,0 +1,166 @@
+"""
+Append-only transcript store for active conversation sessions.
+
+Each transcribed chunk is stored under its sequence number instead of
+rewriting one growing ``session:{id}:text`` string, so appends are O(1) and
+concurrent uploads cannot overwrite each other. The full text is assembled
+once, in sequence order, when the session ends.
+
+A Redis hash is used when ``TRANSCRIPT_STORE_URL`` is set. Without it
+chunks are kept in process memory, which only works with a single worker
+process, so a warning is logged when that fallback is created.
+"""
+
+import logging
+import threading
+import time
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_TTL = 3600  # 1 hour
+
+
+def join_chunks(chunks):
+    """シーケンス順にチャンクを連結"""
+    return ' '.join(text for _, text in sorted(chunks.items()) if text).strip()
+
+
+class LocalTranscriptStore:
+    """プロセス内トランスクリプトストア"""
+
+    def __init__(self, ttl=TRANSCRIPT_TTL):
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _purge_expired(self, now):
+        expired = [key for key, entry in self._sessions.items() if entry['expires'] < now]
+        for key in expired:
+            del self._sessions[key]
+
+    def _entry(self, session_id):
+        now = time.monotonic()
+        entry = self._sessions.get(str(session_id))
+        if entry is None or entry['expires'] < now:
+            entry = {'chunks': {}, 'next_seq': 0, 'expires': now + self.ttl}
+            self._sessions[str(session_id)] = entry
+        return entry
+
+    def start(self, session_id):
+        """セッションのトランスクリプトを初期化"""
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            self._sessions.pop(str(session_id), None)
+            self._entry(session_id)
+
+    def append(self, session_id, text, seq=None):
+        """チャンクを追加し、そのシーケンス番号を返す（同じseqが既にあれば保存せずNone）"""
+        with self._lock:
+            entry = self._entry(session_id)
+            if seq is None:
+                seq = entry['next_seq']
+            elif seq in entry['chunks']:
+                return None
+            entry['next_seq'] = max(entry['next_seq'], seq + 1)
+            entry['chunks'][seq] = text
+            return seq
+
+    def chunks(self, session_id):
+        """{seq: text} を返す"""
+        with self._lock:
+            entry = self._sessions.get(str(session_id))
+            return dict(entry['chunks']) if entry else {}
+
+    def read(self, session_id):
+        """累積テキストを返す"""
+        return join_chunks(self.chunks(session_id))
+
+    def clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(str(session_id), None)
+
+
+# Atomically store a chunk and advance the next sequence number (same semantics as LocalTranscriptStore)
+APPEND_SCRIPT = """
+local next_seq = tonumber(redis.call('GET', KEYS[2]) or '0')
+local seq = next_seq
+if ARGV[2] ~= '' then
+    seq = tonumber(ARGV[2])
+    if redis.call('HEXISTS', KEYS[1], seq) == 1 then
+        return false
+    end
+end
+if seq + 1 > next_seq then
+    redis.call('SET', KEYS[2], seq + 1)
+end
+redis.call('HSET', KEYS[1], seq, ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return seq
+"""
+
+
+class RedisTranscriptStore:
+    """Redisハッシュを使うトランスクリプトストア
+
+    ``session:{id}:chunks`` に seq → text、``session:{id}:seq`` に次の番号を保持する。
+    """
+
+    def __init__(self, client, ttl=TRANSCRIPT_TTL):
+        self.client = client
+        self.ttl = ttl
+        self._append = client.register_script(APPEND_SCRIPT)
+
+    @staticmethod
+    def _keys(session_id):
+        return (
+            f"session:{session_id}:chunks",
+            f"session:{session_id}:seq",
+        )
+
+    def start(self, session_id):
+        self.client.delete(*self._keys(session_id))
+
+    def append(self, session_id, text, seq=None):
+        seq = self._append(
+            keys=self._keys(session_id),
+            args=[text, '' if seq is None else seq, self.ttl]
+        )
+        return None if seq is None else int(seq)
+
+    def chunks(self, session_id):
+        chunks_key, _ = self._keys(session_id)
+        return {
+            int(seq): text.decode('utf-8') if isinstance(text, bytes) else text
+            for seq, text in self.client.hgetall(chunks_key).items()
+        }
+
+    def read(self, session_id):
+        return join_chunks(self.chunks(session_id))
+
+    def clear(self, session_id):
+        self.client.delete(*self._keys(session_id))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_transcript_store():
+    """TRANSCRIPT_STORE_URL のRedis、未設定ならプロセス内のストアを返す"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                url = getattr(settings, 'TRANSCRIPT_STORE_URL', '')
+                if url:
+                    _store = RedisTranscriptStore(redis.Redis.from_url(url))
+                else:
+                    logger.warning(
+                        'TRANSCRIPT_STORE_URL is not set; transcripts are kept in process memory '
+                        'and chunks uploaded to other worker processes are lost'
+                    )
+                    _store = LocalTranscriptStore()
+    return _store
@@ -4,7 +4,7 @@ Conversation URLs.
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ConversationViewSet, SessionViewSet, ConversationSessionViewSet
+from .views import ConversationViewSet, SessionViewSet, ConversationSessionViewSet, SessionTimingViewSet
 
 router = DefaultRouter()
 router.register(r'sessions', ConversationSessionViewSet, basename='conversationsession')
@@ -12,7 +12,10 @@ router.register(r'sessions', ConversationSessionViewSet, basename='conversations
 urlpatterns = [
     path('conversation/start/', ConversationViewSet.as_view({'post': 'start_session'}), name='conversation-start'),
     path('conversation/session/', ConversationViewSet.as_view({'post': 'process_audio'}), name='conversation-session'),
-    path('sessions/<uuid:pk>/end/', SessionViewSet.as_view({'post': 'end_session'}), name='session-end'),
+    path('conversation/transcript/', ConversationViewSet.as_view({'get': 'transcript'}), name='conversation-transcript'),
+    path('sessions/<int:pk>/end/', SessionViewSet.as_view({'post': 'end_session'}), name='session-end'),
+    path('sessions/<int:pk>/jobs/<str:job_id>/', SessionViewSet.as_view({'get': 'job_result'}), name='session-job'),
+    path('sessions/slowest/', SessionTimingViewSet.as_view({'get': 'slowest'}), name='session-slowest'),
     path('', include(router.urls)),
 ]
 
@@ -4,20 +4,36 @@ Conversation views.
 
 import base64
 import uuid
+from datetime import datetime, time, timedelta
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import BasePermission, IsAuthenticated, AllowAny
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber, TruncDate
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
-from django.core.cache import cache
-from .models import ConversationSession
-from .serializers import ConversationSessionSerializer, AudioChunkSerializer
-from .services import DeepgramService, LLMService
-from apps.emotions.models import Emotion
-
-
-class ConversationViewSet(viewsets.ViewSet):
+from django.utils.dateparse import parse_date, parse_datetime
+from apps.core.profiling import ProfiledViewMixin
+from .finalize import SessionAlreadyEnded, finalize_session
+from .instrumentation import (
+    STAGE_CACHE,
+    STAGE_DB,
+    STAGE_DECODE,
+    STAGE_STT,
+    TRANSPORT_REST,
+    StageTimer,
+)
+from .memory import frame_limit, get_config as get_memory_config, rejected_payloads
+from .models import ConversationSession, SessionTiming
+from .serializers import ConversationSessionSerializer, AudioChunkSerializer, SessionTimingSerializer
+from .services import DeepgramService
+from .tasks import analyze_session
+from .timing import park_chunk
+from .transcripts import get_transcript_store, join_chunks
+
+
+class ConversationViewSet(ProfiledViewMixin, viewsets.ViewSet):
     """会話管理ViewSet"""
 
     permission_classes = [IsAuthenticated]
@@ -46,14 +62,15 @@ class ConversationViewSet(viewsets.ViewSet):
             )
 
         # Create new session
-        session = ConversationSession.objects.create(
-            patient_id=patient_id,
-            started_at=timezone.now()
-        )
+        with StageTimer(STAGE_DB, TRANSPORT_REST):
+            session = ConversationSession.objects.create(
+                patient_id=patient_id,
+                started_at=timezone.now()
+            )
 
-        # Initialize Redis cache for accumulated text
-        cache_key = f"session:{session.id}:text"
-        cache.set(cache_key, "", timeout=3600)  # 1 hour TTL
+        # Initialize transcript store for accumulated text
+        with StageTimer(STAGE_CACHE, TRANSPORT_REST):
+            get_transcript_store().start(session.id)
 
         return Response({
             'session_id': str(session.id),
@@ -67,7 +84,24 @@ class ConversationViewSet(viewsets.ViewSet):
         """
         セッション通信（STT処理）
         POST /api/v1/conversation/session/
+        POST /api/v1/conversation/session/?delta=1  (accumulated_textを省略)
         """
+        # Reject oversized uploads before the body is parsed
+        limit = frame_limit(get_memory_config()['MAX_PAYLOAD_BYTES'])
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response(
+                {'error': 'validation_error', 'message': 'Content-Lengthが不正です'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if content_length > limit:
+            rejected_payloads.inc(transport=TRANSPORT_REST)
+            return Response(
+                {'error': 'payload_too_large', 'message': f'音声データが大きすぎます（最大{limit}バイト）'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
         serializer = AudioChunkSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
@@ -75,9 +109,13 @@ class ConversationViewSet(viewsets.ViewSet):
         audio_data_base64 = serializer.validated_data['audio_data']
 
         # Verify session exists and is active
-        try:
-            session = ConversationSession.objects.get(id=session_id)
-        except ConversationSession.DoesNotExist:
+        with StageTimer(STAGE_DB, TRANSPORT_REST) as timer:
+            try:
+                session = ConversationSession.objects.get(id=session_id)
+            except ConversationSession.DoesNotExist:
+                timer.outcome = 'not_found'
+                session = None
+        if session is None:
             return Response(
                 {'error': 'session_not_found', 'message': 'セッションが見つかりません'},
                 status=status.HTTP_404_NOT_FOUND
@@ -93,27 +131,60 @@ class ConversationViewSet(viewsets.ViewSet):
         if audio_data_base64.startswith('data:audio'):
             audio_data_base64 = audio_data_base64.split(',', 1)[1]
         
-        audio_bytes = base64.b64decode(audio_data_base64)
+        with StageTimer(STAGE_DECODE, TRANSPORT_REST):
+            audio_bytes = base64.b64decode(audio_data_base64)
 
         # STT with Deepgram
         deepgram_service = DeepgramService()
-        transcribed_text, confidence = deepgram_service.transcribe(audio_bytes)
+        with StageTimer(STAGE_STT, TRANSPORT_REST) as stt_timer:
+            transcribed_text, confidence = deepgram_service.transcribe(audio_bytes)
+            if not transcribed_text:
+                stt_timer.outcome = 'empty'
+
+        # Append to transcript store (atomic, no read-modify-write)
+        store = get_transcript_store()
+        with StageTimer(STAGE_CACHE, TRANSPORT_REST):
+            seq = store.append(session_id, transcribed_text)
+            # Collected into the session's timing breakdown at session end
+            park_chunk(session_id, seq, stt_timer.elapsed, len(audio_bytes))
+
+        response_data = {
+            'session_id': str(session_id),
+            'transcribed_text': transcribed_text,
+            'confidence': confidence,
+            'seq': seq
+        }
+        # ?delta=1 returns only the new segment; resync via GET conversation/transcript/
+        if request.query_params.get('delta') not in ('1', 'true'):
+            with StageTimer(STAGE_CACHE, TRANSPORT_REST):
+                response_data['accumulated_text'] = store.read(session_id)
+
+        return Response(response_data)
+
+    @action(detail=False, methods=['get'], url_path='transcript')
+    def transcript(self, request):
+        """
+        累積テキスト取得（deltaモードの再同期用）
+        GET /api/v1/conversation/transcript/?session_id=...
+        """
+        session_id = request.query_params.get('session_id')
 
-        # Append to Redis cache
-        cache_key = f"session:{session_id}:text"
-        current_text = cache.get(cache_key, "")
-        updated_text = f"{current_text} {transcribed_text}".strip()
-        cache.set(cache_key, updated_text, timeout=3600)
+        if not session_id:
+            return Response(
+                {'error': 'session_id is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
+        with StageTimer(STAGE_CACHE, TRANSPORT_REST):
+            chunks = get_transcript_store().chunks(session_id)
         return Response({
             'session_id': str(session_id),
-            'transcribed_text': transcribed_text,
-            'accumulated_text': updated_text,
-            'confidence': confidence
+            'text': join_chunks(chunks),
+            'last_seq': max(chunks) if chunks else None
         })
 
 
-class SessionViewSet(viewsets.ViewSet):
+class SessionViewSet(ProfiledViewMixin, viewsets.ViewSet):
     """セッション終了ViewSet"""
 
     permission_classes = [IsAuthenticated]
@@ -141,63 +212,72 @@ class SessionViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get accumulated text from Redis
-        cache_key = f"session:{session_id}:text"
-        patient_text = cache.get(cache_key, "")
+        # Async mode: enqueue the analysis and report progress over the session's socket
+        async_param = request.query_params.get('async')
+        if async_param is None:
+            run_async = getattr(settings, 'CONVERSATION_ASYNC_END_SESSION', False)
+        else:
+            run_async = async_param in ('1', 'true')
+
+        if run_async:
+            # The worker may not share this process's transcript store, so the
+            # transcript is read here and passed with the task
+            with StageTimer(STAGE_CACHE, TRANSPORT_REST):
+                chunks = get_transcript_store().chunks(session.id)
+            job = analyze_session.delay(session.id, sorted(chunks.items()))
+            return Response({
+                'session_id': str(session_id),
+                'job_id': job.id,
+                'status': 'queued'
+            }, status=status.HTTP_202_ACCEPTED)
 
-        # LLM analysis
-        llm_service = LLMService()
         try:
-            analysis_result = llm_service.analyze_conversation(patient_text)
-        except Exception as e:
+            return Response(finalize_session(session_id))
+        except SessionAlreadyEnded:
             return Response(
-                {'error': 'llm_processing_failed', 'message': f'感情分析に失敗しました: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'session_already_ended', 'message': 'セッションは既に終了しています'},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get emotion from database
-        try:
-            emotion = Emotion.objects.get(name=analysis_result['emotion'])
-        except Emotion.DoesNotExist:
-            emotion = Emotion.objects.first()
-
-        # Generate TTS audio
-        deepgram_service = DeepgramService()
-        ai_audio_data = deepgram_service.text_to_speech(analysis_result['response'])
-        
-        # Convert audio to base64 for response
-        ai_audio_base64 = base64.b64encode(ai_audio_data).decode('utf-8') if ai_audio_data else ''
-
-        # Update session
-        session.ended_at = timezone.now()
-        session.patient_text = patient_text
-        session.ai_response_text = analysis_result['response']
-        session.emotion = emotion
-        session.emotion_reason = analysis_result['reason']
-        session.save()
+    def job_result(self, request, pk=None, job_id=None):
+        """
+        非同期終了ジョブの状態と結果
+        GET /api/v1/sessions/{session_id}/jobs/{job_id}/
+        """
+        job = analyze_session.AsyncResult(job_id)
+        body = {'session_id': str(pk), 'job_id': job_id}
+
+        if job.state == 'SUCCESS':
+            result = job.result
+            if result is None:
+                # The task found the session already ended elsewhere
+                return Response(
+                    {**body, 'status': 'failed', 'error': 'session_already_ended',
+                     'message': 'セッションは既に終了しています'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if result['session_id'] != str(pk):
+                return Response(
+                    {'error': 'job_not_found', 'message': 'ジョブが見つかりません'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return Response({**result, 'job_id': job_id, 'status': 'completed'})
+
+        if job.state == 'FAILURE':
+            return Response(
+                {**body, 'status': 'failed', 'error': 'analysis_failed',
+                 'message': f'解析に失敗しました: {job.result}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
 
-        # Clear Redis cache
-        cache.delete(cache_key)
+        # PENDING is also reported for unknown or expired job ids
+        return Response({**body, 'status': 'queued' if job.state == 'PENDING' else 'running'})
 
-        return Response({
-            'session_id': str(session_id),
-            'patient_text': patient_text,
-            'ai_response_text': analysis_result['response'],
-            'ai_audio_base64': ai_audio_base64,
-            'emotion': {
-                'id': str(emotion.id) if emotion else None,
-                'name': emotion.name if emotion else None,
-                'name_ja': emotion.name_ja if emotion else None
-            },
-            'emotion_reason': analysis_result['reason'],
-            'ended_at': session.ended_at.isoformat()
-        })
 
-
-class ConversationSessionViewSet(viewsets.ModelViewSet):
+class ConversationSessionViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     """会話セッション管理ViewSet（既存機能維持）"""
 
-    queryset = ConversationSession.objects.all()
+    queryset = ConversationSession.objects.select_related('patient')
     serializer_class = ConversationSessionSerializer
     permission_classes = [IsAuthenticated]
 
@@ -256,3 +336,67 @@ class ConversationSessionViewSet(viewsets.ModelViewSet):
                 pass
 
         return queryset
+
+
+class IsStaff(BasePermission):
+    """スタッフユーザー（管理画面ログイン）のみ"""
+
+    def has_permission(self, request, view):
+        return bool(getattr(request.user, 'is_staff', False))
+
+
+class SessionTimingViewSet(viewsets.ViewSet):
+    """セッション処理時間ViewSet"""
+
+    permission_classes = [IsStaff]
+
+    @action(detail=False, methods=['get'], url_path='slowest')
+    def slowest(self, request):
+        """
+        日ごとの遅いセッション
+        GET /api/v1/sessions/slowest/?date=2025-11-01&days=7&limit=10&transport=websocket
+
+        date（デフォルト今日）から遡って days 日分、各日 total_ms の大きい順に limit 件。
+        """
+        params = request.query_params
+        day = parse_date(params.get('date', '')) or timezone.localdate()
+        try:
+            days = max(1, min(int(params.get('days', 1)), 31))
+            limit = max(1, min(int(params.get('limit', 10)), 100))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'days and limit must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        tz = timezone.get_current_timezone()
+        start = timezone.make_aware(datetime.combine(day - timedelta(days=days - 1), time.min), tz)
+        end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+
+        queryset = SessionTiming.objects.select_related('session').filter(
+            recorded_at__gte=start,
+            recorded_at__lt=end
+        )
+        transport = params.get('transport')
+        if transport:
+            queryset = queryset.filter(transport=transport)
+
+        # Rank within each local day in one query
+        queryset = queryset.annotate(
+            day=TruncDate('recorded_at', tzinfo=tz),
+            rank=Window(
+                RowNumber(),
+                partition_by=[TruncDate('recorded_at', tzinfo=tz)],
+                order_by=F('total_ms').desc()
+            )
+        ).filter(rank__lte=limit).order_by('-day', 'rank')
+
+        results = {}
+        for timing in queryset:
+            results.setdefault(timing.day.isoformat(), []).append(SessionTimingSerializer(timing).data)
+        return Response({
+            'date': day.isoformat(),
+            'days': days,
+            'limit': limit,
+            'results': [{'day': key, 'sessions': value} for key, value in results.items()]
+        })
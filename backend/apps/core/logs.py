@@ -0,0 +1,145 @@
+"""
+Structured, non-blocking logging.
+
+- ``JSONFormatter``: one JSON object per line, including ``extra`` fields
+- ``ContextFilter``: adds the correlation ids bound with ``bind_log_context``
+  (session_id, patient_id, ...). They live in a contextvar, so they follow
+  the WebSocket connection's task, tasks it creates afterwards and
+  ``sync_to_async`` worker threads.
+- ``QueuedStreamHandler``: the logging call only enqueues the record;
+  formatting and the write happen on a listener thread. When the queue is
+  full records are dropped (``logging_dropped_records_total``) rather than
+  blocking the event loop.
+- ``SampleFilter``: keeps a fraction of records below WARNING, for
+  high-volume per-chunk events.
+
+Wired up in ``LOGGING`` (config/settings/base.py). This module is imported
+while settings are configured, so it must not import Django models.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from .metrics import registry
+
+dropped_records = registry.counter(
+    'logging_dropped_records_total',
+    'Log records dropped because the logging queue was full'
+)
+
+_log_context = contextvars.ContextVar('log_context', default={})
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+def bind_log_context(**ids):
+    """現在のコンテキストに相関IDを追加（Noneは削除）"""
+    context = {**_log_context.get(), **ids}
+    _log_context.set({k: v for k, v in context.items() if v is not None})
+
+
+def get_log_context():
+    return _log_context.get()
+
+
+class ContextFilter(logging.Filter):
+    """相関IDをレコード属性として付与（呼び出し元スレッドで実行される）"""
+
+    def filter(self, record):
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """WARNING未満のレコードを rate の割合だけ通す"""
+
+    def __init__(self, rate=1.0, name=''):
+        super().__init__(name)
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        if random.random() >= self.rate:
+            return False
+        # Lets log analysis re-weight sampled events
+        record.sample_rate = self.rate
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """1行1オブジェクトのJSON形式"""
+
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class QueuedStreamHandler(QueueHandler):
+    """キュー経由でバックグラウンドスレッドから出力するハンドラ
+
+    Args:
+        stream: 出力先（デフォルトはstderr）
+        maxsize: キューの上限（超過分は破棄）
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.maxsize = maxsize
+        self.target = logging.StreamHandler(stream)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        self._stopped = False
+        # The listener thread does not survive fork (gunicorn/Celery prefork workers)
+        os.register_at_fork(after_in_child=self._restart)
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Merge the arguments now (they may be mutated later); leave formatting to the listener
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records.inc()
+
+    def _restart(self):
+        if self._stopped:
+            return
+        self.queue = queue.Queue(self.maxsize)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def close(self):
+        # Called by logging.shutdown() at exit: drain the queue before closing
+        if not self._stopped:
+            self._stopped = True
+            self.listener.stop()
+            self.target.close()
+        super().close()
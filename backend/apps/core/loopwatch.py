@@ -0,0 +1,185 @@
+"""
+Event-loop lag watchdog for ASGI workers.
+
+A heartbeat coroutine wakes every ``INTERVAL`` seconds and records how late
+it was scheduled (``asgi_event_loop_lag_seconds``). A monitor thread checks
+the heartbeat; when the loop has not run it for longer than ``THRESHOLD``
+seconds, the loop thread is executing blocking code, so the thread's current
+stack is captured (``sys._current_frames``) while the block is still in
+progress. The innermost frame in project code is reported as the offending
+call site (``asgi_event_loop_blocked_total{site}``) and the full stack and
+running task are logged as a warning.
+
+Opt-in via ``ASGI_LOOP_WATCHDOG['ENABLED']``; ``LoopWatchdogMiddleware``
+starts one watchdog per event loop on the first ASGI call.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from django.conf import settings
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Distinct call-site labels kept; later ones are reported as "other"
+MAX_SITES = 200
+
+lag_seconds = registry.histogram(
+    'asgi_event_loop_lag_seconds',
+    'Delay between scheduled and actual heartbeat wake-ups',
+    buckets=LAG_BUCKETS
+)
+blocked_total = registry.counter(
+    'asgi_event_loop_blocked_total',
+    'Event loop blocks longer than the threshold by offending call site'
+)
+
+DEFAULT_CONFIG = {
+    'ENABLED': False,
+    'INTERVAL': 0.05,
+    'THRESHOLD': 0.1,
+    'STACK_DEPTH': 30,
+}
+
+_PROJECT_ROOT = str(settings.BASE_DIR) + os.sep
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def call_site(frames):
+    """最も内側のプロジェクト内フレームを ``path:line in func`` で返す"""
+    for frame in reversed(frames):
+        if frame.filename.startswith(_PROJECT_ROOT) and 'site-packages' not in frame.filename \
+                and frame.filename != _THIS_FILE:
+            return f'{frame.filename[len(_PROJECT_ROOT):]}:{frame.lineno} in {frame.name}'
+    if frames:
+        frame = frames[-1]
+        return f'{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class LoopWatchdog:
+    """1つのイベントループの遅延監視
+
+    Args:
+        loop: 監視するイベントループ（そのループ上で start() を呼ぶ）
+        interval: ハートビート間隔（秒）
+        threshold: ブロックとみなす遅延（秒）
+        stack_depth: 記録するスタックの深さ
+    """
+
+    def __init__(self, loop, interval=0.05, threshold=0.1, stack_depth=30):
+        self.loop = loop
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_depth = stack_depth
+        self.loop_thread_id = None
+        self.last_beat = None
+        self.reported_beat = None
+        self.sites = set()
+        self._stopped = threading.Event()
+        self._heartbeat = None
+        self._monitor = None
+
+    def start(self):
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._heartbeat = self.loop.create_task(self.heartbeat(), name='loop-watchdog')
+        self._monitor = threading.Thread(target=self.monitor, name='loop-watchdog', daemon=True)
+        self._monitor.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+
+    async def heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.last_beat = now
+            lag_seconds.observe(max(0.0, now - expected))
+
+    def monitor(self):
+        """別スレッドでハートビートの停止を検出し、ループスレッドのスタックを取得"""
+        poll = max(self.threshold / 4, 0.005)
+        while not self._stopped.wait(poll):
+            if self.loop.is_closed():
+                with _watchdogs_lock:
+                    _watchdogs.pop(self.loop, None)
+                return
+            beat = self.last_beat
+            stalled = time.monotonic() - beat - self.interval
+            # One report per blocking episode
+            if stalled > self.threshold and beat != self.reported_beat:
+                self.reported_beat = beat
+                self.report(stalled)
+
+    def report(self, stalled):
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return
+        frames = traceback.extract_stack(frame, limit=self.stack_depth)
+        del frame
+        site = call_site(frames)
+        if site not in self.sites:
+            if len(self.sites) >= MAX_SITES:
+                site = 'other'
+            else:
+                self.sites.add(site)
+        blocked_total.inc(site=site)
+
+        task = asyncio.current_task(self.loop)
+        logger.warning('Event loop blocked', extra={
+            'blocked_ms': int(stalled * 1000),
+            'site': site,
+            'task': task.get_coro().__qualname__ if task is not None else None,
+            'stack': ''.join(traceback.format_list(frames)),
+        })
+
+
+_watchdogs = {}
+_watchdogs_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, 'ASGI_LOOP_WATCHDOG', {})}
+
+
+def ensure_watchdog():
+    """実行中のイベントループに監視を開始（ループごとに1回）"""
+    loop = asyncio.get_running_loop()
+    watchdog = _watchdogs.get(loop)
+    if watchdog is not None:
+        return watchdog
+    with _watchdogs_lock:
+        watchdog = _watchdogs.get(loop)
+        if watchdog is None:
+            config = get_config()
+            watchdog = LoopWatchdog(
+                loop,
+                interval=config['INTERVAL'],
+                threshold=config['THRESHOLD'],
+                stack_depth=config['STACK_DEPTH']
+            )
+            watchdog.start()
+            _watchdogs[loop] = watchdog
+    return watchdog
+
+
+class LoopWatchdogMiddleware:
+    """ASGIアプリをラップし、最初の呼び出し時にループ監視を開始"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        ensure_watchdog()
+        return await self.app(scope, receive, send)
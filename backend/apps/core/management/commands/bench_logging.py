@@ -0,0 +1,124 @@
+"""
+Benchmark per-message logging overhead on the calling thread.
+
+Emits ``--messages`` per-chunk style events (with correlation ids and extra
+fields) through each mode and reports the time the caller is blocked per
+message, i.e. what an event-loop coroutine pays:
+
+- ``print``: the former ``print()`` diagnostics (flushed, like a terminal)
+- ``sync-json``: ``StreamHandler`` + ``JSONFormatter`` on the caller
+- ``queued-json``: ``QueuedStreamHandler`` (formatting and I/O on a thread)
+- ``queued-sampled``: the above behind ``SampleFilter`` (``--sample-rate``)
+
+``--write-delay`` simulates a slow stdout (a blocked pipe or log shipper).
+"""
+
+import json
+import logging
+import os
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from apps.core.logs import (
+    ContextFilter,
+    JSONFormatter,
+    QueuedStreamHandler,
+    SampleFilter,
+    bind_log_context,
+    dropped_records,
+)
+
+MODES = ('print', 'sync-json', 'queued-json', 'queued-sampled')
+
+
+class SlowStream:
+    """書き込みごとに遅延するストリーム"""
+
+    def __init__(self, stream, delay):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, data):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class Command(BaseCommand):
+    help = 'Measure caller-side logging overhead per message (print vs queued JSON logging)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=20000)
+        parser.add_argument('--output', default=os.devnull,
+                            help='File the log lines are written to')
+        parser.add_argument('--write-delay', type=float, default=0.0,
+                            help='Simulated seconds per write (slow stdout)')
+        parser.add_argument('--sample-rate', type=float, default=0.1)
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+
+    def handle(self, *args, **options):
+        bind_log_context(session_id='bench-session', patient_id='1', connection='bench')
+        self.stdout.write(
+            f"{'mode':<16} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9} "
+            f"{'drain ms':>9} {'dropped':>8}"
+        )
+        with open(options['output'], 'w', encoding='utf-8') as raw:
+            stream = SlowStream(raw, options['write_delay'])
+            for mode in options['modes']:
+                self.report(mode, *self.run(mode, stream, options))
+
+    def run(self, mode, stream, options):
+        """モードごとに送信し、(呼び出し側の所要時間[s]のリスト, 排出時間[s], 破棄数) を返す"""
+        dropped_before = dropped_records.value()
+        logger, handler = self.build_logger(mode, stream, options)
+        durations = []
+        for seq in range(options['messages']):
+            extra = {'seq': seq, 'chunks': 1, 'bytes': 16000, 'chars': 12, 'confidence': 0.95}
+            started = time.perf_counter()
+            if mode == 'print':
+                print(json.dumps({'message': 'Chunk transcribed', **extra}), file=stream, flush=True)
+            else:
+                logger.info('Chunk transcribed', extra=extra)
+            durations.append(time.perf_counter() - started)
+
+        drain = 0.0
+        if handler is not None:
+            # close() waits until the listener has written everything queued
+            started = time.perf_counter()
+            handler.close()
+            drain = time.perf_counter() - started
+            logger.removeHandler(handler)
+        return durations, drain, dropped_records.value() - dropped_before
+
+    @staticmethod
+    def build_logger(mode, stream, options):
+        logger = logging.getLogger(f'bench_logging.{mode}')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.handlers.clear()
+        logger.filters.clear()
+        if mode == 'print':
+            return logger, None
+
+        if mode == 'sync-json':
+            handler = logging.StreamHandler(stream)
+        else:
+            handler = QueuedStreamHandler(stream)
+        handler.setFormatter(JSONFormatter())
+        handler.addFilter(ContextFilter())
+        if mode == 'queued-sampled':
+            logger.addFilter(SampleFilter(options['sample_rate']))
+        logger.addHandler(handler)
+        return logger, handler
+
+    def report(self, mode, durations, drain, dropped):
+        us = lambda v: f'{v * 1e6:>9.1f}'
+        ordered = sorted(durations)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        self.stdout.write(
+            f'{mode:<16} {us(statistics.fmean(durations))} {us(statistics.median(durations))} '
+            f'{us(p99)} {us(ordered[-1])} {drain * 1000:>9.1f} {dropped:>8}'
+        )
@@ -0,0 +1,25 @@
+"""
+Issue a signed token that enables the on-demand profiler for a request.
+
+Send it as ``X-Profile: <token>`` (or ``?profile=<token>``) to a profiled
+REST view or to ``ws/conversation/``; the token expires after
+``PROFILING['TOKEN_MAX_AGE']`` seconds.
+"""
+
+from django.core.management.base import BaseCommand
+from apps.core.profiling import HEADER, QUERY_PARAM, get_config, make_token
+
+
+class Command(BaseCommand):
+    help = 'Print a signed token that enables the sampling profiler per request'
+
+    def handle(self, *args, **options):
+        config = get_config()
+        token = make_token()
+        if not config['ENABLED']:
+            self.stderr.write('PROFILING_ENABLED is off; requests with this token are not profiled')
+        self.stdout.write(token)
+        self.stderr.write(
+            f"Valid for {config['TOKEN_MAX_AGE']}s. Send '{HEADER}: <token>' or '?{QUERY_PARAM}=<token>'; "
+            f"profiles are written to {config['DIRECTORY']}/ as .folded files."
+        )
@@ -0,0 +1,231 @@
+"""
+In-process metrics registry.
+
+Lightweight counters, gauges and histograms shared by the conversation
+pipeline. Values are kept per worker process; ``registry.snapshot()``
+returns a plain dict that can be logged or serialised and
+``registry.render()`` the Prometheus text exposition format.
+"""
+
+import bisect
+import math
+import threading
+import time
+
+# Default latency buckets in seconds (covers sub-millisecond ops to slow LLM calls)
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _label_key(labels):
+    """ラベル辞書をハッシュ可能なキーに変換"""
+    return tuple(sorted(labels.items()))
+
+
+class Counter:
+    """単調増加カウンタ"""
+
+    def __init__(self, name, help_text=''):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def collect(self):
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge:
+    """現在値ゲージ
+
+    ``set_function`` で登録した関数は収集時に評価される。
+    """
+
+    def __init__(self, name, help_text=''):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._functions = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def set_function(self, func, **labels):
+        with self._lock:
+            self._functions[_label_key(labels)] = func
+
+    def value(self, **labels):
+        key = _label_key(labels)
+        func = self._functions.get(key)
+        if func is not None:
+            return func()
+        return self._values.get(key, 0)
+
+    def collect(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, func in functions.items():
+            values[key] = func()
+        return values
+
+
+class Histogram:
+    """バケット付きヒストグラム（累積はレンダリング時に計算）"""
+
+    def __init__(self, name, help_text='', buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        """``with histogram.time(...)``: ブロックの所要時間を記録"""
+        return _HistogramTimer(self, labels)
+
+    def value(self, **labels):
+        """(count, sum) を返す"""
+        entry = self._values.get(_label_key(labels))
+        return (entry[2], entry[1]) if entry else (0, 0.0)
+
+    def collect(self):
+        with self._lock:
+            return {key: (list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()}
+
+
+class _HistogramTimer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """メトリクスレジストリ"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f'Metric {name} already registered as {type(metric).__name__}')
+            return metric
+
+    def counter(self, name, help_text=''):
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name, help_text=''):
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name, help_text='', buckets=LATENCY_BUCKETS):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, help_text, buckets)
+            elif not isinstance(metric, Histogram):
+                raise ValueError(f'Metric {name} already registered as {type(metric).__name__}')
+            return metric
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self):
+        """全メトリクスの現在値を辞書で返す"""
+        result = {}
+        for metric in self.metrics():
+            values = metric.collect()
+            if isinstance(metric, Histogram):
+                values = {key: {'count': count, 'sum': total} for key, (_, total, count) in values.items()}
+            result[metric.name] = {
+                ','.join(f'{k}={v}' for k, v in key): value
+                for key, value in values.items()
+            }
+        return result
+
+    def render(self):
+        """Prometheusテキスト形式で出力"""
+        lines = []
+        for metric in sorted(self.metrics(), key=lambda m: m.name):
+            kind = {Counter: 'counter', Gauge: 'gauge', Histogram: 'histogram'}[type(metric)]
+            if metric.help_text:
+                lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {kind}')
+            for key, value in sorted(metric.collect().items()):
+                if kind != 'histogram':
+                    lines.append(f'{metric.name}{_format_labels(key)} {_format_value(value)}')
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(self._bounds(metric), counts):
+                    cumulative += bucket_count
+                    le = (('le', _format_value(bound)),)
+                    lines.append(f'{metric.name}_bucket{_format_labels(key, le)} {cumulative}')
+                lines.append(f'{metric.name}_sum{_format_labels(key)} {_format_value(total)}')
+                lines.append(f'{metric.name}_count{_format_labels(key)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _bounds(histogram):
+        return list(histogram.buckets) + [math.inf]
+
+
+registry = Registry()
@@ -0,0 +1,211 @@
+"""
+On-demand sampling profiler for REST views and WebSocket connections.
+
+A profile is requested with a signed token (``python manage.py
+profile_token``) in the ``X-Profile`` header or the ``profile`` query
+parameter. A sampler thread then reads the handler thread's stack every
+``INTERVAL`` seconds (``sys._current_frames``) and counts collapsed stacks;
+on stop the thread writes them in the folded format read by
+``flamegraph.pl``, speedscope and inferno. Files go to ``DIRECTORY``
+(relative to ``BASE_DIR``, not served), which is kept as a ring of at most
+``MAX_FILES`` profiles.
+
+- REST: ``ProfiledViewMixin`` profiles the thread running the view and
+  returns the file name in the ``X-Profile-Id`` response header.
+- WebSocket: ``start_connection_profile`` profiles the event-loop thread,
+  counting only samples taken while a task of that connection (the
+  consumer's task and tasks created from it) is running.
+
+With ``PROFILING['ENABLED']`` off, or without a token, the cost is one
+settings lookup per request.
+"""
+
+import asyncio
+import contextvars
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from urllib.parse import parse_qs
+from django.conf import settings
+from django.core import signing
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'apps.core.profiling'
+TOKEN_VALUE = 'profile'
+HEADER = 'X-Profile'
+QUERY_PARAM = 'profile'
+
+DEFAULT_CONFIG = {
+    'ENABLED': False,
+    'INTERVAL': 0.005,
+    'DIRECTORY': 'profiles',
+    'MAX_FILES': 50,
+    'MAX_SECONDS': 60,
+    'TOKEN_MAX_AGE': 3600,
+}
+
+# Profiler of the connection owning the running task (WebSocket)
+_active_profile = contextvars.ContextVar('active_profile', default=None)
+
+
+def get_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, 'PROFILING', {})}
+
+
+def make_token():
+    """プロファイル要求用の署名付きトークン（TOKEN_MAX_AGE秒有効）"""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(TOKEN_VALUE)
+
+
+def verify_token(token, max_age):
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=max_age) == TOKEN_VALUE
+    except signing.BadSignature:
+        return False
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_qualname} ({code.co_filename}:{frame.f_lineno})'
+
+
+def fold_stack(frame):
+    """フレームを ``root;...;leaf`` 形式に畳む"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+class Sampler:
+    """スレッドのスタックを定期的に採取するサンプリングプロファイラ
+
+    Args:
+        name: 出力ファイル名に含める識別子（エンドポイント名など）
+        thread_id: 採取対象のスレッド
+        loop: 指定時は、このプロファイラに属するタスクの実行中のみ採取
+    """
+
+    def __init__(self, name, thread_id, loop=None):
+        config = get_config()
+        self.interval = config['INTERVAL']
+        self.max_seconds = config['MAX_SECONDS']
+        self.directory = Path(config['DIRECTORY'])
+        if not self.directory.is_absolute():
+            self.directory = Path(settings.BASE_DIR) / self.directory
+        self.max_files = config['MAX_FILES']
+        self.thread_id = thread_id
+        self.loop = loop
+        safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)[:60]
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{safe_name}-{uuid.uuid4().hex[:8]}"
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, name=f'profiler-{self.id}', daemon=True)
+
+    @property
+    def path(self):
+        return self.directory / f'{self.id}.folded'
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止を指示（書き込みは採取スレッドが行う）"""
+        self._stop.set()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def owns_running_task(self):
+        task = asyncio.current_task(self.loop)
+        return task is not None and task.get_context().get(_active_profile) is self
+
+    def run(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            if self.loop is not None and not self.owns_running_task():
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.stacks[fold_stack(frame)] += 1
+            self.samples += 1
+            del frame
+        try:
+            self.write()
+        except OSError as e:
+            logger.warning('Failed to write profile %s: %s', self.id, e)
+
+    def write(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lines = [f'{stack} {count}\n' for stack, count in self.stacks.most_common()]
+        self.path.write_text(''.join(lines), encoding='utf-8')
+        logger.info('Profile written', extra={'profile': self.path.name, 'samples': self.samples})
+        self.trim()
+
+    def trim(self):
+        """リング: 古いものから削除して MAX_FILES 件に保つ"""
+        files = sorted(self.directory.glob('*.folded'), key=lambda p: p.stat().st_mtime)
+        for old in files[:max(0, len(files) - self.max_files)]:
+            old.unlink(missing_ok=True)
+
+
+def _requested(token):
+    if not token:
+        return False
+    config = get_config()
+    return verify_token(token, config['TOKEN_MAX_AGE'])
+
+
+def request_profiler(request, name):
+    """リクエストでプロファイルが要求されていれば現在のスレッドの Sampler を返す"""
+    if not getattr(settings, 'PROFILING', {}).get('ENABLED'):
+        return None
+    token = request.headers.get(HEADER) or request.GET.get(QUERY_PARAM)
+    if not _requested(token):
+        return None
+    return Sampler(name, threading.get_ident())
+
+
+def start_connection_profile(scope, name):
+    """WebSocket接続でプロファイルが要求されていれば採取を開始して Sampler を返す
+
+    接続のタスク（consumerのハンドラ）から呼ぶこと。以降に作成されるタスクも対象になる。
+    """
+    if not getattr(settings, 'PROFILING', {}).get('ENABLED'):
+        return None
+    headers = dict(scope.get('headers') or [])
+    token = headers.get(HEADER.lower().encode(), b'').decode('latin-1')
+    if not token:
+        token = parse_qs(scope.get('query_string', b'').decode()).get(QUERY_PARAM, [''])[0]
+    if not _requested(token):
+        return None
+    sampler = Sampler(name, threading.get_ident(), loop=asyncio.get_running_loop())
+    _active_profile.set(sampler)
+    return sampler.start()
+
+
+class ProfiledViewMixin:
+    """DRFビューのオンデマンドプロファイル（X-Profile ヘッダまたは ?profile=）"""
+
+    def dispatch(self, request, *args, **kwargs):
+        profiler = request_profiler(request, f'{type(self).__name__}-{request.method}')
+        if profiler is None:
+            return super().dispatch(request, *args, **kwargs)
+        with profiler:
+            response = super().dispatch(request, *args, **kwargs)
+        response['X-Profile-Id'] = profiler.id
+        return response
@@ -0,0 +1,27 @@
+"""
+Core views.
+"""
+
+import secrets
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from .metrics import registry
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@require_GET
+def metrics(request):
+    """
+    Prometheus形式のメトリクス（ワーカープロセス単位）
+    GET /metrics
+
+    METRICS_TOKEN が設定されている場合は ``Authorization: Bearer <token>`` が必要。
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        supplied = request.META.get('HTTP_AUTHORIZATION', '').removeprefix('Bearer ')
+        if not secrets.compare_digest(supplied.encode(), token.encode()):
+            return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,153 @@
+"""
+Process-wide, read-only emotion registry.
+
+The Emotion table is a small master table (Plutchik's emotions) that almost
+never changes, so it is loaded once per process and shared as an immutable
+snapshot instead of being queried on every session end. The snapshot is
+dropped by ``post_save``/``post_delete`` signals (see signals.py) and, to pick
+up changes made by other processes, reloaded after ``EMOTION_REGISTRY_TTL``
+seconds.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+from django.conf import settings
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Plutchik primary axis for each emotion (mirrors front/src/lib/plutchik.ts)
+PLUTCHIK_PRIMARY = {
+    # joy family
+    'serenity': 'joy', 'contentment': 'joy', 'happiness': 'joy', 'joy': 'joy',
+    'ecstasy': 'joy', 'love': 'joy', 'pride': 'joy', 'relief': 'joy', 'excitement': 'joy',
+    # trust family
+    'acceptance': 'trust', 'trust': 'trust', 'admiration': 'trust', 'compassion': 'trust',
+    'gratitude': 'trust', 'submission': 'trust',
+    # fear family
+    'apprehension': 'fear', 'anxiety': 'fear', 'fear': 'fear', 'terror': 'fear',
+    'nervousness': 'fear', 'panic': 'fear',
+    # surprise family
+    'distraction': 'surprise', 'confusion': 'surprise', 'surprise': 'surprise',
+    'amazement': 'surprise', 'awe': 'surprise',
+    # sadness family
+    'pensiveness': 'sadness', 'loneliness': 'sadness', 'sadness': 'sadness',
+    'depression': 'sadness', 'grief': 'sadness', 'remorse': 'sadness', 'guilt': 'sadness',
+    'shame': 'sadness', 'disappointment': 'sadness',
+    # disgust family
+    'boredom': 'disgust', 'disapproval': 'disgust', 'disgust': 'disgust',
+    'contempt': 'disgust', 'loathing': 'disgust',
+    # anger family
+    'annoyance': 'anger', 'frustration': 'anger', 'anger': 'anger',
+    'aggressiveness': 'anger', 'rage': 'anger', 'envy': 'anger', 'jealousy': 'anger',
+    # anticipation family
+    'interest': 'anticipation', 'anticipation': 'anticipation', 'hope': 'anticipation',
+    'optimism': 'anticipation', 'vigilance': 'anticipation',
+}
+
+EmotionEntry = namedtuple(
+    'EmotionEntry',
+    ['id', 'name', 'name_ja', 'primary', 'created_at', 'updated_at']
+)
+
+
+class EmotionRegistry:
+    """感情マスターの不変スナップショット"""
+
+    def __init__(self, entries):
+        self.entries = tuple(entries)
+        self.names = tuple(entry.name for entry in self.entries)
+        self._by_name = MappingProxyType({entry.name: entry for entry in self.entries})
+        self._by_id = MappingProxyType({entry.id: entry for entry in self.entries})
+        self.version = hashlib.sha256(
+            repr([(e.id, e.name, e.name_ja, e.updated_at) for e in self.entries]).encode('utf-8')
+        ).hexdigest()[:16]
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def get(self, name):
+        """感情名からエントリを取得（存在しなければNone）"""
+        return self._by_name.get(name)
+
+    def by_id(self, emotion_id):
+        """IDからエントリを取得（存在しなければNone）"""
+        return self._by_id.get(emotion_id)
+
+    def first(self):
+        """名前順で最初のエントリ（Emotion.objects.first()相当）"""
+        return self.entries[0] if self.entries else None
+
+    def resolve(self, name):
+        """感情名に対応するエントリ、なければ先頭のエントリ"""
+        return self.get(name) or self.first()
+
+    @classmethod
+    def load(cls):
+        from .models import Emotion
+
+        return cls(
+            EmotionEntry(
+                id=emotion.id,
+                name=emotion.name,
+                name_ja=emotion.name_ja,
+                primary=PLUTCHIK_PRIMARY.get(emotion.name),
+                created_at=emotion.created_at,
+                updated_at=emotion.updated_at,
+            )
+            for emotion in Emotion.objects.order_by('name')
+        )
+
+
+_registry = None
+_lock = threading.Lock()
+
+
+def _is_fresh(registry):
+    ttl = getattr(settings, 'EMOTION_REGISTRY_TTL', 300)
+    return registry is not None and (not ttl or time.monotonic() - registry.loaded_at < ttl)
+
+
+def loaded_registry():
+    """読み込み済みで有効なレジストリを返す（DBアクセスなし、なければNone）
+
+    非同期コンテキストからはまずこれを使い、Noneの場合のみ
+    ``get_registry`` をスレッドで実行する。
+    """
+    registry = _registry
+    return registry if _is_fresh(registry) else None
+
+
+def get_registry():
+    """レジストリを返す（未読み込み・期限切れならDBから読み込む）"""
+    global _registry
+    registry = _registry
+    if _is_fresh(registry):
+        return registry
+    with _lock:
+        if not _is_fresh(_registry):
+            _registry = EmotionRegistry.load()
+        return _registry
+
+
+def invalidate_registry(**kwargs):
+    """レジストリを破棄（次回アクセス時に再読み込み）"""
+    global _registry
+    with _lock:
+        _registry = None
+
+
+def warm_registry():
+    """起動時にレジストリを読み込む（DB未準備なら初回アクセス時に読み込む）"""
+    try:
+        get_registry()
+    except DatabaseError as e:
+        logger.warning('Emotion registry warm-up skipped: %s', e)
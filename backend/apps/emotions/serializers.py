@@ -4,12 +4,19 @@ Emotion serializers.
 
 from rest_framework import serializers
 from .models import Emotion
+from .registry import PLUTCHIK_PRIMARY
 
 
 class EmotionSerializer(serializers.ModelSerializer):
-    """感情マスターシリアライザ"""
+    """感情マスターシリアライザ（Emotion・レジストリのエントリの両方に使える）"""
+
+    primary = serializers.SerializerMethodField()
 
     class Meta:
         model = Emotion
-        fields = ['id', 'name', 'name_ja', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'name_ja', 'primary', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def get_primary(self, obj):
+        """Plutchikの基本感情軸"""
+        return PLUTCHIK_PRIMARY.get(obj.name)
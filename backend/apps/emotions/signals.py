@@ -0,0 +1,15 @@
+"""
+Emotion signals.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Emotion
+from .registry import invalidate_registry
+
+
+@receiver(post_save, sender=Emotion)
+@receiver(post_delete, sender=Emotion)
+def emotion_changed(sender, **kwargs):
+    """感情マスター変更時にレジストリを破棄"""
+    invalidate_registry()
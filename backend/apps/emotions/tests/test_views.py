@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from apps.emotions.models import Emotion
+from apps.emotions.registry import invalidate_registry
+from apps.emotions.serializers import EmotionSerializer
+
+
+class EmotionListTests(APITestCase):
+
+    def setUp(self):
+        Emotion.objects.create(name='joy', name_ja='喜び')
+        Emotion.objects.create(name='fear', name_ja='恐れ')
+        invalidate_registry()
+        self.addCleanup(invalidate_registry)
+        self.client.force_authenticate(User.objects.create_user('doctor', password='x'))
+
+    def test_list_matches_serializer_output(self):
+        response = self.client.get('/api/v1/emotions/')
+        self.assertEqual(response.status_code, 200)
+        expected = EmotionSerializer(Emotion.objects.order_by('name'), many=True).data
+        self.assertEqual(response.json(), [dict(item) for item in expected])
+        self.assertEqual(response.json()[1]['primary'], 'joy')
+
+    def test_if_none_match(self):
+        etag = self.client.get('/api/v1/emotions/')['ETag']
+        for header in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+            with self.subTest(header=header):
+                response = self.client.get('/api/v1/emotions/', HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, 304)
+        for header in (etag[:-2] + '"', f'"x{etag[1:]}', '"other"'):
+            with self.subTest(header=header):
+                response = self.client.get('/api/v1/emotions/', HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, 200)
@@ -2,15 +2,45 @@
 Emotion views.
 """
 
-from rest_framework import viewsets
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from .models import Emotion
+from .registry import get_registry
 from .serializers import EmotionSerializer
 
 
+def etag_matches(if_none_match, etag):
+    """If-None-Match がETagに一致するか（弱い比較、``*`` は常に一致）"""
+    tags = parse_etags(if_none_match)
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
 class EmotionViewSet(viewsets.ReadOnlyModelViewSet):
     """感情マスターViewSet"""
 
     queryset = Emotion.objects.all()
     serializer_class = EmotionSerializer
     permission_classes = [IsAuthenticated]
+
+    def list(self, request, *args, **kwargs):
+        """感情マスター一覧（レジストリから返す・ページングなし・ETag対応）"""
+        registry = get_registry()
+        etag = f'"emotions-{registry.version}"'
+
+        if etag_matches(request.headers.get('If-None-Match', ''), etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            # Registry entries carry the model's fields, so the format matches retrieve
+            response = Response(self.get_serializer(registry.entries, many=True).data)
+
+        response['ETag'] = etag
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=getattr(settings, 'EMOTION_LIST_MAX_AGE', 3600)
+        )
+        return response
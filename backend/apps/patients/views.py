@@ -14,9 +14,10 @@ from .serializers import (
     PatientLoginSerializer
 )
 from apps.core.authentication import delete_token
+from apps.core.profiling import ProfiledViewMixin
 
 
-class PatientViewSet(viewsets.ModelViewSet):
+class PatientViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     """患者ViewSet"""
 
     queryset = Patient.objects.all()
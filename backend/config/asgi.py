@@ -10,6 +10,7 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
@@ -18,9 +19,20 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
 # is populated before importing code that may import ORM models.
 django_asgi_app = get_asgi_application()
 
+from django.conf import settings
 from apps.conversations.routing import websocket_urlpatterns
+from apps.core.loopwatch import LoopWatchdogMiddleware
+from apps.emotions.registry import warm_registry
+
+# Load the emotion master once per process so requests never query it
+warm_registry()
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    "websocket": URLRouter(websocket_urlpatterns),
+    # Session-cookie login puts the Django user in scope['user'] (required by ws/dashboard/)
+    "websocket": AuthMiddlewareStack(URLRouter(websocket_urlpatterns)),
 })
+
+# Opt-in event-loop lag / blocking-call detection (see apps/core/loopwatch.py)
+if settings.ASGI_LOOP_WATCHDOG.get('ENABLED'):
+    application = LoopWatchdogMiddleware(application)
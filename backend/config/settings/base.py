@@ -178,6 +178,14 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Run tasks inline (use with CELERY_BROKER=memory:// to work without a broker)
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'false').lower() == 'true'
+CELERY_TASK_EAGER_PROPAGATES = False
+# Eager results are stored too, so async end-session results can be fetched over REST
+CELERY_TASK_STORE_EAGER_RESULT = True
+
+# End sessions via a Celery task (202 + progress events) unless ?async=0 is given
+CONVERSATION_ASYNC_END_SESSION = os.environ.get('CONVERSATION_ASYNC_END_SESSION', 'false').lower() == 'true'
 
 
 # Channels Configuration
@@ -189,18 +197,163 @@ CHANNEL_LAYERS = {
     },
 }
 
-# Production Redis configuration (uncomment when Redis is available)
-# CHANNEL_LAYERS = {
-#     'default': {
-#         'BACKEND': 'channels_redis.core.RedisChannelLayer',
-#         'CONFIG': {
-#             "hosts": [os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1')],
-#         },
-#     },
-# }
+# Production uses the Redis channel layer (see production.py) so dashboard and
+# session events reach sockets on every worker; in-memory is for dev and tests.
+
+
+# Conversation pipeline executors
+# Thread pool sizes for blocking STT/LLM/TTS/DB calls made from the WebSocket consumer
+
+CONVERSATION_EXECUTORS = {
+    'stt': int(os.environ.get('CONVERSATION_STT_WORKERS', 8)),
+    'llm': int(os.environ.get('CONVERSATION_LLM_WORKERS', 4)),
+    'tts': int(os.environ.get('CONVERSATION_TTS_WORKERS', 4)),
+    'db': int(os.environ.get('CONVERSATION_DB_WORKERS', 4)),
+}
+
+# Redis for the per-session transcript chunks (apps/conversations/transcripts.py).
+# Empty keeps them in process memory, which is only safe with a single worker process
+TRANSCRIPT_STORE_URL = os.environ.get('TRANSCRIPT_STORE_URL', '')
+
+# Chunks of one session transcribed concurrently over the WebSocket
+CONVERSATION_MAX_INFLIGHT_STT = int(os.environ.get('CONVERSATION_MAX_INFLIGHT_STT', 3))
+
+# Client sequence numbers accepted ahead of the next expected one (duplicates are always rejected)
+CONVERSATION_SEQ_WINDOW = int(os.environ.get('CONVERSATION_SEQ_WINDOW', 64))
+
+# Join small consecutive chunks into one STT request (flush on size, age of oldest chunk, or idle gap)
+CONVERSATION_COALESCE = {
+    'ENABLED': os.environ.get('CONVERSATION_COALESCE', 'false').lower() == 'true',
+    'MAX_BYTES': int(os.environ.get('CONVERSATION_COALESCE_MAX_BYTES', 32 * 1024)),
+    'MAX_DELAY': float(os.environ.get('CONVERSATION_COALESCE_MAX_DELAY', 1.0)),
+    'IDLE': float(os.environ.get('CONVERSATION_COALESCE_IDLE', 0.3)),
+}
+
+# Analyse the transcript in the background while the patient is still talking
+CONVERSATION_SPECULATIVE_ANALYSIS = os.environ.get('CONVERSATION_SPECULATIVE_ANALYSIS', 'false').lower() == 'true'
+CONVERSATION_SPECULATIVE_DEBOUNCE = float(os.environ.get('CONVERSATION_SPECULATIVE_DEBOUNCE', 1.5))
+
+# Audio payload memory (apps/conversations/memory.py): largest decoded audio accepted
+# in one message (checked on the frame length before parsing), and per-message
+# tracemalloc accounting (slows every allocation; for sizing runs)
+CONVERSATION_MEMORY = {
+    'MAX_PAYLOAD_BYTES': int(os.environ.get('CONVERSATION_MAX_PAYLOAD_BYTES', 5 * 1024 * 1024)),
+    'TRACEMALLOC': os.environ.get('CONVERSATION_TRACEMALLOC', 'false').lower() == 'true',
+    'TRACEMALLOC_FRAMES': 1,
+}
+# Largest request body Django reads: the base64 JSON of MAX_PAYLOAD_BYTES plus its
+# envelope, the same bound as memory.frame_limit (Django's default is 2.5 MB)
+DATA_UPLOAD_MAX_MEMORY_SIZE = 4 * ((CONVERSATION_MEMORY['MAX_PAYLOAD_BYTES'] + 2) // 3) + 4096
+
+# Energy-based VAD before STT: drop silent chunks, trim leading/trailing silence
+# (needs the `vad` extra and ffmpeg; audio passes through unchanged otherwise)
+CONVERSATION_VAD = {
+    'ENABLED': os.environ.get('CONVERSATION_VAD', 'false').lower() == 'true',
+    'THRESHOLD_DB': float(os.environ.get('CONVERSATION_VAD_THRESHOLD_DB', -45.0)),
+    'NOISE_MARGIN_DB': 12.0,
+    'PAD_MS': 200,
+    'MIN_TRIM_SECONDS': 0.5,
+    'OUTPUT_FORMAT': 'webm',  # 'webm' (Opus) or 'wav'
+}
+
+# Shared keep-alive HTTP client pool for Deepgram/OpenAI (HTTP/2 when `h2` is installed)
+CONVERSATION_HTTP_POOL = {
+    'HTTP2': True,
+    'MAX_CONNECTIONS': int(os.environ.get('CONVERSATION_HTTP_MAX_CONNECTIONS', 100)),
+    'MAX_KEEPALIVE_CONNECTIONS': int(os.environ.get('CONVERSATION_HTTP_MAX_KEEPALIVE', 20)),
+    'KEEPALIVE_EXPIRY': 60.0,
+    'TIMEOUT': 30.0,
+    'CONNECT_TIMEOUT': 5.0,
+}
+
+# Offline stand-ins for Deepgram/OpenAI HTTP APIs (fakes/api.py)
+# MODE: '' (real APIs), 'fake' (in-process stand-in), 'record' (real APIs, save fixtures), 'replay' (serve fixtures)
+CONVERSATION_FAKE_APIS = {
+    'MODE': os.environ.get('CONVERSATION_FAKE_APIS', ''),
+    'FIXTURES': os.environ.get('CONVERSATION_FAKE_FIXTURES', str(BASE_DIR / 'fixtures' / 'api')),
+    'SEED': int(os.environ.get('CONVERSATION_FAKE_SEED', 0)),
+    # Per-route (listen / chat / speech, or DEFAULT) latency distribution and error injection
+    'ROUTES': {
+        'listen': {'LATENCY': {'DIST': 'lognormal', 'MEDIAN': 0.6, 'SIGMA': 0.3}},
+        'chat': {'LATENCY': {'DIST': 'lognormal', 'MEDIAN': 1.2, 'SIGMA': 0.4}, 'TOKEN_INTERVAL': 0.02},
+        'speech': {'LATENCY': {'DIST': 'lognormal', 'MEDIAN': 0.5, 'SIGMA': 0.3}},
+        'DEFAULT': {
+            'ERROR_RATE': float(os.environ.get('CONVERSATION_FAKE_ERROR_RATE', 0.0)),
+            'TIMEOUT_RATE': float(os.environ.get('CONVERSATION_FAKE_TIMEOUT_RATE', 0.0)),
+        },
+    },
+}
+
+# Deadlines, circuit breakers and hedging for external APIs (services/resilience.py)
+# Per-endpoint dicts override DEFAULT; HEDGE starts a duplicate request after the recent p95 latency
+CONVERSATION_RESILIENCE = {
+    'DEFAULT': {
+        'WINDOW': 20,
+        'MIN_CALLS': 10,
+        'ERROR_RATE': 0.5,
+        'SLOW_RATE': 0.8,
+        'OPEN_SECONDS': 30.0,
+    },
+    'stt': {
+        'DEADLINE': float(os.environ.get('STT_DEADLINE', 15.0)),
+        'SLOW_CALL_SECONDS': 8.0,
+        'HEDGE': os.environ.get('STT_HEDGE', 'false').lower() == 'true',
+    },
+    'llm': {
+        'DEADLINE': float(os.environ.get('LLM_DEADLINE', 20.0)),
+        'SLOW_CALL_SECONDS': 12.0,
+    },
+    'tts': {
+        'DEADLINE': float(os.environ.get('TTS_DEADLINE', 15.0)),
+        'SLOW_CALL_SECONDS': 8.0,
+        'HEDGE': os.environ.get('TTS_HEDGE', 'false').lower() == 'true',
+    },
+}
+
+# Content-addressed TTS audio cache ('disk', 'cache' for a Django cache such as Redis, or '' to disable)
+TTS_CACHE = {
+    'BACKEND': os.environ.get('TTS_CACHE_BACKEND', 'disk'),
+    'LOCATION': os.environ.get('TTS_CACHE_DIR', str(BASE_DIR / 'media' / 'tts_cache')),
+    'MAX_BYTES': int(os.environ.get('TTS_CACHE_MAX_BYTES', 100 * 1024 * 1024)),
+    'ALIAS': 'default',
+    'TIMEOUT': None,
+}
+
+# In-process emotion registry: reload interval (seconds) to pick up changes from other processes
+EMOTION_REGISTRY_TTL = int(os.environ.get('EMOTION_REGISTRY_TTL', 300))
+# Cache-Control max-age for the emotion list (clients revalidate with the ETag afterwards)
+EMOTION_LIST_MAX_AGE = int(os.environ.get('EMOTION_LIST_MAX_AGE', 3600))
+
+# Event-loop watchdog for ASGI workers: heartbeat every INTERVAL seconds; a loop
+# blocked longer than THRESHOLD seconds has its stack captured and logged
+ASGI_LOOP_WATCHDOG = {
+    'ENABLED': os.environ.get('ASGI_LOOP_WATCHDOG', 'false').lower() == 'true',
+    'INTERVAL': float(os.environ.get('ASGI_LOOP_WATCHDOG_INTERVAL', 0.05)),
+    'THRESHOLD': float(os.environ.get('ASGI_LOOP_WATCHDOG_THRESHOLD', 0.1)),
+    'STACK_DEPTH': 30,
+}
+
+# On-demand sampling profiler (apps/core/profiling.py); requests opt in with a
+# signed token from `manage.py profile_token`
+PROFILING = {
+    'ENABLED': os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true',
+    'INTERVAL': float(os.environ.get('PROFILING_INTERVAL', 0.005)),
+    'DIRECTORY': os.environ.get('PROFILING_DIRECTORY', 'profiles'),  # relative to BASE_DIR
+    'MAX_FILES': 50,
+    'MAX_SECONDS': 60,
+    'TOKEN_MAX_AGE': 3600,
+}
+
+# Bearer token required by GET /metrics (empty: no authentication, restrict at the proxy)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
 
 
 # Logging Configuration
+# Records are formatted and written on a background thread (apps/core/logs.py)
+
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # json | text
+# Fraction of per-chunk INFO records kept (warnings and errors are always kept)
+LOG_CHUNK_SAMPLE_RATE = float(os.environ.get('LOG_CHUNK_SAMPLE_RATE', 0.1))
 
 LOGGING = {
     'version': 1,
@@ -210,11 +363,24 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'apps.core.logs.JSONFormatter',
+        },
+    },
+    'filters': {
+        'context': {
+            '()': 'apps.core.logs.ContextFilter',
+        },
+        'chunk_sample': {
+            '()': 'apps.core.logs.SampleFilter',
+            'rate': LOG_CHUNK_SAMPLE_RATE,
+        },
     },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            '()': 'apps.core.logs.QueuedStreamHandler',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose',
+            'filters': ['context'],
         },
     },
     'root': {
@@ -227,6 +393,10 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'apps.conversations.chunks': {
+            'level': 'INFO',
+            'filters': ['chunk_sample'],
+        },
     },
 }
 
@@ -234,6 +404,7 @@ LOGGING = {
 # External API Keys
 # Deepgram API (STT/TTS)
 DEEPGRAM_API_KEY = os.environ.get('DEEPGRAM_API_KEY', '')
+DEEPGRAM_STREAMING_URL = os.environ.get('DEEPGRAM_STREAMING_URL', 'wss://api.deepgram.com/v1/listen')
 
 # OpenAI API (LLM)
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
\ No newline at end of file
@@ -32,6 +32,19 @@ SECURE_HSTS_PRELOAD = True
 # AWS_S3_REGION_NAME = os.environ.get('AWS_S3_REGION_NAME', 'ap-northeast-1')
 # AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com'
 
+# Channels: shared Redis layer so session events fan out across ASGI workers and Celery
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [os.environ.get('CHANNEL_REDIS_URL', os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'))],
+        },
+    },
+}
+
+# Transcript chunks must be shared by every ASGI/WSGI worker and Celery
+TRANSCRIPT_STORE_URL = os.environ.get('TRANSCRIPT_STORE_URL', os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'))
+
 # Email
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST')
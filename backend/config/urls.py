@@ -6,9 +6,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from apps.core.views import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
     path('api/v1/', include('apps.patients.urls')),
     path('api/v1/', include('apps.conversations.urls')),
     path('api/v1/', include('apps.emotions.urls')),
@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useMemo, useState } from 'react';
-import { apiGet } from '../lib/api';
+import { apiGet, WS_BASE } from '../lib/api';
 import type { ConversationSession, EmotionsQuery } from '../types/conversation';
 
 export function usePatientEmotions(patientId: string, initial: EmotionsQuery = {}) {
@@ -44,6 +44,37 @@ export function usePatientEmotions(patientId: string, initial: EmotionsQuery = {
     };
   }, [patientId, query.from, query.to, query.order]);
 
+  // Push: ended sessions arrive over the dashboard WebSocket instead of re-fetching
+  useEffect(() => {
+    if (!patientId || typeof window === 'undefined') return;
+    const ws = new WebSocket(`${WS_BASE}/ws/dashboard/?patient_id=${encodeURIComponent(patientId)}`);
+    ws.onmessage = (ev) => {
+      let msg: any;
+      try {
+        msg = JSON.parse(ev.data);
+      } catch {
+        return;
+      }
+      if (msg?.type !== 'session_ended' || !msg.session) return;
+      const session = msg.session as ConversationSession;
+      const startedAt = new Date(session.started_at).getTime();
+      if (query.from && startedAt < new Date(query.from).getTime()) return;
+      if (query.to && startedAt > new Date(query.to).getTime()) return;
+      setData((prev) => {
+        const rest = prev.filter((d) => String(d.id) !== String(session.id));
+        const merged = [...rest, session];
+        merged.sort((a, b) => {
+          const diff = new Date(a.started_at).getTime() - new Date(b.started_at).getTime();
+          return (query.order ?? 'desc') === 'asc' ? diff : -diff;
+        });
+        return merged;
+      });
+    };
+    return () => {
+      ws.close();
+    };
+  }, [patientId, query.from, query.to, query.order]);
+
   const range = useMemo(() => {
     if (!Array.isArray(data) || data.length === 0) return { min: null as number | null, max: null as number | null };
     if (!Array.isArray(data)) return { min: null as number | null, max: null as number | null };
@@ -1,6 +1,9 @@
 export const API_BASE =
   process.env.NEXT_PUBLIC_API_BASE || 'http://localhost:8000/api/v1';
 
+export const WS_BASE =
+  process.env.NEXT_PUBLIC_WS_URL || 'ws://localhost:8000';
+
 type Query = Record<string, string | number | boolean | undefined | null>;
 
 function buildQuery(params?: Query) {